@@ -0,0 +1,96 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+PRINCIPAL_KEY = "principal:{}:{}"
+VERSION_KEY = "principal-version:{}"
+# Пароль не нужен ни для аутентификации, ни для прав и в кэш не попадает.
+EXCLUDED_FIELDS = ("password",)
+# Кэши в памяти процесса: сброс версии в одном процессе (другой воркер,
+# manage.py) не виден остальным.
+LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def get_cache():
+    return caches[settings.PRINCIPAL_CACHE["ALIAS"]]
+
+
+def is_shared(cache):
+    """Виден ли кэш всем процессам, которые могут менять пользователей."""
+    return not isinstance(cache, LOCAL_BACKENDS)
+
+
+def invalidate_principal(user_id):
+    """Сброс закэшированных пользователей после коммита записи."""
+    def set_version():
+        get_cache().set(VERSION_KEY.format(user_id), time.time_ns(), None)
+
+    transaction.on_commit(set_version)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация с кэшем пользователя по id и токену.
+
+    Запись кэша хранит поля пользователя вместе с версией, которая меняется
+    при любом сохранении пользователя (роль, активность, права), поэтому
+    запрос с неизменившимся пользователем обходится без обращения к БД.
+    Неактивные пользователи в кэш не попадают. С кэшем в памяти процесса
+    (LocMemCache) пользователь всегда читается из БД: иначе деактивацию,
+    сохраненную другим процессом, воркер увидел бы только через TIMEOUT.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        cache = get_cache()
+        if not is_shared(cache):
+            return super().get_user(validated_token)
+        key = PRINCIPAL_KEY.format(user_id, self.get_token_id(validated_token))
+        version_key = VERSION_KEY.format(user_id)
+        cached = cache.get_many([key, version_key])
+        version = cached.get(version_key)
+        entry = cached.get(key)
+        if entry is not None and entry[0] == version:
+            _, field_names, values = entry
+            user = self.user_model.from_db(
+                self.user_model.objects.db, field_names, values
+            )
+            if not user.is_active:
+                raise AuthenticationFailed(
+                    "Пользователь неактивен.", code="user_inactive"
+                )
+            return user
+
+        if version is None:
+            cache.add(version_key, time.time_ns(), None)
+            version = cache.get(version_key)
+        user = super().get_user(validated_token)
+        fields = [
+            field for field in self.user_model._meta.concrete_fields
+            if field.name not in EXCLUDED_FIELDS
+        ]
+        cache.set(
+            key,
+            (
+                version,
+                [field.attname for field in fields],
+                [getattr(user, field.attname) for field in fields],
+            ),
+            settings.PRINCIPAL_CACHE["TIMEOUT"],
+        )
+        return user
+
+    def get_token_id(self, validated_token):
+        jti = validated_token.get(api_settings.JTI_CLAIM)
+        if jti is not None:
+            return jti
+        return hashlib.md5(str(validated_token).encode()).hexdigest()
@@ -0,0 +1,501 @@
+"""Нагрузочные замеры эндпоинтов API.
+
+Сценарии описывают запросы ко всем маршрутам `api.urls`; каждый сценарий
+прогоняется через тестовый клиент Django в том же процессе и через
+настоящий WSGI-сервер. Для сценария считаются перцентили задержки,
+пропускная способность и число запросов к БД.
+
+measure_serialization сравнивает стоимость одного объекта списка при
+сериализации ModelSerializer и RowSerializer (api.rows).
+"""
+import http.client
+import json
+import math
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, resolve
+from rest_framework_simplejwt.tokens import RefreshToken
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+from .rows import get_row_serializer
+from .serializers import CommentSerializer, ReviewSerializer, TitleSerializer
+
+PERCENTILES = (50, 90, 95, 99)
+ANONYMOUS = None
+USER = "user"
+ADMIN = "admin"
+
+
+class Scenario:
+    """Запрос к одному маршруту.
+
+    В `path` и `data` подставляются значения контекста (id созданных
+    объектов) и `i` - номер запроса, чтобы пишущие сценарии не создавали
+    дубликаты.
+    """
+
+    def __init__(self, name, method, path, principal=ANONYMOUS, data=None,
+                 status=200):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.principal = principal
+        self.data = data
+        self.status = status
+
+    def get_path(self, context, i):
+        return quote(self.path.format(i=i, **context), safe="/?=&")
+
+    def get_body(self, context, i):
+        if self.data is None:
+            return None
+        return json.dumps(format_data(self.data, dict(context, i=i)))
+
+
+def format_data(data, context):
+    if isinstance(data, str):
+        return data.format(**context)
+    if isinstance(data, list):
+        return [format_data(item, context) for item in data]
+    if isinstance(data, dict):
+        return {
+            key: format_data(value, context) for key, value in data.items()
+        }
+    return data
+
+
+TITLE = "/api/v1/titles/{title}/"
+REVIEW = TITLE + "reviews/{review}/"
+
+SCENARIOS = (
+    Scenario("api-root", "GET", "/api/v1/"),
+    Scenario("titles-list", "GET", "/api/v1/titles/"),
+    Scenario("titles-cursor", "GET", "/api/v1/titles/?pagination=cursor"),
+    Scenario("titles-search", "GET", "/api/v1/titles/?search={search}"),
+    Scenario("titles-detail", "GET", TITLE),
+    Scenario("titles-distribution", "GET", TITLE + "rating-distribution/"),
+    Scenario(
+        "titles-distributions", "GET",
+        "/api/v1/titles/rating-distribution/?ids={title}",
+    ),
+    Scenario(
+        "titles-create", "POST", "/api/v1/titles/", ADMIN,
+        {"name": "Бенчмарк {i}", "year": 2000, "category": "{category}",
+         "genre": ["{genre}"]},
+        status=201,
+    ),
+    Scenario(
+        "titles-update", "PATCH", TITLE, ADMIN,
+        {"description": "Описание {i}"},
+    ),
+    Scenario(
+        "titles-bulk", "POST", "/api/v1/titles/bulk/", ADMIN,
+        [{"name": "Пакет {i}", "year": 2001, "category": "{category}",
+          "genre": ["{genre}"]}],
+        status=201,
+    ),
+    Scenario("rankings-top", "GET", "/api/v1/rankings/top/"),
+    Scenario(
+        "rankings-trending", "GET", "/api/v1/rankings/trending/?genre={genre}"
+    ),
+    Scenario("categories-list", "GET", "/api/v1/categories/"),
+    Scenario(
+        "categories-create", "POST", "/api/v1/categories/", ADMIN,
+        {"name": "Категория {i}", "slug": "bench-category-{i}"}, status=201,
+    ),
+    Scenario(
+        "categories-delete", "DELETE", "/api/v1/categories/bench-delete-{i}/",
+        ADMIN, status=204,
+    ),
+    Scenario(
+        "categories-bulk", "POST", "/api/v1/categories/bulk/", ADMIN,
+        [{"name": "Пакет {i}", "slug": "bench-bulk-{i}"}], status=201,
+    ),
+    Scenario("genres-list", "GET", "/api/v1/genres/"),
+    Scenario(
+        "genres-create", "POST", "/api/v1/genres/", ADMIN,
+        {"name": "Жанр {i}", "slug": "bench-genre-{i}"}, status=201,
+    ),
+    Scenario(
+        "genres-delete", "DELETE", "/api/v1/genres/bench-delete-{i}/",
+        ADMIN, status=204,
+    ),
+    Scenario(
+        "genres-bulk", "POST", "/api/v1/genres/bulk/", ADMIN,
+        [{"name": "Пакет {i}", "slug": "bench-bulk-{i}"}], status=201,
+    ),
+    Scenario("reviews-list", "GET", TITLE + "reviews/"),
+    Scenario("reviews-detail", "GET", REVIEW),
+    Scenario(
+        "reviews-update", "PATCH", TITLE + "reviews/{own_review}/", USER,
+        {"text": "Отзыв {i}"},
+    ),
+    Scenario("comments-list", "GET", REVIEW + "comments/"),
+    Scenario("comments-detail", "GET", REVIEW + "comments/{comment}/"),
+    Scenario(
+        "comments-create", "POST", REVIEW + "comments/", USER,
+        {"text": "Комментарий {i}"}, status=201,
+    ),
+    Scenario("users-list", "GET", "/api/v1/users/", ADMIN),
+    Scenario("users-detail", "GET", "/api/v1/users/{username}/", ADMIN),
+    Scenario(
+        "users-create", "POST", "/api/v1/users/", ADMIN,
+        {"username": "bench_admin_{i}", "email": "bench_admin_{i}@yamdb.fake"},
+        status=201,
+    ),
+    Scenario("users-me", "GET", "/api/v1/users/me/", USER),
+    Scenario(
+        "users-me-update", "PATCH", "/api/v1/users/me/", USER,
+        {"bio": "Биография {i}"},
+    ),
+    Scenario(
+        "auth-signup", "POST", "/api/v1/auth/signup/", ANONYMOUS,
+        {"username": "bench_signup_{i}",
+         "email": "bench_signup_{i}@yamdb.fake"},
+    ),
+    Scenario(
+        "auth-token", "POST", "/api/v1/auth/token/", USER,
+        {"username": "{user}"}, status=201,
+    ),
+    Scenario("export-titles", "GET", "/api/v1/export/titles/", ADMIN),
+    Scenario("export-reviews", "GET", "/api/v1/export/reviews/", ADMIN),
+    Scenario("export-comments", "GET", "/api/v1/export/comments/", ADMIN),
+)
+
+
+def get_route_callbacks(patterns=None):
+    """Обработчики всех маршрутов `api.urls`."""
+    if patterns is None:
+        patterns = next(
+            pattern.url_patterns for pattern in get_resolver().url_patterns
+            if isinstance(pattern, URLResolver)
+            and getattr(pattern.urlconf_module, "__name__", "") == "api.urls"
+        )
+    callbacks = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            callbacks |= get_route_callbacks(pattern.url_patterns)
+        else:
+            callbacks.add(pattern.callback)
+    return callbacks
+
+
+def get_uncovered_routes(scenarios, context):
+    """Маршруты API, для которых нет ни одного сценария."""
+    covered = {
+        resolve(scenario.get_path(context, 0).split("?")[0]).func
+        for scenario in scenarios
+    }
+    return get_route_callbacks() - covered
+
+
+def prepare_context(total):
+    """Участники и объекты, на которые ссылаются сценарии.
+
+    `total` - сколько раз будет выполнен каждый сценарий: столько категорий
+    и жанров создается заранее для удаляющих сценариев.
+    """
+    admin = User.objects.create(
+        username="bench_admin", email="bench_admin@yamdb.fake",
+        role=User.ADMIN,
+    )
+    user = User.objects.create(
+        username="bench_user", email="bench_user@yamdb.fake"
+    )
+    # Самое обсуждаемое произведение: на нем видны издержки больших списков.
+    title = Title.objects.order_by("-score_count", "pk").first()
+    review = Review.objects.filter(title=title).order_by("pk").first()
+    comment = Comment.objects.filter(review=review).order_by("pk").first()
+    own_review = Review.objects.create(
+        author=user, title=title, text="Отзыв", score=5
+    )
+    if review is None:
+        review = own_review
+    if comment is None:
+        comment = Comment.objects.create(
+            author=user, review=review, text="Комментарий"
+        )
+    Category.objects.bulk_create(
+        Category(name=f"Удаляемая {i}", slug=f"bench-delete-{i}")
+        for i in range(total)
+    )
+    Genre.objects.bulk_create(
+        Genre(name=f"Удаляемый {i}", slug=f"bench-delete-{i}")
+        for i in range(total)
+    )
+    context = {
+        "title": title.pk,
+        "review": review.pk,
+        "own_review": own_review.pk,
+        "comment": comment.pk,
+        "category": Category.objects.exclude(
+            slug__startswith="bench-"
+        ).values_list("slug", flat=True).first(),
+        "genre": Genre.objects.exclude(
+            slug__startswith="bench-"
+        ).values_list("slug", flat=True).first(),
+        "search": title.name.split()[0],
+        "username": admin.username,
+        "user": user.username,
+    }
+    tokens = {
+        ADMIN: str(RefreshToken.for_user(admin).access_token),
+        USER: str(RefreshToken.for_user(user).access_token),
+    }
+    return context, tokens
+
+
+class ClientTransport:
+    """Запросы через тестовый клиент Django в текущем процессе."""
+
+    name = "client"
+    counts_queries = True
+
+    def __init__(self):
+        self.client = Client(SERVER_NAME="localhost")
+
+    def request(self, method, path, body, token):
+        headers = {}
+        if token:
+            headers["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.generic(
+                method, path, body or "", content_type="application/json",
+                **headers,
+            )
+            if response.streaming:
+                size = sum(map(len, response.streaming_content))
+            else:
+                size = len(response.content)
+        return response.status_code, size, len(queries)
+
+    def close(self):
+        pass
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class WSGITransport:
+    """Запросы по HTTP к WSGI-серверу, запущенному в фоновом потоке."""
+
+    name = "wsgi"
+    counts_queries = False
+
+    def __init__(self):
+        self.server = ThreadedWSGIServer(
+            ("127.0.0.1", 0), QuietRequestHandler, allow_reuse_address=False
+        )
+        self.server.set_app(get_wsgi_application())
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+        self.thread.start()
+
+    def request(self, method, path, body, token):
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        host, port = self.server.server_address[:2]
+        conn = http.client.HTTPConnection(host, port)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            size = len(response.read())
+        finally:
+            conn.close()
+        return response.status, size, None
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    rank = math.ceil(percent / 100 * len(values))
+    return values[max(rank, 1) - 1]
+
+
+def measure(transport, scenario, context, tokens, iterations, warmup=0,
+            concurrency=1, offset=0):
+    """Прогон сценария и его статистика; задержки в миллисекундах.
+
+    Номера запросов начинаются с `offset`, чтобы разные прогоны одного
+    пишущего сценария не пересекались по создаваемым объектам.
+    """
+    token = tokens.get(scenario.principal)
+    timings, sizes, queries, statuses = [], [], [], Counter()
+    lock = threading.Lock()
+
+    def run(indexes, record=True):
+        for i in indexes:
+            path = scenario.get_path(context, i)
+            body = scenario.get_body(context, i)
+            started = time.perf_counter()
+            status, size, count = transport.request(
+                scenario.method, path, body, token
+            )
+            elapsed = time.perf_counter() - started
+            if record:
+                with lock:
+                    timings.append(elapsed * 1000)
+                    sizes.append(size)
+                    statuses[status] += 1
+                    if count is not None:
+                        queries.append(count)
+
+    run(range(offset, offset + warmup), record=False)
+    indexes = range(offset + warmup, offset + warmup + iterations)
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as executor:
+            list(executor.map(
+                run, (indexes[k::concurrency] for k in range(concurrency))
+            ))
+    else:
+        run(indexes)
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    result = {
+        "method": scenario.method,
+        "path": scenario.path,
+        "requests": len(timings),
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "errors": sum(
+            count for status, count in statuses.items()
+            if status != scenario.status
+        ),
+        "throughput": round(len(timings) / elapsed, 2) if elapsed else None,
+        "mean": round(sum(timings) / len(timings), 3),
+        "min": round(timings[0], 3),
+        "max": round(timings[-1], 3),
+        "bytes": round(sum(sizes) / len(sizes)),
+        "queries": (
+            round(sum(queries) / len(queries), 2) if queries else None
+        ),
+    }
+    for percent in PERCENTILES:
+        result[f"p{percent}"] = round(percentile(timings, percent), 3)
+    return result
+
+
+def compare(results, baseline, threshold, metric="p50"):
+    """Регрессии относительно сохраненного прогона.
+
+    Регрессией считается рост `metric` больше чем в (1 + threshold) раз или
+    рост числа запросов к БД.
+    """
+    regressions = []
+    for mode, scenarios in results.items():
+        for name, current in scenarios.items():
+            previous = baseline.get(mode, {}).get(name)
+            if previous is None:
+                continue
+            if current[metric] > previous[metric] * (1 + threshold):
+                regressions.append(
+                    f"{mode} {name}: {metric} {previous[metric]}ms -> "
+                    f"{current[metric]}ms"
+                )
+            if (
+                current.get("queries") is not None
+                and previous.get("queries") is not None
+                and current["queries"] > previous["queries"]
+            ):
+                regressions.append(
+                    f"{mode} {name}: queries {previous['queries']} -> "
+                    f"{current['queries']}"
+                )
+    return regressions
+
+
+SERIALIZATION = (
+    (
+        "titles",
+        TitleSerializer,
+        Title.objects.select_related("category").prefetch_related("genre")
+        .order_by("name", "id"),
+    ),
+    (
+        "reviews",
+        ReviewSerializer,
+        Review.objects.select_related("author").order_by("-pub_date", "-id"),
+    ),
+    (
+        "comments",
+        CommentSerializer,
+        Comment.objects.select_related("author").order_by("-pub_date", "-id"),
+    ),
+)
+
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def measure_serialization(serializer_class, queryset, items, repeat=5):
+    """Стоимость одного объекта страницы в микросекундах.
+
+    `serialize` - только сериализация уже загруженной страницы, `total` -
+    вместе с запросами к БД, как в списке вьюсета. `identical` - совпадают
+    ли ответы ModelSerializer и RowSerializer.
+    """
+    rows = get_row_serializer(serializer_class())
+    objects = queryset[:items]
+    values = rows.get_queryset(queryset)[:items]
+    loaded = list(objects)
+    page = rows.prefetch(list(values))
+    count = len(loaded)
+    if not count:
+        return None
+
+    def per_item(seconds):
+        return round(seconds / count * 10 ** 6, 3)
+
+    result = {
+        "items": count,
+        "identical": (
+            rows.to_representation(page)
+            == serializer_class(loaded, many=True).data
+        ),
+        "model": {
+            "serialize": per_item(best_time(
+                lambda: serializer_class(loaded, many=True).data, repeat
+            )),
+            "total": per_item(best_time(
+                lambda: serializer_class(list(objects.all()), many=True).data,
+                repeat,
+            )),
+        },
+        "rows": {
+            "serialize": per_item(best_time(
+                lambda: rows.to_representation(page), repeat
+            )),
+            "total": per_item(best_time(
+                lambda: rows.serialize(values.all()), repeat
+            )),
+        },
+    }
+    result["speedup"] = round(
+        result["model"]["serialize"] / result["rows"]["serialize"], 2
+    )
+    return result
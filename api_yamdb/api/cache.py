@@ -0,0 +1,167 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe, urlencode
+
+GENERATION_KEY = "generation:{}"
+RESPONSE_KEY = "response:{}"
+CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Vary", "Allow")
+# Ресурс без своей модели: имена авторов в отзывах и комментариях. Меняется
+# при смене username или удалении пользователя, а не при любой записи в User.
+AUTHORS = "authors"
+
+stats = {"hits": 0, "misses": 0}
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE["ALIAS"]]
+
+
+def resource_name(model):
+    """Имя ресурса, поколение которого меняется при записи модели."""
+    if isinstance(model, str):
+        return model
+    return model._meta.model_name
+
+
+def get_generations(*models):
+    """Текущие поколения ресурсов.
+
+    Поколение - время последней записи в наносекундах. Если счетчик вытеснен
+    из кэша, он заводится заново текущим временем, поэтому старые записи
+    ответов никогда не совпадут с новым ключом.
+    """
+    cache = get_cache()
+    keys = [GENERATION_KEY.format(resource_name(model)) for model in models]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump(*models):
+    """Сброс закэшированных ответов, зависящих от моделей.
+
+    Поколение меняется после коммита: иначе параллельный запрос успел бы
+    положить в кэш старые данные уже под новым ключом.
+    """
+    def set_generations():
+        now = time.time_ns()
+        get_cache().set_many(
+            {
+                GENERATION_KEY.format(resource_name(model)): now
+                for model in models
+            },
+            timeout=None,
+        )
+
+    transaction.on_commit(set_generations)
+
+
+def get_fingerprint(request, generations, media_type=None):
+    """Отпечаток запроса: адрес, нормализованные параметры и поколения.
+
+    `media_type` нужен для обычного HttpRequest, у которого нет результата
+    согласования формата DRF.
+    """
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    raw = "|".join((
+        request.scheme,
+        request.get_host(),
+        request.path,
+        query,
+        media_type or request.accepted_media_type,
+        *map(str, generations),
+    ))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def get_response_key(request, models, media_type=None):
+    return RESPONSE_KEY.format(
+        get_fingerprint(request, get_generations(*models), media_type)
+    )
+
+
+def get_cached_response(request, key):
+    """Ответ из кэша или None; условный запрос получает 304."""
+    cached = get_cache().get(key)
+    if cached is None:
+        return None
+    stats["hits"] += 1
+    content, headers = cached
+    response = HttpResponse(content)
+    for header, value in headers.items():
+        response[header] = value
+    response["X-Cache"] = "HIT"
+    response = get_conditional_response(
+        request,
+        etag=response.get("ETag"),
+        last_modified=parse_http_date_safe(response.get("Last-Modified", "")),
+        response=response,
+    )
+    # 304 не копирует Allow, а DRF добавил бы его к ответу представления.
+    if "Allow" in headers:
+        response["Allow"] = headers["Allow"]
+    return response
+
+
+class CachedResponseMixin:
+    """Кэширование ответов list/retrieve для анонимных пользователей.
+
+    Ключ строится из пути, нормализованных параметров запроса и поколений
+    моделей (или ресурсов вроде AUTHORS) из `cache_models`, поэтому любая
+    запись в эти модели делает старые ответы недостижимыми. Вместе с телом
+    хранятся ETag и Last-Modified, так что условный запрос при попадании в
+    кэш отвечает 304 без обращения к БД.
+    """
+
+    cache_models = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def is_cacheable(self, request):
+        return (
+            request.method in ("GET", "HEAD")
+            and request.accepted_renderer.format == "json"
+            and not request.user.is_authenticated
+        )
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return handler(request, *args, **kwargs)
+        cache = get_cache()
+        key = get_response_key(request, self.cache_models)
+        response = get_cached_response(request, key)
+        if response is not None:
+            return response
+
+        stats["misses"] += 1
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            def store(rendered):
+                headers = {
+                    header: rendered[header]
+                    for header in CACHED_HEADERS if rendered.has_header(header)
+                }
+                cache.set(
+                    key,
+                    (rendered.content, headers),
+                    settings.RESPONSE_CACHE["TIMEOUT"],
+                )
+
+            response.add_post_render_callback(store)
+        response["X-Cache"] = "MISS"
+        return response
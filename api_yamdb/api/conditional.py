@@ -0,0 +1,96 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags
+from rest_framework import exceptions, permissions
+
+from .cache import get_fingerprint, get_generations
+
+
+class PreconditionFailed(exceptions.APIException):
+    status_code = 412
+    default_detail = "Объект был изменен другим запросом."
+    default_code = "precondition_failed"
+
+
+class ConditionalResponseMixin:
+    """ETag и Last-Modified для list/retrieve, If-Match для записи.
+
+    Валидаторы считаются без сериализации: для списка - из поколений моделей
+    `cache_models`, для объекта - из значений его полей в строке таблицы и
+    поколений связанных моделей. Last-Modified - время последней записи в
+    любую из моделей `cache_models`. If-None-Match и If-Modified-Since
+    проверяются до сериализации и отдают 304.
+    """
+
+    cache_models = ()
+
+    def list(self, request, *args, **kwargs):
+        generations = get_generations(*self.cache_models)
+        etag = f'"{get_fingerprint(request, generations)}"'
+        return self.get_conditional_response(
+            request, etag, max(generations), super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return self.get_conditional_response(
+            request,
+            self.get_object_etag(instance),
+            max(get_generations(*self.cache_models)),
+            super().retrieve,
+            *args,
+            **kwargs,
+        )
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        response["ETag"] = self.get_object_etag(self.get_object())
+        return response
+
+    def get_object(self):
+        if getattr(self, "_object", None) is None:
+            self._object = super().get_object()
+            if self.request.method not in permissions.SAFE_METHODS:
+                self.check_if_match(self._object)
+        return self._object
+
+    def get_object_etag(self, instance):
+        """ETag объекта по его полям и поколениям связанных моделей."""
+        related = [
+            model for model in self.cache_models
+            if isinstance(model, str) or not isinstance(instance, model)
+        ]
+        deferred = instance.get_deferred_fields()
+        raw = "|".join(map(str, (
+            type(instance)._meta.label,
+            *(
+                getattr(instance, field.attname)
+                for field in instance._meta.concrete_fields
+                if field.attname not in deferred
+            ),
+            *get_generations(*related),
+        )))
+        return f'"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+    def check_if_match(self, instance):
+        header = self.request.META.get("HTTP_IF_MATCH")
+        if header is None:
+            return
+        etags = parse_etags(header)
+        if "*" not in etags and self.get_object_etag(instance) not in etags:
+            raise PreconditionFailed()
+
+    def get_conditional_response(self, request, etag, generation, handler,
+                                 *args, **kwargs):
+        last_modified = generation // 10 ** 9
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return response
@@ -0,0 +1,266 @@
+"""ASGI-приложение с быстрым путем для анонимного чтения.
+
+Анонимные GET и HEAD к маршрутам из ASGI_FAST_PATH["ROUTES"] отдаются
+прямо из кэша ответов (см. api.cache) без DRF и без БД: проверяются только
+троттлинг и middleware проекта, поэтому тело и заголовки совпадают с
+ответом представления. Промахи кэша, запись и запросы с авторизацией
+передаются WSGI-приложению Django в пуле потоков. Тело запроса читается
+и ответ отправляется в цикле событий, поэтому медленный клиент не держит
+поток, пока его ответ не готов.
+"""
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import DisallowedHost
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import Resolver404, resolve
+from django.utils.module_loading import import_string
+from rest_framework.request import Request
+
+from .cache import CachedResponseMixin, get_cached_response, get_response_key
+
+FAST_METHODS = ("GET", "HEAD")
+JSON = "application/json"
+# Accept, при которых DRF выбирает JSONRenderer с media type JSON.
+JSON_ACCEPT = ("", "*/*", JSON)
+
+
+def get_environ(scope, body):
+    """WSGI environ по ASGI scope, как его собрал бы WSGI-сервер."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", ()):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = f"HTTP_{name}"
+        if name in environ:
+            value = f"{environ[name]},{value}"
+        environ[name] = value
+    # Тело уже прочитано целиком, в том числе при chunked-передаче.
+    environ.setdefault("CONTENT_LENGTH", str(len(body)))
+    return environ
+
+
+def get_response_headers(response):
+    headers = [
+        (header.encode("latin-1"), value.encode("latin-1"))
+        for header, value in response.items()
+    ]
+    headers += [
+        (b"Set-Cookie", cookie.output(header="").strip().encode("latin-1"))
+        for cookie in response.cookies.values()
+    ]
+    return headers
+
+
+class FastPathApplication:
+    """ASGI-обертка над WSGI-приложением Django."""
+
+    def __init__(self, wsgi_application):
+        self.wsgi_application = wsgi_application
+        self.routes = set(settings.ASGI_FAST_PATH["ROUTES"])
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.ASGI_FAST_PATH["THREADS"],
+            thread_name_prefix="asgi",
+        )
+        # Middleware проекта применяются и к ответам из кэша: они добавляют
+        # заголовки вроде X-Frame-Options и Content-Length.
+        self.middleware = [
+            import_string(path)() for path in settings.MIDDLEWARE
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported scope type: {scope['type']}")
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def http(self, scope, receive, send):
+        body = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        environ = get_environ(scope, b"".join(body))
+        loop = asyncio.get_running_loop()
+
+        response = None
+        if self.is_fast_path(scope):
+            response = await loop.run_in_executor(
+                self.executor, self.get_fast_response, environ
+            )
+        if response is None:
+            response = await loop.run_in_executor(
+                self.executor, self.call_wsgi, environ, scope, send, loop
+            )
+        if response is not None:
+            await self.send_response(scope, send, *response)
+
+    def is_fast_path(self, scope):
+        """Дешевая проверка по scope до разбора запроса."""
+        if scope["method"] not in FAST_METHODS:
+            return False
+        headers = dict(scope.get("headers", ()))
+        return (
+            b"authorization" not in headers
+            and headers.get(b"accept", b"").decode("latin-1") in JSON_ACCEPT
+            and b"format=" not in scope.get("query_string", b"")
+        )
+
+    def get_view(self, request):
+        """Представление маршрута быстрого пути или None."""
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        view_class = getattr(match.func, "cls", None)
+        actions = getattr(match.func, "actions", None) or {}
+        action = actions.get(request.method.lower())
+        if (
+            match.url_name not in self.routes
+            or view_class is None
+            or not issubclass(view_class, CachedResponseMixin)
+            or action not in ("list", "retrieve")
+        ):
+            return None
+        request.resolver_match = match
+        view = view_class(**match.func.initkwargs)
+        view.action = action
+        view.args, view.kwargs = match.args, match.kwargs
+        return view
+
+    def get_fast_response(self, environ):
+        """Статус, заголовки и тело ответа из кэша или None для WSGI.
+
+        Выполняется в пуле потоков: бэкенд кэша может ходить по сети.
+        """
+        request = WSGIRequest(environ)
+        view = self.get_view(request)
+        if view is None:
+            return None
+        if not self.process_request(request):
+            return None
+        response = get_cached_response(
+            request, get_response_key(request, view.cache_models, JSON)
+        )
+        # Троттлинг проверяется только при попадании: промах посчитает
+        # представление. Отказ тоже отдает представление - с Retry-After.
+        if response is None or self.is_throttled(view, request):
+            return None
+        for middleware in reversed(self.middleware):
+            if hasattr(middleware, "process_response"):
+                response = middleware.process_response(request, response)
+        return (
+            response.status_code,
+            get_response_headers(response),
+            response.content,
+        )
+
+    def process_request(self, request):
+        """False, если middleware сами отвечают на запрос."""
+        for middleware in self.middleware:
+            if not hasattr(middleware, "process_request"):
+                continue
+            try:
+                if middleware.process_request(request) is not None:
+                    return False
+            except DisallowedHost:
+                return False
+        return True
+
+    def is_throttled(self, view, request):
+        view.request = Request(request)
+        return not all(
+            throttle.allow_request(view.request, view)
+            for throttle in view.get_throttles()
+        )
+
+    def call_wsgi(self, environ, scope, send, loop):
+        """Вызов WSGI-приложения в потоке пула.
+
+        Обычный ответ Django собирается целиком и возвращается циклу
+        событий, так что поток освобождается до отправки клиенту. Потоковый
+        ответ (выгрузки) читается в этом же потоке и отправляется по частям.
+        """
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started["status"] = int(status.split(" ", 1)[0])
+            started["headers"] = [
+                (header.encode("latin-1"), value.encode("latin-1"))
+                for header, value in headers
+            ]
+
+        def run(coroutine):
+            return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            if not getattr(result, "streaming", False):
+                return started["status"], started["headers"], b"".join(result)
+            run(self.send_start(send, started["status"], started["headers"]))
+            for chunk in result:
+                if chunk and scope["method"] != "HEAD":
+                    run(self.send_body(send, chunk, more_body=True))
+            run(self.send_body(send, b""))
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        return None
+
+    async def send_start(self, send, status, headers):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": headers,
+        })
+
+    async def send_body(self, send, body, more_body=False):
+        await send({
+            "type": "http.response.body",
+            "body": body,
+            "more_body": more_body,
+        })
+
+    async def send_response(self, scope, send, status, headers, content):
+        await self.send_start(send, status, headers)
+        if scope["method"] == "HEAD":
+            content = b""
+        await self.send_body(send, content)
@@ -1,12 +1,74 @@
 from django_filters import rest_framework as filters
-from reviews.models import Title
+from django_filters.constants import EMPTY_VALUES
+from reviews.models import Comment, Review, Title
+from reviews.search import filter_contains, search_titles
+
+
+class ContainsFilter(filters.CharFilter):
+    """Подстрока без учета регистра, в том числе кириллицы на SQLite."""
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        if self.distinct:
+            qs = qs.distinct()
+        return filter_contains(qs, self.field_name, value)
 
 
 class CustomSearchFilter(filters.FilterSet):
     genre = filters.CharFilter(field_name="genre__slug")
     category = filters.CharFilter(field_name="category__slug")
-    name = filters.CharFilter(field_name="name", lookup_expr="contains")
+    name = ContainsFilter(field_name="name")
+    search = filters.CharFilter(method="filter_search")
 
     class Meta:
         model = Title
-        fields = ("genre", "category", "year", "name")
+        fields = ("genre", "category", "year", "name", "search")
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию с ранжированием."""
+        return search_titles(queryset, value)
+
+
+class TitleExportFilter(CustomSearchFilter):
+    """Фильтр выгрузки произведений."""
+
+    since = filters.IsoDateTimeFilter(field_name="updated", lookup_expr="gte")
+
+    class Meta(CustomSearchFilter.Meta):
+        fields = CustomSearchFilter.Meta.fields + ("since",)
+
+
+class ReviewExportFilter(filters.FilterSet):
+    """Фильтр выгрузки отзывов по полям произведения."""
+
+    genre = filters.CharFilter(field_name="title__genre__slug")
+    category = filters.CharFilter(field_name="title__category__slug")
+    year = filters.NumberFilter(field_name="title__year")
+    name = ContainsFilter(field_name="title__name")
+    since = filters.IsoDateTimeFilter(
+        field_name="pub_date", lookup_expr="gte"
+    )
+
+    class Meta:
+        model = Review
+        fields = ("title", "genre", "category", "year", "name", "since")
+
+
+class CommentExportFilter(filters.FilterSet):
+    """Фильтр выгрузки комментариев по полям произведения."""
+
+    title = filters.NumberFilter(field_name="review__title")
+    genre = filters.CharFilter(field_name="review__title__genre__slug")
+    category = filters.CharFilter(field_name="review__title__category__slug")
+    year = filters.NumberFilter(field_name="review__title__year")
+    name = ContainsFilter(field_name="review__title__name")
+    since = filters.IsoDateTimeFilter(
+        field_name="pub_date", lookup_expr="gte"
+    )
+
+    class Meta:
+        model = Comment
+        fields = (
+            "review", "title", "genre", "category", "year", "name", "since"
+        )
@@ -0,0 +1,178 @@
+import json
+import platform
+import time
+
+import django
+from api.benchmark import (SCENARIOS, ClientTransport, WSGITransport, compare,
+                           get_uncovered_routes, measure, prepare_context)
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (override_settings, setup_databases,
+                               teardown_databases)
+from reviews.management.commands.generate_data import generate
+
+TRANSPORTS = {
+    ClientTransport.name: ClientTransport,
+    WSGITransport.name: WSGITransport,
+}
+
+
+def get_unthrottled():
+    """Настройки DRF без лимитов: scope с rate None не ограничивается."""
+    config = settings.REST_FRAMEWORK
+    return {
+        **config,
+        "DEFAULT_THROTTLE_RATES": dict.fromkeys(
+            config.get("DEFAULT_THROTTLE_RATES", {})
+        ),
+    }
+
+
+class Command(BaseCommand):
+    """Замер задержек, пропускной способности и числа запросов к БД.
+
+    По умолчанию создается отдельная тестовая БД, которая наполняется
+    данными заданного размера и удаляется после прогона. Результаты
+    пишутся в JSON; с --baseline команда завершается ошибкой, если
+    какой-либо сценарий стал медленнее порога или делает больше запросов.
+    Лимиты запросов на время прогона снимаются: сценарии регистрации и
+    получения токена шлют с одного адреса больше запросов, чем разрешено.
+    """
+
+    help = "Benchmarking API endpoints in-process and over WSGI."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale", type=float, default=0.02,
+            help="Size of the seeded dataset, see generate_data.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--iterations", type=int, default=100,
+            help="Measured requests per scenario.",
+        )
+        parser.add_argument(
+            "--warmup", type=int, default=10,
+            help="Unmeasured requests per scenario.",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=1,
+            help="Parallel connections for the WSGI server.",
+        )
+        parser.add_argument(
+            "--transports", nargs="+", choices=list(TRANSPORTS),
+            default=list(TRANSPORTS),
+        )
+        parser.add_argument(
+            "--scenarios", nargs="+",
+            choices=[scenario.name for scenario in SCENARIOS],
+            help="Run only the given scenarios.",
+        )
+        parser.add_argument(
+            "--output", default="benchmark.json",
+            help="Where to write the JSON results.",
+        )
+        parser.add_argument(
+            "--baseline",
+            help="JSON results to compare against.",
+        )
+        parser.add_argument(
+            "--threshold", type=float, default=0.2,
+            help="Allowed relative slowdown against the baseline.",
+        )
+        parser.add_argument(
+            "--metric", default="p50",
+            choices=("p50", "p90", "p95", "p99", "mean"),
+            help="Latency metric compared against the baseline.",
+        )
+        parser.add_argument(
+            "--in-place", action="store_true",
+            help="Use the configured database instead of a throwaway one. "
+                 "The benchmark writes to it.",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as file:
+                baseline = json.load(file)["results"]
+
+        old_config = None
+        if not options["in_place"]:
+            old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(REST_FRAMEWORK=get_unthrottled()):
+                results = self.run(options)
+        finally:
+            if old_config is not None:
+                teardown_databases(old_config, verbosity=0)
+
+        report = {
+            "meta": {
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                **{
+                    name: options[name] for name in (
+                        "scale", "seed", "iterations", "warmup",
+                        "concurrency",
+                    )
+                },
+            },
+            "results": results,
+        }
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f"Results written to {options['output']}")
+
+        errors = [
+            f"{mode} {name}: {result['errors']} unexpected responses"
+            for mode, scenarios in results.items()
+            for name, result in scenarios.items() if result["errors"]
+        ]
+        if baseline is not None:
+            errors += compare(
+                results, baseline, options["threshold"], options["metric"]
+            )
+        if errors:
+            raise CommandError("\n".join(errors))
+
+    def run(self, options):
+        scenarios = [
+            scenario for scenario in SCENARIOS
+            if not options["scenarios"]
+            or scenario.name in options["scenarios"]
+        ]
+        total = options["warmup"] + options["iterations"]
+        generate(options["scale"], options["seed"])
+        context, tokens = prepare_context(total * len(options["transports"]))
+        if not options["scenarios"]:
+            uncovered = get_uncovered_routes(scenarios, context)
+            if uncovered:
+                raise CommandError(f"Routes without scenarios: {uncovered}")
+
+        results = {}
+        for index, mode in enumerate(options["transports"]):
+            transport = TRANSPORTS[mode]()
+            results[mode] = {}
+            try:
+                for scenario in scenarios:
+                    result = measure(
+                        transport, scenario, context, tokens,
+                        options["iterations"], options["warmup"],
+                        options["concurrency"] if mode == "wsgi" else 1,
+                        offset=index * total,
+                    )
+                    results[mode][scenario.name] = result
+                    self.stdout.write(
+                        f"{mode:6} {scenario.name:20} "
+                        f"p50={result['p50']:8.2f}ms "
+                        f"p99={result['p99']:8.2f}ms "
+                        f"{result['throughput']:8.1f} req/s "
+                        f"queries={result['queries']}"
+                    )
+            finally:
+                transport.close()
+        return results
@@ -0,0 +1,80 @@
+import json
+
+from api.benchmark import SERIALIZATION, measure_serialization
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, teardown_databases
+from reviews.management.commands.generate_data import generate
+
+
+class Command(BaseCommand):
+    """Стоимость сериализации объекта списка: ModelSerializer и RowSerializer.
+
+    Как и benchmark, по умолчанию работает на отдельной тестовой БД,
+    наполненной generate_data. Для каждого списка печатается время на
+    объект в микросекундах: только сериализация и вместе с запросами к БД.
+    """
+
+    help = "Per-item serialization cost of ModelSerializer and RowSerializer."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale", type=float, default=0.02,
+            help="Size of the seeded dataset, see generate_data. "
+                 "0 measures the existing data.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--items", type=int, default=1000,
+            help="Objects per serialized page.",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5,
+            help="Runs per measurement, the best one is reported.",
+        )
+        parser.add_argument("--output", help="Where to write JSON results.")
+        parser.add_argument(
+            "--in-place", action="store_true",
+            help="Use the configured database instead of a throwaway one.",
+        )
+
+    def handle(self, *args, **options):
+        old_config = None
+        if not options["in_place"]:
+            old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            if options["scale"]:
+                generate(options["scale"], options["seed"])
+            results = {
+                name: measure_serialization(
+                    serializer_class, queryset, options["items"],
+                    options["repeat"],
+                )
+                for name, serializer_class, queryset in SERIALIZATION
+            }
+        finally:
+            if old_config is not None:
+                teardown_databases(old_config, verbosity=0)
+
+        for name, result in results.items():
+            if result is None:
+                self.stdout.write(f"{name:10} no objects")
+                continue
+            self.stdout.write(
+                f"{name:10} items={result['items']:6} "
+                f"model={result['model']['serialize']:8.2f}us "
+                f"rows={result['rows']['serialize']:8.2f}us "
+                f"x{result['speedup']:<6} "
+                f"with queries: model={result['model']['total']:8.2f}us "
+                f"rows={result['rows']['total']:8.2f}us"
+            )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(results, file, indent=2)
+        mismatched = [
+            name for name, result in results.items()
+            if result is not None and not result["identical"]
+        ]
+        if mismatched:
+            raise CommandError(
+                f"RowSerializer output differs for: {', '.join(mismatched)}"
+            )
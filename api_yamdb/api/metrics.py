@@ -0,0 +1,347 @@
+"""Метрики запросов в текстовом формате Prometheus.
+
+MetricsMiddleware учитывает каждый запрос, в том числе отданный быстрым
+путем ASGI: гистограммы времени, размера ответа и числа SQL-запросов по
+маршруту и методу, отказы троттлинга и ошибки аутентификации. Число
+SQL-запросов берется из ProfilingMiddleware (api.profiling).
+
+Запись - несколько операций со словарями процесса под одной блокировкой.
+Если задан METRICS["DIR"], процесс не чаще раза в FLUSH_INTERVAL секунд
+сохраняет снимок своих метрик в файл <pid>-<время запуска>.json этого
+каталога, а представление metrics складывает снимки всех процессов.
+Счетчики завершившихся процессов переносятся в archive.json, чтобы суммы
+не уменьшались, их показатели (gauge) отбрасываются.
+"""
+import bisect
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+from users import outbox
+
+from api_yamdb import pool
+
+from . import cache
+
+HISTOGRAMS = {
+    "yamdb_http_request_duration_seconds": (
+        "Время обработки запроса, с",
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    "yamdb_http_response_size_bytes": (
+        "Размер тела ответа, байт",
+        (100, 1000, 10000, 100000, 1000000, 10000000),
+    ),
+    "yamdb_http_db_queries": (
+        "Число SQL-запросов при обработке запроса",
+        (0, 1, 2, 3, 5, 10, 20, 50, 100),
+    ),
+}
+COUNTERS = {
+    "yamdb_http_requests_total": "Запросы по статусу ответа",
+    "yamdb_throttled_requests_total": "Запросы, отклоненные троттлингом",
+    "yamdb_auth_failures_total": "Неудачные попытки аутентификации",
+    "yamdb_response_cache_total": "Обращения к кэшу ответов",
+    "yamdb_db_pool_events_total": "События пулов соединений с БД",
+}
+GAUGES = {
+    "yamdb_db_pool_connections": "Соединения пулов по состоянию",
+    "yamdb_email_outbox_depth": "Неотправленные письма",
+    "yamdb_email_outbox_lag_seconds": "Возраст старейшего неотправленного",
+    "yamdb_email_outbox_dead": "Письма с исчерпанными попытками",
+}
+POOL_EVENTS = ("created", "reused", "waits", "timeouts", "errors", "discarded")
+POOL_STATES = ("idle", "in_use", "max_size")
+METHODS = ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+# Маршруты получения токена: ответ 4xx - неверный код подтверждения.
+TOKEN_ROUTES = ("token",)
+ARCHIVE = "archive.json"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Registry:
+    """Метрики текущего процесса."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.histograms = {}
+        self.name = f"{os.getpid()}-{time.time_ns()}.json"
+        self.flushed = time.monotonic()
+
+    def observe(self, name, labels, value):
+        """Наблюдение гистограммы, вызывается под блокировкой."""
+        histogram = self.histograms.get((name, labels))
+        if histogram is None:
+            histogram = self.histograms[name, labels] = [
+                [0] * (len(HISTOGRAMS[name][1]) + 1), 0.0
+            ]
+        histogram[0][bisect.bisect_left(HISTOGRAMS[name][1], value)] += 1
+        histogram[1] += value
+
+    def record(self, route, method, status, duration, size, queries):
+        labels = (("route", route), ("method", method))
+        with self.lock:
+            self.counters[
+                "yamdb_http_requests_total",
+                labels + (("status", str(status)),),
+            ] += 1
+            self.observe("yamdb_http_request_duration_seconds", labels,
+                         duration)
+            if size is not None:
+                self.observe("yamdb_http_response_size_bytes", labels, size)
+            self.observe("yamdb_http_db_queries", labels, queries)
+            if status == 429:
+                self.counters["yamdb_throttled_requests_total", labels] += 1
+            if status == 401 or (
+                route in TOKEN_ROUTES and 400 <= status < 500
+            ):
+                self.counters["yamdb_auth_failures_total", labels] += 1
+        if settings.METRICS["DIR"] and (
+            time.monotonic() - self.flushed
+            >= settings.METRICS["FLUSH_INTERVAL"]
+        ):
+            self.flush()
+
+    def get_snapshot(self):
+        """Метрики процесса в виде, пригодном для JSON."""
+        with self.lock:
+            counters = [
+                [name, labels, value]
+                for (name, labels), value in self.counters.items()
+            ]
+            histograms = [
+                [name, labels, list(counts), total]
+                for (name, labels), (counts, total) in self.histograms.items()
+            ]
+        gauges = []
+        for result, key in (("hit", "hits"), ("miss", "misses")):
+            counters.append([
+                "yamdb_response_cache_total", (("result", result),),
+                cache.stats[key],
+            ])
+        for alias, stats in pool.get_stats().items():
+            for event in POOL_EVENTS:
+                counters.append([
+                    "yamdb_db_pool_events_total",
+                    (("alias", alias), ("event", event)), stats[event],
+                ])
+            for state in POOL_STATES:
+                gauges.append([
+                    "yamdb_db_pool_connections",
+                    (("alias", alias), ("state", state)), stats[state],
+                ])
+        return {
+            "counters": counters, "histograms": histograms, "gauges": gauges
+        }
+
+    def flush(self):
+        self.flushed = time.monotonic()
+        directory = settings.METRICS["DIR"]
+        os.makedirs(directory, exist_ok=True)
+        write(os.path.join(directory, self.name), self.get_snapshot())
+
+
+registry = Registry()
+os.register_at_fork(after_in_child=registry.reset)
+
+
+def write(path, snapshot):
+    """Атомарная запись: читатель не увидит файл наполовину."""
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(snapshot, file)
+    os.replace(temporary, path)
+
+
+def read(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def is_alive(path):
+    pid = int(os.path.basename(path).split("-", 1)[0])
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge(snapshots):
+    """Сумма снимков: {"counters": {(name, labels): value}, ...}."""
+    merged = {
+        "counters": defaultdict(float),
+        "histograms": {},
+        "gauges": defaultdict(float),
+    }
+    for snapshot in snapshots:
+        for kind in ("counters", "gauges"):
+            for name, labels, value in snapshot.get(kind, ()):
+                merged[kind][name, tuple(map(tuple, labels))] += value
+        for name, labels, counts, total in snapshot["histograms"]:
+            if name not in HISTOGRAMS:
+                continue
+            key = name, tuple(map(tuple, labels))
+            current = merged["histograms"].get(key)
+            if current is None:
+                merged["histograms"][key] = [list(counts), total]
+            elif len(current[0]) == len(counts):
+                # Снимки с другими границами корзин пропускаются.
+                current[0] = [a + b for a, b in zip(current[0], counts)]
+                current[1] += total
+    return merged
+
+
+def collect():
+    """Метрики всех процессов, сложенные вместе."""
+    directory = settings.METRICS["DIR"]
+    if not directory:
+        return merge([registry.get_snapshot()])
+    registry.flush()
+    with open(os.path.join(directory, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive = os.path.join(directory, ARCHIVE)
+        snapshots = [read(archive) or {"counters": [], "histograms": []}]
+        dead = []
+        for path in glob.glob(os.path.join(directory, "*-*.json")):
+            snapshot = read(path)
+            if snapshot is None:
+                continue
+            if is_alive(path):
+                snapshots.append(snapshot)
+            else:
+                snapshot.pop("gauges")
+                dead.append(path)
+                snapshots[0] = to_snapshot(merge([snapshots[0], snapshot]))
+        if dead:
+            write(archive, snapshots[0])
+            for path in dead:
+                os.remove(path)
+    return merge(snapshots)
+
+
+def to_snapshot(merged):
+    """Снимок без показателей из результата merge."""
+    return {
+        "counters": [
+            [name, labels, value]
+            for (name, labels), value in merged["counters"].items()
+        ],
+        "histograms": [
+            [name, labels, counts, total]
+            for (name, labels), (counts, total)
+            in merged["histograms"].items()
+        ],
+    }
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{%s}" % ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace("\n", "\\n")
+            .replace('"', '\\"'),
+        )
+        for name, value in labels
+    )
+
+
+def format_value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render(merged):
+    """Текстовый формат Prometheus 0.0.4."""
+    lines = []
+    for name, (description, buckets) in HISTOGRAMS.items():
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+        for (metric, labels), (counts, total) in sorted(
+            merged["histograms"].items()
+        ):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ("+Inf",), counts):
+                cumulative += count
+                bound = bound if bound == "+Inf" else format_value(bound)
+                lines.append(
+                    f"{name}_bucket"
+                    f"{format_labels(labels + (('le', bound),))} {cumulative}"
+                )
+            lines.append(
+                f"{name}_sum{format_labels(labels)} {format_value(total)}"
+            )
+            lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+    for kind, metrics in (("counter", COUNTERS), ("gauge", GAUGES)):
+        values = merged["counters" if kind == "counter" else "gauges"]
+        for name, description in metrics.items():
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+            lines += [
+                f"{name}{format_labels(labels)} {format_value(value)}"
+                for (metric, labels), value in sorted(values.items())
+                if metric == name
+            ]
+    return "\n".join(lines) + "\n"
+
+
+def metrics(request):
+    """Метрики всех процессов для Prometheus.
+
+    Очередь писем общая для процессов, поэтому читается из БД при опросе.
+    """
+    merged = collect()
+    stats = outbox.get_stats()
+    for name, value in (
+        ("yamdb_email_outbox_depth", "depth"),
+        ("yamdb_email_outbox_lag_seconds", "lag"),
+        ("yamdb_email_outbox_dead", "dead"),
+    ):
+        merged["gauges"][name, ()] = stats[value]
+    return HttpResponse(render(merged), content_type=CONTENT_TYPE)
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """Учет запроса в метриках, ставится первым в MIDDLEWARE."""
+
+    def process_request(self, request):
+        request.metrics_started = time.perf_counter()
+
+    def process_response(self, request, response):
+        started = getattr(request, "metrics_started", None)
+        if started is None:
+            return response
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            # Без маршрута метка не нужна: иначе ее значения не ограничены.
+            route = "unmatched"
+        else:
+            route = match.view_name or match.route
+        profile = getattr(request, "profile", None)
+        registry.record(
+            route,
+            request.method if request.method in METHODS else "other",
+            response.status_code,
+            time.perf_counter() - started,
+            None if response.streaming else len(response.content),
+            profile.queries if profile is not None else 0,
+        )
+        return response
@@ -1,4 +1,15 @@
-from rest_framework import mixins
+from django.core.exceptions import ValidationError
+from django.db import connections, transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import mixins, response, status
+from rest_framework.decorators import action
+from rest_framework.validators import UniqueValidator
+
+from . import cache
+from .pagination import get_cursor_ordering
+from .rows import get_row_serializer
+from .serializers import FIELDS_PARAM, OMIT_PARAM
 
 
 class CreateDestroyListModelMixin(
@@ -7,3 +18,359 @@ class CreateDestroyListModelMixin(
     mixins.ListModelMixin
 ):
     pass
+
+
+class SparseQuerySetMixin:
+    """Запрос только за полями, оставленными ?fields= и ?omit=.
+
+    При чтении загружаются столбцы полей ответа, первичный ключ, поле поиска
+    и поля сортировки (по ним строится курсор). select_related и
+    prefetch_related остаются только для запрошенных связей, поэтому без
+    связанного поля не будет ни соединения, ни дополнительного запроса.
+    Поля сериализатора без своего столбца (например, рейтинг по сумме и
+    числу оценок) описываются в `Meta.sparse_sources` сериализатора.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ("list", "retrieve") or not any(
+            param in self.request.query_params
+            for param in (FIELDS_PARAM, OMIT_PARAM)
+        ):
+            return queryset
+        serializer = self.get_serializer()
+        return self.get_sparse_queryset(
+            queryset,
+            serializer.fields,
+            getattr(serializer.Meta, "sparse_sources", {}),
+        )
+
+    def get_sparse_queryset(self, queryset, fields, sources):
+        opts = queryset.model._meta
+        only = {opts.pk.name, self.lookup_field}
+        only.update(name for name, _ in get_cursor_ordering(queryset, self))
+        only.discard("pk")
+        select, prefetch = set(), set()
+        for name, field in fields.items():
+            for path in sources.get(name, (field.source,)):
+                if "__" in path:
+                    select.add(path.rsplit("__", 1)[0])
+                    only.add(path)
+                elif opts.get_field(path).many_to_many:
+                    prefetch.add(path)
+                else:
+                    if opts.get_field(path).is_relation:
+                        select.add(path)
+                    only.add(path)
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if select:
+            queryset = queryset.select_related(*select)
+        return queryset.prefetch_related(*prefetch).only(*only)
+
+
+class RowListMixin:
+    """Список из строк values() через RowSerializer (api.rows).
+
+    Ответ совпадает с ответом сериализатора вьюсета, но без экземпляров
+    моделей и вызова полей на каждый объект. Если сериализатор содержит
+    неподдерживаемые поля, список строится как обычно. Объект (retrieve)
+    по-прежнему загружается моделью: по нему считаются ETag и If-Match.
+    """
+
+    def list(self, request, *args, **kwargs):
+        rows = get_row_serializer(self.get_serializer())
+        if rows is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = rows.get_queryset(
+            queryset,
+            [name for name, _ in get_cursor_ordering(queryset, self)],
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(rows.serialize(page))
+        return response.Response(rows.serialize(queryset))
+
+
+class NestedRouteMixin:
+    """Разрешение вложенных маршрутов одним запросом.
+
+    `parent_lookups` сопоставляет параметры URL с полями родителя, так что
+    вся цепочка (например, отзыв и его произведение) проверяется одним
+    запросом с 404 при несовпадении. Родитель загружается один раз и
+    используется в get_queryset и perform_create. Для операций над одним
+    объектом родитель не загружается: цепочка проверяется фильтром в том же
+    запросе, что и сам объект.
+    """
+
+    parent_model = None
+    parent_field = None
+    parent_lookups = {}
+
+    def get_parent(self):
+        if getattr(self, "_parent", None) is None:
+            self._parent = get_object_or_404(
+                self.parent_model.objects.all(),
+                **{
+                    lookup: self.kwargs[kwarg]
+                    for kwarg, lookup in self.parent_lookups.items()
+                },
+            )
+        return self._parent
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, "_parent", None) is not None:
+            return queryset.filter(**{self.parent_field: self._parent})
+        return queryset.filter(**{
+            f"{self.parent_field}__{lookup}": self.kwargs[kwarg]
+            for kwarg, lookup in self.parent_lookups.items()
+        })
+
+    def list(self, request, *args, **kwargs):
+        # Пустой список несуществующего родителя должен отдавать 404.
+        self.get_parent()
+        return super().list(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        serializer.save(
+            author=self.request.user, **{self.parent_field: self.get_parent()}
+        )
+
+
+class BulkCreateUpdateMixin:
+    """Пакетное создание (POST) и частичное обновление (PATCH) списком.
+
+    Весь пакет валидируется до записи, ошибки возвращаются списком в порядке
+    входных данных. Запись идет через bulk_create/bulk_update и пакетную
+    вставку в промежуточные таблицы M2M внутри одной транзакции.
+    """
+
+    bulk_not_found_message = "Объект не найден."
+    bulk_not_unique_message = "Значение должно быть уникальным."
+    bulk_duplicate_message = "Объект указан в пакете несколько раз."
+
+    @action(detail=False, methods=("post", "patch"), url_path="bulk")
+    def bulk(self, request):
+        if not isinstance(request.data, list):
+            return response.Response(
+                {"detail": "Ожидается список объектов."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        partial = request.method == "PATCH"
+        items = request.data
+        instances = (
+            self.get_bulk_instances(items) if partial else [None] * len(items)
+        )
+        context = self.get_bulk_serializer_context(items)
+        serializers, errors = [], []
+        for item, instance in zip(items, instances):
+            if partial and instance is None:
+                serializers.append(None)
+                errors.append(
+                    {self.get_bulk_lookup(): [self.bulk_not_found_message]}
+                )
+                continue
+            serializer = self.get_bulk_serializer(
+                instance, item, partial, context
+            )
+            serializer.is_valid()
+            serializers.append(serializer)
+            errors.append(dict(serializer.errors))
+        if partial:
+            self.validate_bulk_duplicates(instances, errors)
+        self.validate_bulk_unique(serializers, errors, partial)
+        if any(errors):
+            return response.Response(
+                errors, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic():
+            if partial:
+                objs = self.perform_bulk_update(serializers)
+            else:
+                objs = self.perform_bulk_create(serializers)
+            # bulk-операции не отправляют сигналы моделей.
+            cache.bump(self.get_queryset().model)
+        saved = self.get_queryset().in_bulk([obj.pk for obj in objs])
+        serializer = self.get_serializer(
+            [saved[obj.pk] for obj in objs], many=True
+        )
+        return response.Response(
+            serializer.data,
+            status=status.HTTP_200_OK if partial else status.HTTP_201_CREATED,
+        )
+
+    def get_bulk_lookup(self):
+        return "id" if self.lookup_field == "pk" else self.lookup_field
+
+    def get_bulk_instances(self, items):
+        """Все обновляемые объекты одним запросом, в порядке входа."""
+        lookup = self.get_bulk_lookup()
+        model = self.get_queryset().model
+        field = (
+            model._meta.pk if self.lookup_field == "pk"
+            else model._meta.get_field(self.lookup_field)
+        )
+        # Некорректное значение (строка вместо id, список) означает, что
+        # не найден только этот объект, а не весь пакет.
+        values = [
+            self.to_bulk_lookup(field, item.get(lookup))
+            if isinstance(item, dict) else None
+            for item in items
+        ]
+        found = model.objects.in_bulk(
+            {value for value in values if value is not None},
+            field_name=self.lookup_field,
+        )
+        return [
+            found.get(value) if value is not None else None
+            for value in values
+        ]
+
+    @staticmethod
+    def to_bulk_lookup(field, value):
+        """Значение поиска в типе поля модели или None, если оно неверно."""
+        if value is None:
+            return None
+        try:
+            value = field.to_python(value)
+            hash(value)
+        except (ValidationError, TypeError, ValueError):
+            return None
+        return value
+
+    def get_bulk_serializer_context(self, items):
+        return self.get_serializer_context()
+
+    def get_bulk_serializer(self, instance, data, partial, context):
+        serializer = self.get_serializer_class()(
+            instance, data=data, partial=partial, context=context
+        )
+        # Уникальность проверяется для всего пакета в validate_bulk_unique.
+        for name in self.get_bulk_unique_fields():
+            field = serializer.fields.get(name)
+            if field is not None:
+                field.validators = [
+                    validator for validator in field.validators
+                    if not isinstance(validator, UniqueValidator)
+                ]
+        return serializer
+
+    def get_bulk_unique_fields(self):
+        model = self.get_queryset().model
+        return [
+            field.name for field in model._meta.concrete_fields
+            if field.unique and not field.primary_key
+        ]
+
+    def validate_bulk_duplicates(self, instances, errors):
+        """Один объект нельзя изменить в пакете дважды."""
+        indexes = {}
+        for index, instance in enumerate(instances):
+            if instance is not None:
+                indexes.setdefault(instance.pk, []).append(index)
+        for found in indexes.values():
+            if len(found) > 1:
+                for index in found:
+                    errors[index].setdefault(
+                        self.get_bulk_lookup(), []
+                    ).append(self.bulk_duplicate_message)
+
+    def validate_bulk_unique(self, serializers, errors, partial):
+        """Проверка уникальных полей пакета: один запрос на поле."""
+        model = self.get_queryset().model
+        for name in self.get_bulk_unique_fields():
+            if partial and name == self.lookup_field:
+                continue
+            values = {}
+            for index, serializer in enumerate(serializers):
+                if serializer is None or name not in getattr(
+                    serializer, "validated_data", {}
+                ):
+                    continue
+                values.setdefault(
+                    serializer.validated_data[name], []
+                ).append(index)
+            existing = set(
+                model.objects.filter(**{f"{name}__in": values})
+                .values_list(name, flat=True)
+            ) if values else set()
+            for value, indexes in values.items():
+                if value in existing or len(indexes) > 1:
+                    for index in indexes:
+                        errors[index].setdefault(name, []).append(
+                            self.bulk_not_unique_message
+                        )
+
+    def perform_bulk_create(self, serializers):
+        model = self.get_queryset().model
+        many_to_many = {field.name for field in model._meta.many_to_many}
+        objs = [
+            model(**{
+                name: value
+                for name, value in serializer.validated_data.items()
+                if name not in many_to_many
+            })
+            for serializer in serializers
+        ]
+        features = connections[model.objects.db].features
+        if features.can_return_ids_from_bulk_insert:
+            model.objects.bulk_create(objs)
+        else:
+            # Без RETURNING (SQLite, MySQL) bulk_create не проставляет pk,
+            # а они нужны для связей M2M и ответа.
+            for obj in objs:
+                obj.save(force_insert=True)
+        self.perform_bulk_set_m2m(objs, serializers, replace=False)
+        return objs
+
+    def perform_bulk_update(self, serializers):
+        model = self.get_queryset().model
+        many_to_many = {field.name for field in model._meta.many_to_many}
+        fields = set()
+        objs = []
+        for serializer in serializers:
+            obj = serializer.instance
+            for name, value in serializer.validated_data.items():
+                if name not in many_to_many:
+                    setattr(obj, name, value)
+                    fields.add(name)
+            objs.append(obj)
+        if fields:
+            # bulk_update не вызывает pre_save, auto_now выставляем сами.
+            now = timezone.now()
+            for field in model._meta.concrete_fields:
+                if getattr(field, "auto_now", False):
+                    for obj in objs:
+                        setattr(obj, field.attname, now)
+                    fields.add(field.name)
+            model.objects.bulk_update(objs, fields)
+        self.perform_bulk_set_m2m(objs, serializers, replace=True)
+        return objs
+
+    def perform_bulk_set_m2m(self, objs, serializers, replace):
+        """Связи M2M пакета: одно удаление и одна вставка на поле."""
+        model = self.get_queryset().model
+        for field in model._meta.many_to_many:
+            pairs = [
+                (obj, serializer.validated_data[field.name])
+                for obj, serializer in zip(objs, serializers)
+                if field.name in serializer.validated_data
+            ]
+            if not pairs:
+                continue
+            through = field.remote_field.through
+            source = through._meta.get_field(field.m2m_field_name()).attname
+            target = through._meta.get_field(
+                field.m2m_reverse_field_name()
+            ).attname
+            if replace:
+                through.objects.filter(
+                    **{f"{source}__in": [obj.pk for obj, _ in pairs]}
+                ).delete()
+            through.objects.bulk_create(
+                through(**{source: obj.pk, target: pk})
+                for obj, related in pairs
+                for pk in dict.fromkeys(item.pk for item in related)
+            )
@@ -1,9 +1,236 @@
-from rest_framework import pagination
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+from functools import reduce
+from operator import and_, or_
+
+from django.db.models import Q
+from rest_framework import exceptions, pagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+PAGE_SIZE = 4
+MAX_PAGE_SIZE = 10000
+
+
+def get_cursor_ordering(queryset, view):
+    """Поля сортировки курсора в виде пар (имя, по убыванию)."""
+    ordering = (
+        getattr(view, "cursor_ordering", None)
+        or queryset.query.order_by
+        or queryset.model._meta.ordering
+    )
+    ordering = [(name.lstrip("-"), name.startswith("-")) for name in ordering]
+    pk_name = queryset.model._meta.pk.name
+    if not any(name in ("pk", pk_name) for name, _ in ordering):
+        ordering.append(("pk", ordering[0][1] if ordering else False))
+    return ordering
+
+
+def is_annotation_ordered(queryset):
+    """Отсортирован ли queryset по аннотации, например по релевантности."""
+    return any(
+        name.lstrip("-") in queryset.query.annotations
+        for name in queryset.query.order_by
+    )
+
+
+class KeysetPagination(pagination.BasePagination):
+    """Курсорная пагинация по ключу сортировки.
+
+    Позиция в выдаче хранится в курсоре как значения полей сортировки
+    последнего объекта страницы, поэтому запрос любой страницы сводится к
+    WHERE по индексу без OFFSET и COUNT(*). Порядок берется из
+    `cursor_ordering` вьюсета, первичный ключ добавляется для однозначности.
+    """
+
+    page_size = PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = MAX_PAGE_SIZE
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Некорректный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset, view)
+        position, reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [(name, not desc) for name, desc in ordering]
+        queryset = queryset.order_by(
+            *(f"-{name}" if desc else name for name, desc in ordering)
+        )
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(
+                ordering, self.to_python(queryset.model, position)
+            ))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        del results[self.page_size:]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "previous": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            return pagination._positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, queryset, view):
+        return get_cursor_ordering(queryset, view)
+
+    @staticmethod
+    def get_position_filter(ordering, position):
+        """Условие "строго после позиции" для составного ключа сортировки."""
+        conditions = []
+        for index, (name, desc) in enumerate(ordering):
+            equal = [
+                Q(**{field: value})
+                for (field, _), value in zip(ordering[:index], position)
+            ]
+            lookup = "lt" if desc else "gt"
+            conditions.append(reduce(
+                and_, equal, Q(**{f"{name}__{lookup}": position[index]})
+            ))
+        return reduce(or_, conditions)
+
+    def to_python(self, model, position):
+        if len(position) != len(self.ordering):
+            raise exceptions.NotFound(self.invalid_cursor_message)
+        values = []
+        for (name, _), value in zip(self.ordering, position):
+            field = model._meta.pk if name == "pk" else model._meta.get_field(
+                name
+            )
+            try:
+                values.append(field.to_python(value))
+            except Exception:
+                raise exceptions.NotFound(self.invalid_cursor_message)
+        return values
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return list(cursor["p"]), bool(cursor.get("r"))
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise exceptions.NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse):
+        """Ссылка на позицию после `obj` - объекта или строки values()."""
+        position = []
+        for name, _ in self.ordering:
+            value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+            if isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            position.append(value)
+        cursor = {"p": position}
+        if reverse:
+            cursor["r"] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(cursor, separators=(",", ":")).encode()
+        ).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            url = self.request.build_absolute_uri()
+            return remove_query_param(url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
 
 
 class CustomPagination(pagination.PageNumberPagination):
-    """Пагинация в виде списка."""
+    """Пагинация в виде списка.
+
+    Постраничный режим используется по умолчанию. Курсорный режим
+    (`KeysetPagination`) включается параметром `?pagination=cursor`, наличием
+    `cursor` в запросе или атрибутом `pagination_mode = "cursor"` вьюсета.
+    В курсорном режиме ответ не содержит `count`.
+
+    Выдача, отсортированная по аннотации (релевантность `?search=`), всегда
+    листается постранично: ключ курсора - поля модели, и пересортировка по
+    `cursor_ordering` потеряла бы ранжирование. Курсор в таком запросе
+    отклоняется с 400.
+    """
 
-    page_size = 4
+    page_size = PAGE_SIZE
     page_size_query_param = "page_size"
-    max_page_size = 10000
+    max_page_size = MAX_PAGE_SIZE
+    mode_query_param = "pagination"
+    cursor_class = KeysetPagination
+    cursor_paginator = None
+    annotation_cursor_message = (
+        "Курсор не поддерживается для выдачи, отсортированной по "
+        "релевантности."
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if is_annotation_ordered(queryset):
+            if self.cursor_class.cursor_query_param in request.query_params:
+                raise exceptions.ValidationError({
+                    self.cursor_class.cursor_query_param: [
+                        self.annotation_cursor_message
+                    ]
+                })
+        elif self.is_cursor_mode(request, view):
+            self.display_page_controls = False
+            self.cursor_paginator = self.cursor_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def is_cursor_mode(self, request, view):
+        mode = request.query_params.get(
+            self.mode_query_param, getattr(view, "pagination_mode", "page")
+        )
+        return (
+            mode == "cursor"
+            or self.cursor_class.cursor_query_param in request.query_params
+        )
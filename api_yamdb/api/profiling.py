@@ -0,0 +1,201 @@
+"""Разбивка времени запроса: SQL, права, сериализация, рендеринг.
+
+ProfilingMiddleware ставится первым в MIDDLEWARE. Время SQL и число
+запросов собираются через execute_wrapper всех соединений, остальные
+разделы - обертками методов DRF (см. instrument). Разделы могут
+пересекаться: запросы, выполненные при сериализации, попадают и в db, и в
+serialize.
+
+По настройкам PROFILING результат отдается заголовком Server-Timing,
+медленные запросы пишутся в лог "api.profiling" строкой JSON, а для доли
+SAMPLE_RATE запросов снимается профиль cProfile.
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .rows import RowSerializer
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ("db", "permissions", "throttle", "serialize", "render")
+
+current = ContextVar("profile", default=None)
+instrumented = False
+
+
+class RequestProfile:
+    """Накопленное время разделов одного запроса, в секундах."""
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.queries = 0
+        self.active = set()
+        self.total = 0.0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.durations["db"] += time.perf_counter() - started
+            self.queries += 1
+
+    def get_milliseconds(self):
+        return {
+            section: round(self.durations[section] * 1000, 3)
+            for section in SECTIONS
+        }
+
+    def get_server_timing(self):
+        metrics = [
+            f'{section};dur={duration}'
+            for section, duration in self.get_milliseconds().items()
+        ]
+        metrics[0] += f';desc="{self.queries} queries"'
+        metrics.append(f"total;dur={round(self.total * 1000, 3)}")
+        return ", ".join(metrics)
+
+
+def timed(section):
+    """Учет времени вызова в разделе текущего запроса.
+
+    Вложенные вызовы того же раздела (сериализатор внутри списка) не
+    считаются повторно.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = current.get()
+            if profile is None or section in profile.active:
+                return func(*args, **kwargs)
+            profile.active.add(section)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.durations[section] += time.perf_counter() - started
+                profile.active.discard(section)
+        return wrapper
+    return decorator
+
+
+def instrument():
+    """Однократная обертка методов DRF, время которых замеряется."""
+    global instrumented
+    if instrumented:
+        return
+    for cls, name, section in (
+        (serializers.Serializer, "data", "serialize"),
+        (serializers.ListSerializer, "data", "serialize"),
+        (Response, "rendered_content", "render"),
+    ):
+        prop = getattr(cls, name)
+        setattr(cls, name, property(timed(section)(prop.fget)))
+    for cls, name, section in (
+        (APIView, "check_permissions", "permissions"),
+        (APIView, "check_object_permissions", "permissions"),
+        (APIView, "check_throttles", "throttle"),
+        # Списки из строк values() (RowListMixin) обходят Serializer.data.
+        (RowSerializer, "serialize", "serialize"),
+    ):
+        setattr(cls, name, timed(section)(getattr(cls, name)))
+    instrumented = True
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response=None):
+        self.get_response = get_response
+        instrument()
+
+    def __call__(self, request):
+        config = settings.PROFILING
+        profile = RequestProfile()
+        profiler = None
+        if config["SAMPLE_RATE"] and random.random() < config["SAMPLE_RATE"]:
+            profiler = cProfile.Profile()
+        # Число SQL-запросов берет и MetricsMiddleware (api.metrics).
+        request.profile = profile
+        token = current.set(profile)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(profile.execute)
+                    )
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+        finally:
+            current.reset(token)
+        profile.total = time.perf_counter() - started
+
+        if config["SERVER_TIMING"]:
+            response["Server-Timing"] = profile.get_server_timing()
+        slow = (
+            config["SLOW_REQUEST_MS"] is not None
+            and profile.total * 1000 >= config["SLOW_REQUEST_MS"]
+        )
+        if slow or profiler is not None:
+            self.log(request, response, profile, profiler, slow)
+        return response
+
+    def log(self, request, response, profile, profiler, slow):
+        match = request.resolver_match
+        user = getattr(request, "user", None)
+        record = {
+            "event": "slow_request" if slow else "sampled_request",
+            "method": request.method,
+            "path": request.path,
+            "query": request.META.get("QUERY_STRING", ""),
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "user": user.pk if user is not None and user.is_authenticated
+            else None,
+            "total": round(profile.total * 1000, 3),
+            "queries": profile.queries,
+            **profile.get_milliseconds(),
+        }
+        if profiler is not None:
+            record.update(self.get_profile(request, profiler))
+        logger.log(
+            logging.WARNING if slow else logging.INFO,
+            json.dumps(record, ensure_ascii=False),
+        )
+
+    def get_profile(self, request, profiler):
+        config = settings.PROFILING
+        if config["PROFILE_DIR"]:
+            name = "{}-{}-{}.prof".format(
+                time.time_ns(),
+                request.method,
+                request.path.strip("/").replace("/", "_") or "root",
+            )
+            path = os.path.join(config["PROFILE_DIR"], name)
+            profiler.dump_stats(path)
+            return {"profile_file": path}
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats(
+            "cumulative"
+        ).print_stats(config["PROFILE_LIMIT"])
+        return {"profile": stream.getvalue()}
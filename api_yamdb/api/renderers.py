@@ -0,0 +1,8 @@
+from rest_framework.renderers import JSONRenderer
+
+
+class NDJSONRenderer(JSONRenderer):
+    """JSON с разделением объектов переводом строки."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
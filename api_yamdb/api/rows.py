@@ -0,0 +1,198 @@
+"""Быстрая сериализация списков из строк values().
+
+ModelSerializer на каждый объект создает экземпляр модели и вызывает
+get_attribute и to_representation каждого поля. RowSerializer один раз на
+набор полей сериализатора собирает функции доступа к словарям values() и
+дает тот же ответ без экземпляров моделей. Поддерживаются:
+
+- поля-столбцы модели (строки и целые из БД берутся как есть, остальные
+  значения проходят через to_representation поля);
+- SlugRelatedField и CustomSlugRelatedField по внешнему ключу - столбцы
+  связанной модели через соединение;
+- CustomSlugRelatedField(many=True) - один запрос к промежуточной таблице
+  на страницу;
+- свойства модели, столбцы которых перечислены в Meta.sparse_sources.
+
+Для сериализатора с другими полями get_row_serializer возвращает None.
+"""
+from collections import defaultdict
+from operator import itemgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import relations, serializers
+
+from .serializers import CustomSlugRelatedField, get_slug_keys
+
+# Поля ответа, для которых значение столбца уже имеет нужный тип.
+RAW_FIELDS = (
+    (serializers.CharField, (models.CharField, models.TextField)),
+    (serializers.IntegerField, (models.IntegerField, models.AutoField)),
+)
+
+compiled = {}
+
+
+class UnsupportedFieldError(Exception):
+    """Поле, которое RowSerializer не умеет читать из строки."""
+
+
+class RowView:
+    """Атрибуты поверх словаря строки - для свойств модели."""
+
+    __slots__ = ("row",)
+
+    def __init__(self, row):
+        self.row = row
+
+    def __getattr__(self, name):
+        try:
+            return self.row[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def nullable(getter, convert):
+    def accessor(row):
+        value = getter(row)
+        return None if value is None else convert(value)
+    return accessor
+
+
+def is_raw(field, model_field):
+    return any(
+        isinstance(field, serializer_field)
+        and isinstance(model_field, model_fields)
+        for serializer_field, model_fields in RAW_FIELDS
+    )
+
+
+class RowSerializer:
+    """Ответ сериализатора по строкам values() его модели."""
+
+    def __init__(self, serializer):
+        meta = serializer.Meta
+        self.opts = meta.model._meta
+        self.pk = self.opts.pk.name
+        self.columns = {self.pk}
+        self.many = []
+        sources = getattr(meta, "sparse_sources", {})
+        self.accessors = [
+            (name, self.compile(field, sources.get(name)))
+            for name, field in serializer.fields.items()
+        ]
+
+    def compile(self, field, sources):
+        """Функция, возвращающая значение поля по строке."""
+        if isinstance(field, (relations.RelatedField,
+                              relations.ManyRelatedField)):
+            return self.compile_relation(field)
+        source = field.source
+        try:
+            model_field = self.opts.get_field(source)
+        except FieldDoesNotExist:
+            model_field = None
+        if model_field is not None and model_field.concrete and (
+            not model_field.is_relation
+        ):
+            self.columns.add(source)
+            getter = itemgetter(source)
+            if is_raw(field, model_field):
+                return getter
+        else:
+            prop = getattr(self.opts.model, source, None)
+            if not isinstance(prop, property) or not sources:
+                raise UnsupportedFieldError(field)
+            self.columns.update(sources)
+            fget = prop.fget
+
+            def getter(row):
+                return fget(RowView(row))
+        return nullable(getter, field.to_representation)
+
+    def compile_relation(self, field):
+        source = field.source
+        if isinstance(field, relations.ManyRelatedField):
+            if not isinstance(field.child_relation, CustomSlugRelatedField):
+                raise UnsupportedFieldError(field)
+            self.many.append((field.field_name, self.opts.get_field(source)))
+            # Значение кладет в строку prefetch.
+            return itemgetter(field.field_name)
+        if isinstance(field, CustomSlugRelatedField):
+            return self.compile_slug_object(source)
+        if isinstance(field, relations.SlugRelatedField):
+            column = f"{source}__{field.slug_field}"
+            self.columns.add(column)
+            return itemgetter(column)
+        raise UnsupportedFieldError(field)
+
+    def compile_slug_object(self, source):
+        model = self.opts.get_field(source).related_model
+        name_key, slug_key = get_slug_keys(model)
+        name, slug = f"{source}__name", f"{source}__slug"
+        self.columns.update((source, name, slug))
+
+        def accessor(row):
+            if row[source] is None:
+                return None
+            return {name_key: row[name], slug_key: row[slug]}
+        return accessor
+
+    def get_queryset(self, queryset, columns=()):
+        """Строки для сериализации; `columns` - например, поля курсора."""
+        return queryset.select_related(None).prefetch_related(None).values(
+            *self.columns.union(columns)
+        )
+
+    def prefetch(self, rows):
+        """Значения полей many: один запрос к промежуточной таблице."""
+        if not rows:
+            return rows
+        ids = [row[self.pk] for row in rows]
+        for name, field in self.many:
+            through = field.remote_field.through
+            source = through._meta.get_field(field.m2m_field_name()).attname
+            target = field.m2m_reverse_field_name()
+            name_key, slug_key = get_slug_keys(field.related_model)
+            # Порядок - как у prefetch_related: по ordering связанной модели.
+            ordering = [
+                f"-{target}__{order[1:]}" if order.startswith("-")
+                else f"{target}__{order}"
+                for order in field.related_model._meta.ordering
+            ]
+            values = defaultdict(list)
+            for owner, item_name, item_slug in (
+                through.objects.filter(**{f"{source}__in": ids})
+                .order_by(*ordering)
+                .values_list(source, f"{target}__name", f"{target}__slug")
+            ):
+                values[owner].append(
+                    {name_key: item_name, slug_key: item_slug}
+                )
+            for row in rows:
+                row[name] = values.get(row[self.pk], [])
+        return rows
+
+    def to_representation(self, rows):
+        accessors = self.accessors
+        return [
+            {name: accessor(row) for name, accessor in accessors}
+            for row in rows
+        ]
+
+    def serialize(self, rows):
+        return self.to_representation(self.prefetch(list(rows)))
+
+
+def get_row_serializer(serializer):
+    """RowSerializer для полей `serializer` или None, если он неприменим.
+
+    Функции доступа собираются один раз на класс и набор полей.
+    """
+    key = type(serializer), tuple(serializer.fields)
+    if key not in compiled:
+        try:
+            compiled[key] = RowSerializer(serializer)
+        except UnsupportedFieldError:
+            compiled[key] = None
+    return compiled[key]
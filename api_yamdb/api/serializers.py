@@ -1,11 +1,74 @@
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.db import IntegrityError
+from django.db.models import signals
 from django.shortcuts import get_object_or_404
-from rest_framework import exceptions, relations, serializers
+from rest_framework import exceptions, permissions, relations, serializers
+from rest_framework.settings import api_settings
 
-from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleRanking)
 from users.models import Auth, User
 
+FIELDS_PARAM = "fields"
+OMIT_PARAM = "omit"
+
+
+def get_sparse_fields(request, names):
+    """Имена полей после ?fields= и ?omit= в порядке `names`.
 
-class RetrieveUpdateMeSerializer(serializers.ModelSerializer):
+    Параметры - списки через запятую и учитываются только при чтении. Без
+    параметров возвращается None, неизвестное поле - ошибка 400.
+    """
+    if request is None or request.method not in permissions.SAFE_METHODS:
+        return None
+    selected = {}
+    for param in (FIELDS_PARAM, OMIT_PARAM):
+        values = {
+            value.strip()
+            for value in request.query_params.get(param, "").split(",")
+            if value.strip()
+        }
+        unknown = values.difference(names)
+        if unknown:
+            raise exceptions.ValidationError({param: [
+                "Неизвестные поля: {}.".format(", ".join(sorted(unknown)))
+            ]})
+        selected[param] = values
+    if not selected[FIELDS_PARAM] and not selected[OMIT_PARAM]:
+        return None
+    return [
+        name for name in names
+        if (not selected[FIELDS_PARAM] or name in selected[FIELDS_PARAM])
+        and name not in selected[OMIT_PARAM]
+    ]
+
+
+class SparseFieldsMixin:
+    """Поля ответа по параметрам ?fields= и ?omit=.
+
+    Действует только на сериализатор верхнего уровня (и элементы его
+    списка): вложенные сериализаторы отдаются целиком. Для полей без
+    собственного столбца `Meta.sparse_sources` перечисляет нужные им поля
+    модели (см. SparseQuerySetMixin).
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+        names = get_sparse_fields(self.context.get("request"), fields)
+        if names is None:
+            return fields
+        return OrderedDict((name, fields[name]) for name in names)
+
+
+class RetrieveUpdateMeSerializer(SparseFieldsMixin,
+                                 serializers.ModelSerializer):
     class Meta:
         model = User
         fields = (
@@ -19,7 +82,7 @@ class RetrieveUpdateMeSerializer(serializers.ModelSerializer):
         read_only_fields = ("role",)
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор модели юзеров."""
 
     class Meta:
@@ -66,7 +129,7 @@ class RetrieveTokenSerializer(serializers.Serializer):
         return attrs
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор модели категорий."""
 
     class Meta:
@@ -74,7 +137,7 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ("name", "slug")
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор модели жанров."""
 
     class Meta:
@@ -82,17 +145,150 @@ class GenreSerializer(serializers.ModelSerializer):
         fields = ("name", "slug")
 
 
+@lru_cache(maxsize=None)
+def get_slug_keys(model):
+    """Ключи ответа CustomSlugRelatedField для модели: (name, slug)."""
+    return model._meta.fields[1].name, model._meta.fields[2].name
+
+
 class CustomSlugRelatedField(relations.SlugRelatedField):
-    """Переопределения ответа."""
+    """Переопределения ответа.
+
+    Если в контексте сериализатора есть `resolved_slugs` (см.
+    `resolve_slugs`), объекты берутся оттуда без запроса к БД.
+    """
 
     def to_representation(self, obj):
+        name, slug = get_slug_keys(type(obj))
+        return {name: obj.name, slug: obj.slug}
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        # Как RelatedField.many_init, но список - SlugListField.
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in relations.MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return SlugListField(**list_kwargs)
+
+    def get_objects(self, slugs):
+        """Объекты по слагам: из `resolved_slugs` или одним запросом."""
+        resolved = self.context.get("resolved_slugs")
+        queryset = self.get_queryset()
+        if resolved is not None:
+            return resolved.get(queryset.model, {})
+        if not slugs:
+            return {}
         return {
-            obj._meta.fields[1].name: obj.name,
-            obj._meta.fields[2].name: obj.slug,
+            getattr(obj, self.slug_field): obj
+            for obj in queryset.filter(**{f"{self.slug_field}__in": slugs})
         }
 
+    def lookup(self, objs, data):
+        try:
+            return objs[data]
+        except KeyError:
+            self.fail(
+                "does_not_exist", slug_name=self.slug_field, value=str(data)
+            )
+        except TypeError:
+            self.fail("invalid")
+
+    def to_internal_value(self, data):
+        if self.context.get("resolved_slugs") is None:
+            return super().to_internal_value(data)
+        return self.lookup(self.get_objects(None), data)
+
+
+class SlugListField(relations.ManyRelatedField):
+    """Список слагов: объекты одним запросом, ошибки по всем слагам сразу."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+        child = self.child_relation
+        objs = child.get_objects(
+            {slug for slug in data if isinstance(slug, str)}
+        )
+        values = []
+        errors = {}
+        for slug in data:
+            try:
+                values.append(child.lookup(objs, slug))
+            except serializers.ValidationError as error:
+                errors.update(dict.fromkeys(error.detail))
+        if errors:
+            raise serializers.ValidationError(list(errors))
+        return values
+
+
+def resolve_slugs(serializer, items):
+    """Объекты всех слагов пакета: один запрос на связанную модель."""
+    resolved = {}
+    for name, field in serializer.fields.items():
+        field = getattr(field, "child_relation", field)
+        if not isinstance(field, CustomSlugRelatedField) or field.read_only:
+            continue
+        slugs = set()
+        for item in items:
+            value = item.get(name) if isinstance(item, dict) else None
+            values = value if isinstance(value, list) else [value]
+            slugs.update(slug for slug in values if isinstance(slug, str))
+        queryset = field.get_queryset()
+        objs = resolved.setdefault(queryset.model, {})
+        if slugs:
+            objs.update(
+                (getattr(obj, field.slug_field), obj)
+                for obj in queryset.filter(
+                    **{f"{field.slug_field}__in": slugs}
+                )
+            )
+    return resolved
+
+
+def set_m2m(instance, name, objs, created=False):
+    """Связи M2M как у RelatedManager.set, но одной разницей.
+
+    Текущие связи читаются одним запросом (для нового объекта - без него),
+    лишние удаляются одним DELETE, недостающие добавляются одним INSERT.
+    Сигналы m2m_changed отправляются так же, как при set().
+    """
+    field = instance._meta.get_field(name)
+    through = field.remote_field.through
+    source = through._meta.get_field(field.m2m_field_name()).attname
+    target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+    links = through.objects.filter(**{source: instance.pk})
+    wanted = dict.fromkeys(obj.pk for obj in objs)
+    current = set() if created else set(
+        links.values_list(target, flat=True)
+    )
+    removed = current.difference(wanted)
+    added = {pk for pk in wanted if pk not in current}
+
+    def send(action, pk_set):
+        signals.m2m_changed.send(
+            sender=through, action=action, instance=instance, reverse=False,
+            model=field.related_model, pk_set=pk_set, using=links.db,
+        )
+
+    if removed:
+        send("pre_remove", removed)
+        links.filter(**{f"{target}__in": removed}).delete()
+        send("post_remove", removed)
+    if added:
+        send("pre_add", added)
+        through.objects.bulk_create(
+            through(**{source: instance.pk, target: pk})
+            for pk in wanted if pk in added
+        )
+        send("post_add", added)
+    # Как и set(), сбрасываем загруженные prefetch_related связи.
+    getattr(instance, "_prefetched_objects_cache", {}).pop(name, None)
+
 
-class TitleSerializer(serializers.ModelSerializer):
+class TitleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериалайзер модели произведений."""
 
     category = CustomSlugRelatedField(
@@ -105,7 +301,7 @@ class TitleSerializer(serializers.ModelSerializer):
         required=False,
         many=True,
     )
-    rating = serializers.IntegerField(source="average", read_only=True)
+    rating = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Title
@@ -119,9 +315,55 @@ class TitleSerializer(serializers.ModelSerializer):
             "rating",
         )
         read_only_fields = ("rating",)
+        sparse_sources = {
+            "category": ("category__name", "category__slug"),
+            "rating": ("score_sum", "score_count"),
+        }
+
+    def create(self, validated_data):
+        genres = validated_data.pop("genre", None)
+        instance = super().create(validated_data)
+        if genres:
+            set_m2m(instance, "genre", genres, created=True)
+        return instance
+
+    def update(self, instance, validated_data):
+        genres = validated_data.pop("genre", None)
+        instance = super().update(instance, validated_data)
+        if genres is not None:
+            set_m2m(instance, "genre", genres)
+        return instance
+
 
+class RatingDistributionSerializer(serializers.Serializer):
+    """Распределение оценок произведения по сохраненной гистограмме."""
 
-class ReviewSerializer(serializers.ModelSerializer):
+    title = serializers.IntegerField(source="pk")
+    count = serializers.IntegerField(source="score_count")
+    mean = serializers.FloatField(source="rating")
+    median = serializers.FloatField(source="median_score")
+    distribution = serializers.DictField(child=serializers.IntegerField())
+
+
+class TitleRankingSerializer(serializers.ModelSerializer):
+    """Место в рейтинге с данными произведения.
+
+    Тренды хранятся относительно начала окна, `scale` из контекста приводит
+    их к текущему моменту.
+    """
+
+    title = TitleSerializer(read_only=True)
+    score = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TitleRanking
+        fields = ("score", "title")
+
+    def get_score(self, obj):
+        return round(obj.score * self.context.get("scale", 1), 4)
+
+
+class ReviewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор отзывов."""
 
     author = serializers.SlugRelatedField(
@@ -131,20 +373,29 @@ class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = ("id", "text", "score", "author", "pub_date")
+        sparse_sources = {"author": ("author__username",)}
 
-    def validate(self, attrs):
-        user = self.context["request"].user
-        title_id = self.context["request"].parser_context["kwargs"]["title_id"]
-        method = self.context["request"].method
-        if (
-            method == "POST"
-            and Review.objects.filter(author=user, title__id=title_id).exists()
-        ):
-            raise exceptions.ValidationError("Вы уже оставили свой отзыв.")
-        return attrs
+    def create(self, validated_data):
+        # Повторный отзыв отсекает ограничение unique_review, без отдельной
+        # проверки перед вставкой.
+        try:
+            return super().create(validated_data)
+        except IntegrityError:
+            raise exceptions.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    "Вы уже оставили свой отзыв."
+                ]
+            })
+
+
+class ReviewExportSerializer(ReviewSerializer):
+    """Сериализатор выгрузки отзывов."""
 
+    class Meta(ReviewSerializer.Meta):
+        fields = ReviewSerializer.Meta.fields + ("title",)
 
-class CommentSerializer(serializers.ModelSerializer):
+
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор отзывов."""
 
     author = serializers.SlugRelatedField(
@@ -154,3 +405,11 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = ("id", "text", "author", "pub_date")
+        sparse_sources = {"author": ("author__username",)}
+
+
+class CommentExportSerializer(CommentSerializer):
+    """Сериализатор выгрузки комментариев."""
+
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ("review",)
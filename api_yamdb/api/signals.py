@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from reviews.models import Category, Comment, Genre, Review, Title
+
+from . import cache
+from .authentication import invalidate_principal
+
+User = get_user_model()
+
+# Какие ресурсы кэша устаревают при записи модели. Отзыв меняет и рейтинг
+# произведения, который хранится в Title и обновляется через update().
+# Пользователи в ответах - только имена авторов (см. bump_authors).
+DEPENDENCIES = {
+    Title: (Title,),
+    Genre: (Genre,),
+    Category: (Category,),
+    Review: (Review, Title),
+    Comment: (Comment,),
+}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_on_write(sender, **kwargs):
+    models = DEPENDENCIES.get(sender)
+    if models:
+        cache.bump(*models)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def bump_on_genre_change(sender, action, **kwargs):
+    if action.startswith("post_"):
+        cache.bump(Title)
+
+
+@receiver(post_save, sender=User)
+def bump_authors_on_rename(sender, instance, created, **kwargs):
+    # Регистрация, вход и правка профиля не меняют подпись отзывов.
+    if not created and instance.username != getattr(
+        instance, "_saved_username", None
+    ):
+        cache.bump(cache.AUTHORS)
+    instance.remember_username()
+
+
+@receiver(post_delete, sender=User)
+def bump_authors_on_delete(sender, **kwargs):
+    cache.bump(cache.AUTHORS)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_principal_on_write(sender, instance, **kwargs):
+    invalidate_principal(instance.pk)
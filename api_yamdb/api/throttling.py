@@ -0,0 +1,197 @@
+"""Троттлинг со счетчиками, общими для процессов.
+
+SimpleRateThrottle из DRF хранит в кэше список времен запросов: память
+растет с числом запросов, а при LocMemCache у каждого воркера gunicorn свой
+список, и лимит фактически умножается на число воркеров. Здесь на ключ
+хранится O(1) данных в хранилище THROTTLE_STORE:
+
+- SQLiteStore (по умолчанию) - корзина токенов в файле SQLite на хосте,
+  общем для всех процессов. Проверка - одна короткая транзакция
+  BEGIN IMMEDIATE, так что параллельные процессы не теряют списания;
+- CacheStore - счетчик скользящего окна в кэше Django (memcached, redis)
+  для воркеров на нескольких хостах: два атомарных счетчика на ключ.
+
+Лимит "N/период" - емкость корзины N, пополняемой равномерно за период.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from rest_framework import throttling
+from rest_framework.settings import api_settings
+
+# Удаление полных корзин - раз в PRUNE_EVERY списаний процесса.
+PRUNE_EVERY = 1000
+
+stores = {}
+# Соединения родителя после fork не закрываются (см. SQLiteStore.connect).
+inherited = []
+
+
+class SQLiteStore:
+    """Корзины токенов в файле SQLite, общем для процессов хоста.
+
+    Строка корзины - (ключ, токены, время обновления, время заполнения).
+    Полная корзина не отличается от отсутствующей, поэтому строки с
+    прошедшим временем заполнения удаляются.
+    """
+
+    def __init__(self, location):
+        self.location = location
+        self.local = threading.local()
+        self.writes = 0
+
+    def connect(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is not None and self.local.pid != os.getpid():
+            # SQLite запрещает пользоваться соединением в дочернем процессе,
+            # а закрытие могло бы удалить журнал WAL, нужный родителю.
+            inherited.append(connection)
+            connection = None
+        if connection is None:
+            # isolation_level=None: транзакциями управляет consume.
+            connection = sqlite3.connect(
+                self.location, timeout=5, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Счетчики не стоят fsync на каждый запрос.
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS bucket ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+                "updated REAL NOT NULL, expires REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+
+    def consume(self, key, capacity, period):
+        """Списание токена: None, если запрос разрешен, иначе ожидание, с."""
+        rate = capacity / period
+        connection = self.connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = connection.execute(
+                "SELECT tokens, updated FROM bucket WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                tokens = capacity
+            else:
+                tokens = min(
+                    capacity, row[0] + max(0, now - row[1]) * rate
+                )
+            if tokens < 1:
+                return (1 - tokens) / rate
+            tokens -= 1
+            connection.execute(
+                "INSERT OR REPLACE INTO bucket VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + (capacity - tokens) / rate),
+            )
+            self.writes += 1
+            if self.writes % PRUNE_EVERY == 0:
+                connection.execute(
+                    "DELETE FROM bucket WHERE expires < ?", (now,)
+                )
+        finally:
+            connection.execute("COMMIT")
+        return None
+
+
+class CacheStore:
+    """Счетчики скользящего окна в кэше Django.
+
+    Запросы считаются по окнам длиной в период. Оценка числа запросов за
+    последний период - текущее окно плюс предыдущее с весом непрошедшей
+    доли периода. Нужен общий для процессов бэкенд с атомарным incr.
+    """
+
+    def __init__(self, location):
+        self.location = location
+
+    def consume(self, key, capacity, period):
+        """Учет запроса: None, если запрос разрешен, иначе ожидание, с."""
+        cache = caches[self.location]
+        now = time.time()
+        window, elapsed = divmod(now, period)
+        current = f"throttle:{key}:{int(window)}"
+        previous = cache.get(f"throttle:{key}:{int(window) - 1}", 0)
+        cache.add(current, 0, timeout=int(period * 2) + 1)
+        count = cache.incr(current)
+        weight = 1 - elapsed / period
+        if previous * weight + count <= capacity:
+            return None
+        # Отклоненный запрос не расходует лимит.
+        cache.decr(current)
+        return self.get_wait(previous, count - 1, capacity, period, elapsed)
+
+    @staticmethod
+    def get_wait(previous, count, capacity, period, elapsed):
+        """Время до момента, когда оценка с новым запросом уложится в лимит."""
+        if previous and count < capacity:
+            # Оценка в текущем окне падает вместе с весом предыдущего.
+            moment = period * (1 - (capacity - count - 1) / previous)
+            if moment < period:
+                return max(0, moment - elapsed)
+        # В следующем окне текущее станет предыдущим.
+        rest = period - elapsed
+        if count and count >= capacity:
+            rest += period * (1 - (capacity - 1) / count)
+        return rest
+
+
+def get_store():
+    """Хранилище счетчиков из настройки THROTTLE_STORE."""
+    config = settings.THROTTLE_STORE
+    key = config["BACKEND"], config["LOCATION"]
+    if key not in stores:
+        stores[key] = import_string(config["BACKEND"])(config["LOCATION"])
+    return stores[key]
+
+
+class SharedRateThrottle(throttling.SimpleRateThrottle):
+    """SimpleRateThrottle со счетчиками в общем хранилище."""
+
+    retry_after = None
+
+    def get_rate(self):
+        # THROTTLE_RATES класса читается один раз при импорте, а
+        # api_settings - заново после изменения настроек.
+        if not getattr(self, "scope", None):
+            raise ImproperlyConfigured(
+                f"Для {type(self).__name__} нужно задать scope или rate."
+            )
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f"Нет лимита для scope '{self.scope}'."
+            )
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.retry_after = get_store().consume(
+            self.key, self.num_requests, self.duration
+        )
+        return self.retry_after is None
+
+    def wait(self):
+        return self.retry_after
+
+
+class UserRateThrottle(throttling.UserRateThrottle, SharedRateThrottle):
+    """Лимит на пользователя (анонима - по IP) со scope "user"."""
+
+
+class ScopedRateThrottle(throttling.ScopedRateThrottle, SharedRateThrottle):
+    """Лимит по throttle_scope представления, например "signup"."""
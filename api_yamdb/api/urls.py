@@ -1,9 +1,12 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
+from reviews.models import TitleRanking
 
-from .views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                    RetrievePatchMeView, RetrieveTokenView, ReviewViewSet,
-                    SignUpViewSet, TitleViewSet, UsersViewSet)
+from .views import (CategoryViewSet, CommentExportView, CommentViewSet,
+                    GenreViewSet, RetrievePatchMeView, RetrieveTokenView,
+                    ReviewExportView, ReviewViewSet, SignUpViewSet,
+                    TitleExportView, TitleRankingView, TitleViewSet,
+                    UsersViewSet)
 
 router_v1 = DefaultRouter()
 router_v1.register(r"users", UsersViewSet)
@@ -22,7 +25,30 @@ router_v1.register(
 
 
 urlpatterns = [
-    path("v1/users/me/", RetrievePatchMeView.as_view()),
+    path("v1/users/me/", RetrievePatchMeView.as_view(), name="me"),
     path("v1/", include(router_v1.urls)),
-    path("v1/auth/token/", RetrieveTokenView.as_view()),
+    path("v1/auth/token/", RetrieveTokenView.as_view(), name="token"),
+    path(
+        "v1/export/titles/", TitleExportView.as_view(), name="export-titles"
+    ),
+    path(
+        "v1/export/reviews/",
+        ReviewExportView.as_view(),
+        name="export-reviews",
+    ),
+    path(
+        "v1/export/comments/",
+        CommentExportView.as_view(),
+        name="export-comments",
+    ),
+    path(
+        "v1/rankings/top/",
+        TitleRankingView.as_view(board=TitleRanking.TOP),
+        name="rankings-top",
+    ),
+    path(
+        "v1/rankings/trending/",
+        TitleRankingView.as_view(board=TitleRanking.TRENDING),
+        name="rankings-trending",
+    ),
 ]
@@ -1,4 +1,4 @@
-from django.core import mail
+from users.outbox import enqueue
 
 from api_yamdb.settings import EMAIL_HOST
 
@@ -6,10 +6,10 @@ CODE_LENGTH = 10
 
 
 def send_message(email, confirmation_code):
-    email = mail.EmailMessage(
+    """Постановка письма с кодом подтверждения в очередь отправки."""
+    enqueue(
+        to=email,
         subject="YaMDb",
         body=f"{confirmation_code}",
         from_email=EMAIL_HOST,
-        to=[email],
     )
-    email.send()
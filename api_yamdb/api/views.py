@@ -1,28 +1,44 @@
-from django.db.models import Avg
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils.crypto import get_random_string
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import (filters, generics, mixins, response, status, views,
-                            viewsets)
+from rest_framework import (exceptions, filters, generics, mixins, response,
+                            status, views, viewsets)
+from rest_framework.decorators import action
 from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
+from rest_framework.renderers import JSONRenderer
 from rest_framework_simplejwt.tokens import RefreshToken
-from reviews.models import Category, Genre, Review, Title
+from reviews import rankings
+from reviews.models import (SCORE_FIELDS, Category, Comment, Genre, Review,
+                            Title, TitleRanking)
 from users.models import Auth, User
 
-from .filters import CustomSearchFilter
-from .mixins import CreateDestroyListModelMixin
+from .cache import AUTHORS, CachedResponseMixin
+from .conditional import ConditionalResponseMixin
+from .filters import (CommentExportFilter, CustomSearchFilter,
+                      ReviewExportFilter, TitleExportFilter)
+from .mixins import (BulkCreateUpdateMixin, CreateDestroyListModelMixin,
+                     NestedRouteMixin, RowListMixin, SparseQuerySetMixin)
 from .pagination import CustomPagination
 from .permissions import (IsAdmin, IsAdminOrModOrReadOnly, IsAdminOrReadOnly,
                           IsAuthorOrAdmin)
-from .serializers import (CategorySerializer, CommentSerializer,
-                          GenreSerializer, RetrieveTokenSerializer,
-                          RetrieveUpdateMeSerializer, ReviewSerializer,
-                          SingUpSerializer, TitleSerializer, UserSerializer)
+from .renderers import NDJSONRenderer
+from .serializers import (CategorySerializer, CommentExportSerializer,
+                          CommentSerializer, GenreSerializer,
+                          RatingDistributionSerializer,
+                          RetrieveTokenSerializer, RetrieveUpdateMeSerializer,
+                          ReviewExportSerializer, ReviewSerializer,
+                          SingUpSerializer, TitleRankingSerializer,
+                          TitleSerializer, UserSerializer, resolve_slugs)
 from .utils import send_message
 
 
-class UsersViewSet(viewsets.ModelViewSet):
+class UsersViewSet(SparseQuerySetMixin, viewsets.ModelViewSet):
     """Вьюсет юзеров."""
 
     queryset = User.objects.all()
@@ -43,7 +59,8 @@ class RetrievePatchMeView(generics.RetrieveUpdateAPIView):
     permission_classes = (IsAuthenticated, IsAuthorOrAdmin)
 
     def get_object(self):
-        return User.objects.get(id=self.request.user.id)
+        # Пользователь уже загружен аутентификацией (или взят из ее кэша).
+        return self.request.user
 
     def patch(self, request, *args, **kwargs):
         return self.partial_update(request, *args, **kwargs)
@@ -54,13 +71,17 @@ class SignUpViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
 
     serializer_class = SingUpSerializer
     permission_classes = (AllowAny,)
+    throttle_scope = "signup"
 
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         """Создание нового пользователя.
         Если пользователь сам регистрируется - то создается новый пользователь
         и на почту отправляется код подтверждения.
         Если админ создает, то пользователь уже есть в системе и ему просто
         отправится код подтверждения.
+        Письмо ставится в очередь в той же транзакции, отправляет его команда
+        send_emails.
         """
         confirmation_code = get_random_string()
         data = request.data.copy()
@@ -93,6 +114,7 @@ class RetrieveTokenView(views.APIView):
     """Получение токена."""
 
     permission_classes = (AllowAny,)
+    throttle_scope = "token"
 
     def post(self, request):
         """Получение токена.
@@ -127,13 +149,20 @@ class RetrieveTokenView(views.APIView):
         )
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(
+    CachedResponseMixin,
+    ConditionalResponseMixin,
+    BulkCreateUpdateMixin,
+    SparseQuerySetMixin,
+    RowListMixin,
+    viewsets.ModelViewSet,
+):
     """Вьюсет для произведений."""
 
     # Консоли очень не нравится, что у меня 2 Джанга, поэтому добавил order_by
     queryset = (
-        Title.objects.all()
-        .annotate(average=Avg("review__score"))
+        Title.objects.select_related("category")
+        .prefetch_related("genre")
         .order_by("name")
     )
     serializer_class = TitleSerializer
@@ -141,9 +170,115 @@ class TitleViewSet(viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     pagination_class = CustomPagination
     filterset_class = CustomSearchFilter
+    cursor_ordering = ("name", "id")
+    cache_models = (Title, Genre, Category)
+    max_distribution_titles = 100
 
+    def get_queryset(self):
+        if self.action in ("rating_distribution", "rating_distributions"):
+            return Title.objects.only(
+                "id", "score_sum", "score_count", *SCORE_FIELDS
+            )
+        return super().get_queryset()
+
+    def get_bulk_serializer_context(self, items):
+        context = super().get_bulk_serializer_context(items)
+        context["resolved_slugs"] = resolve_slugs(self.get_serializer(), items)
+        return context
+
+    def perform_bulk_update(self, serializers):
+        objs = super().perform_bulk_update(serializers)
+        # bulk_update и вставка связей не отправляют сигналы, по которым
+        # произведение переносится в разрезы рейтингов (reviews.signals).
+        for obj, serializer in zip(objs, serializers):
+            if {"category", "genre"}.intersection(serializer.validated_data):
+                rankings.sync_title(obj.pk)
+        return objs
+
+    @action(detail=True, url_path="rating-distribution")
+    def rating_distribution(self, request, pk=None):
+        """Количество оценок по значениям, среднее и медиана."""
+        return response.Response(
+            RatingDistributionSerializer(self.get_object()).data
+        )
+
+    @action(detail=False, url_path="rating-distribution")
+    def rating_distributions(self, request):
+        """Распределения для `?ids=1,2,3` в порядке запроса.
+
+        Несуществующие произведения пропускаются.
+        """
+        try:
+            ids = [
+                int(value)
+                for value in request.query_params.get("ids", "").split(",")
+                if value
+            ]
+        except ValueError:
+            raise exceptions.ValidationError(
+                {"ids": ["Ожидается список id через запятую."]}
+            )
+        if not ids or len(ids) > self.max_distribution_titles:
+            raise exceptions.ValidationError({"ids": [
+                f"Укажите от 1 до {self.max_distribution_titles} id."
+            ]})
+        titles = self.get_queryset().in_bulk(ids)
+        return response.Response(RatingDistributionSerializer(
+            [titles[pk] for pk in dict.fromkeys(ids) if pk in titles],
+            many=True,
+        ).data)
+
+
+class TitleRankingView(CachedResponseMixin, generics.ListAPIView):
+    """Лучшие или набирающие популярность произведения.
+
+    Отдаются из заранее посчитанной таблицы TitleRanking. Разрез задается
+    параметром `?category=<slug>` или `?genre=<slug>`.
+    """
+
+    board = TitleRanking.TOP
+    serializer_class = TitleRankingSerializer
+    pagination_class = CustomPagination
+    cursor_ordering = ("-score", "id")
+    cache_models = (TitleRanking, Title, Genre, Category)
+
+    def get_scope(self):
+        for param, model, scope in (
+            ("category", Category, rankings.category_scope),
+            ("genre", Genre, rankings.genre_scope),
+        ):
+            slug = self.request.query_params.get(param)
+            if slug:
+                return scope(get_object_or_404(model, slug=slug).pk)
+        return rankings.ALL
+
+    def get_queryset(self):
+        return (
+            TitleRanking.objects.filter(
+                board=self.board, scope=self.get_scope()
+            )
+            .select_related("title__category")
+            .prefetch_related("title__genre")
+            .order_by("-score", "id")
+        )
 
-class CategoryViewSet(CreateDestroyListModelMixin, viewsets.GenericViewSet):
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.board == TitleRanking.TRENDING:
+            state = rankings.get_state()
+            if state is not None:
+                context["scale"] = rankings.get_scale(state)
+        return context
+
+
+class CategoryViewSet(
+    CachedResponseMixin,
+    ConditionalResponseMixin,
+    BulkCreateUpdateMixin,
+    CreateDestroyListModelMixin,
+    SparseQuerySetMixin,
+    viewsets.GenericViewSet,
+):
     """Вьюсет для категорий."""
 
     queryset = Category.objects.all()
@@ -153,9 +288,17 @@ class CategoryViewSet(CreateDestroyListModelMixin, viewsets.GenericViewSet):
     search_fields = ("name",)
     pagination_class = CustomPagination
     lookup_field = "slug"
+    cache_models = (Category,)
 
 
-class GenreViewSet(CreateDestroyListModelMixin, viewsets.GenericViewSet):
+class GenreViewSet(
+    CachedResponseMixin,
+    ConditionalResponseMixin,
+    BulkCreateUpdateMixin,
+    CreateDestroyListModelMixin,
+    SparseQuerySetMixin,
+    viewsets.GenericViewSet,
+):
     """Вьюсет для жанров."""
 
     queryset = Genre.objects.all()
@@ -165,37 +308,119 @@ class GenreViewSet(CreateDestroyListModelMixin, viewsets.GenericViewSet):
     search_fields = ("name",)
     pagination_class = CustomPagination
     lookup_field = "slug"
+    cache_models = (Genre,)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(
+    CachedResponseMixin,
+    ConditionalResponseMixin,
+    NestedRouteMixin,
+    SparseQuerySetMixin,
+    RowListMixin,
+    viewsets.ModelViewSet,
+):
     """Вьюсет для произведений."""
 
+    queryset = Review.objects.select_related("author")
     serializer_class = ReviewSerializer
     permission_classes = (IsAuthenticatedOrReadOnly, IsAdminOrModOrReadOnly)
     pagination_class = CustomPagination
-
-    def __get_title(self):
-        return get_object_or_404(Title, id=self.kwargs["title_id"])
-
-    def get_queryset(self):
-        return self.__get_title().review.all()
-
-    def perform_create(self, serializer):
-        serializer.save(author=self.request.user, title=self.__get_title())
-
-
-class CommentViewSet(viewsets.ModelViewSet):
+    cursor_ordering = ("-pub_date", "-id")
+    cache_models = (Title, Review, AUTHORS)
+    parent_model = Title
+    parent_field = "title"
+    parent_lookups = {"title_id": "pk"}
+
+
+class CommentViewSet(
+    ConditionalResponseMixin,
+    NestedRouteMixin,
+    SparseQuerySetMixin,
+    RowListMixin,
+    viewsets.ModelViewSet,
+):
     """Вьюсет комментариев."""
 
+    queryset = Comment.objects.select_related("author")
     serializer_class = CommentSerializer
     permission_classes = (IsAuthenticatedOrReadOnly, IsAdminOrModOrReadOnly)
     pagination_class = CustomPagination
+    cursor_ordering = ("-pub_date", "-id")
+    cache_models = (Review, Comment, AUTHORS)
+    parent_model = Review
+    parent_field = "review"
+    parent_lookups = {"review_id": "pk", "title_id": "title_id"}
+
+
+class ExportView(views.APIView):
+    """Потоковая выгрузка всех объектов в формате NDJSON.
+
+    Строки читаются итератором на серверном курсоре и сериализуются пачками
+    по `chunk_size`, поэтому потребление памяти не зависит от размера таблицы.
+    Клиентам с `Accept: application/json` тот же поток отдается JSON-массивом.
+    """
+
+    permission_classes = (IsAuthenticated, IsAdmin)
+    renderer_classes = (NDJSONRenderer, JSONRenderer)
+    chunk_size = 2000
+    queryset = None
+    serializer_class = None
+    filterset_class = None
+    prefetch = ()
+
+    def get(self, request):
+        filterset = self.filterset_class(
+            request.query_params, queryset=self.queryset.all(), request=request
+        )
+        if not filterset.is_valid():
+            return response.Response(
+                filterset.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        rows = filterset.qs.order_by("pk").iterator(chunk_size=self.chunk_size)
+        renderer = request.accepted_renderer
+        lines = self.stream(rows, renderer)
+        if not isinstance(renderer, NDJSONRenderer):
+            lines = self.stream_array(lines)
+        return StreamingHttpResponse(lines, content_type=renderer.media_type)
+
+    def stream(self, rows, renderer):
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                return
+            if self.prefetch:
+                prefetch_related_objects(chunk, *self.prefetch)
+            for item in self.serializer_class(chunk, many=True).data:
+                yield renderer.render(item) + b"\n"
+
+    @staticmethod
+    def stream_array(lines):
+        yield b"["
+        for index, line in enumerate(lines):
+            yield b"," + line if index else line
+        yield b"]"
+
+
+class TitleExportView(ExportView):
+    """Выгрузка произведений с жанрами, категорией и рейтингом."""
+
+    queryset = Title.objects.select_related("category")
+    serializer_class = TitleSerializer
+    filterset_class = TitleExportFilter
+    prefetch = ("genre",)
 
-    def __get_review(self):
-        return get_object_or_404(Review, id=self.kwargs["review_id"])
 
-    def get_queryset(self):
-        return self.__get_review().comment.all().select_related("author")
+class ReviewExportView(ExportView):
+    """Выгрузка отзывов."""
+
+    queryset = Review.objects.select_related("author")
+    serializer_class = ReviewExportSerializer
+    filterset_class = ReviewExportFilter
+
+
+class CommentExportView(ExportView):
+    """Выгрузка комментариев."""
 
-    def perform_create(self, serializer):
-        serializer.save(author=self.request.user, review=self.__get_review())
+    queryset = Comment.objects.select_related("author")
+    serializer_class = CommentExportSerializer
+    filterset_class = CommentExportFilter
@@ -1,7 +1,11 @@
 import os
 
-from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
-application = get_asgi_application()
+wsgi_application = get_wsgi_application()
+
+from api.fastpath import FastPathApplication  # noqa: E402
+
+application = FastPathApplication(wsgi_application)
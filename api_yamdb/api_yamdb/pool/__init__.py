@@ -0,0 +1,205 @@
+"""Пул соединений с PostgreSQL для каждого процесса.
+
+Подключается как ENGINE "api_yamdb.pool" (см. DB_POOL_SIZE в settings).
+Django по-прежнему "закрывает" соединение в конце запроса, но бэкенд
+возвращает его в пул, а следующий запрос любого потока берет готовое
+соединение. Размер пула ограничен: при исчерпании поток ждет свободное
+соединение не дольше TIMEOUT секунд. Перед выдачей соединение проверяется
+запросом SELECT 1, сломанное заменяется новым.
+
+После fork (gunicorn --preload) дочерний процесс не трогает соединения
+родителя: закрытие отправило бы серверу Terminate по общему сокету и
+оборвало бы сессию родителя. Они остаются в `inherited` до конца процесса,
+а пул начинает с нуля.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from psycopg2 import Error, OperationalError
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+DEFAULTS = {
+    "MAX_SIZE": 10,
+    "TIMEOUT": 5.0,
+    "HEALTH_CHECK": True,
+}
+COUNTERS = (
+    "created", "reused", "waits", "timeouts", "errors", "discarded",
+)
+
+pools = {}
+inherited = []
+_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Ограниченный пул соединений DB-API одного процесса.
+
+    `size` - число открытых соединений, выданных и свободных. Свободные
+    выдаются в порядке LIFO, чтобы редко используемые дольше простаивали и
+    реже проверялись сервером.
+    """
+
+    def __init__(self, max_size=DEFAULTS["MAX_SIZE"],
+                 timeout=DEFAULTS["TIMEOUT"],
+                 health_check=DEFAULTS["HEALTH_CHECK"]):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check = health_check
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.condition = threading.Condition()
+        self.idle = deque()
+        self.owned = {}
+        self.size = 0
+        self.stats = dict.fromkeys(COUNTERS, 0)
+
+    def after_fork(self):
+        inherited.extend(self.owned.values())
+        self.reset()
+
+    def checkout(self, factory):
+        """Свободное соединение из пула или новое от `factory`."""
+        deadline = time.monotonic() + self.timeout
+        with self.condition:
+            waited = False
+            while not self.idle and self.size >= self.max_size:
+                if not waited:
+                    self.stats["waits"] += 1
+                    waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats["timeouts"] += 1
+                    raise OperationalError(
+                        f"Connection pool exhausted: {self.max_size} "
+                        f"connections in use for {self.timeout}s."
+                    )
+                self.condition.wait(remaining)
+            connection = self.idle.pop() if self.idle else None
+            if connection is None:
+                # Место в пуле занимается до подключения, чтобы параллельные
+                # потоки не превысили max_size.
+                self.size += 1
+
+        if connection is not None:
+            if self.is_usable(connection):
+                with self.condition:
+                    self.stats["reused"] += 1
+                return connection
+            with self.condition:
+                self.stats["errors"] += 1
+            self.forget(connection, release=False)
+        try:
+            connection = factory()
+        except Exception:
+            with self.condition:
+                self.stats["errors"] += 1
+                self.size -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.stats["created"] += 1
+            self.owned[id(connection)] = connection
+        return connection
+
+    def checkin(self, connection):
+        """Возврат соединения; незавершенная транзакция откатывается.
+
+        Возвращает False для соединения, которое пул не выдавал (например,
+        унаследованного от родительского процесса): его нельзя закрывать.
+        """
+        if id(connection) not in self.owned:
+            inherited.append(connection)
+            return False
+        try:
+            if connection.closed:
+                raise OperationalError("Connection is closed.")
+            if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except Error:
+            self.forget(connection)
+            return True
+        with self.condition:
+            self.idle.append(connection)
+            self.condition.notify()
+        return True
+
+    def is_usable(self, connection):
+        if connection.closed:
+            return False
+        if not self.health_check:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except Error:
+            return False
+        return True
+
+    def forget(self, connection, release=True):
+        """Закрытие сломанного соединения.
+
+        С release=False место в пуле остается за вызывающим кодом, который
+        сразу откроет замену.
+        """
+        try:
+            connection.close()
+        except Error:
+            pass
+        with self.condition:
+            self.owned.pop(id(connection), None)
+            self.stats["discarded"] += 1
+            if release:
+                self.size -= 1
+                self.condition.notify()
+
+    def close(self):
+        """Закрытие свободных соединений, выданные закроются при возврате."""
+        with self.condition:
+            idle, self.idle = list(self.idle), deque()
+        for connection in idle:
+            self.forget(connection)
+
+    def get_stats(self):
+        with self.condition:
+            return {
+                **self.stats,
+                "size": self.size,
+                "idle": len(self.idle),
+                "in_use": self.size - len(self.idle),
+                "max_size": self.max_size,
+            }
+
+
+def get_pool(alias, options=None):
+    """Пул псевдонима БД в текущем процессе, создается при первом вызове."""
+    with _lock:
+        if alias not in pools:
+            options = {**DEFAULTS, **(options or {})}
+            pools[alias] = ConnectionPool(
+                max_size=options["MAX_SIZE"],
+                timeout=options["TIMEOUT"],
+                health_check=options["HEALTH_CHECK"],
+            )
+        return pools[alias]
+
+
+def get_stats():
+    """Счетчики всех пулов процесса: {псевдоним: {счетчик: значение}}."""
+    return {alias: pool.get_stats() for alias, pool in list(pools.items())}
+
+
+def _after_fork():
+    global _lock
+    _lock = threading.Lock()
+    for pool in pools.values():
+        pool.after_fork()
+
+
+os.register_at_fork(after_in_child=_after_fork)
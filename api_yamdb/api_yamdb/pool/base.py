@@ -0,0 +1,31 @@
+from functools import partial
+
+from django.db.backends.postgresql import base
+
+from . import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с соединениями из пула процесса.
+
+    Настройки пула - ключ POOL в DATABASES: MAX_SIZE, TIMEOUT, HEALTH_CHECK.
+    """
+
+    def get_pool(self):
+        return get_pool(self.alias, self.settings_dict.get("POOL"))
+
+    def get_new_connection(self, conn_params):
+        connection = self.get_pool().checkout(
+            partial(super().get_new_connection, conn_params)
+        )
+        # Родитель запоминает уровень изоляции только для нового соединения.
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        """Соединение не закрывается, а возвращается в пул."""
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.get_pool().checkin(self.connection)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 from dotenv import load_dotenv
@@ -37,6 +38,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -67,6 +70,35 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
+# Разбивка времени запросов (api.profiling). SLOW_REQUEST_MS - порог
+# записи в лог "api.profiling", пустое значение отключает лог медленных
+# запросов. SAMPLE_RATE - доля запросов с профилем cProfile, который
+# сохраняется в PROFILE_DIR или попадает в лог (PROFILE_LIMIT строк).
+SLOW_REQUEST_MS = os.getenv('SLOW_REQUEST_MS', default='1000')
+PROFILING = {
+    'SERVER_TIMING': os.getenv('SERVER_TIMING') == '1',
+    'SLOW_REQUEST_MS': float(SLOW_REQUEST_MS) if SLOW_REQUEST_MS else None,
+    'SAMPLE_RATE': float(os.getenv('PROFILE_SAMPLE_RATE', default=0)),
+    'PROFILE_DIR': os.getenv('PROFILE_DIR'),
+    'PROFILE_LIMIT': 30,
+}
+
+# Метрики Prometheus (api.metrics, GET /metrics). Процессы gunicorn
+# сохраняют снимки метрик в DIR не чаще раза в FLUSH_INTERVAL секунд, без
+# DIR отдаются метрики только обработавшего опрос процесса.
+METRICS = {
+    'DIR': os.getenv('METRICS_DIR'),
+    'FLUSH_INTERVAL': float(os.getenv('METRICS_FLUSH_INTERVAL', default=1)),
+}
+
+# ASGI-приложение (api_yamdb.asgi) отдает анонимные GET к этим маршрутам
+# прямо из кэша ответов, остальные запросы выполняет WSGI-приложение в
+# пуле из THREADS потоков.
+ASGI_FAST_PATH = {
+    'ROUTES': ('category-list', 'genre-list', 'title-list', 'title-detail'),
+    'THREADS': int(os.getenv('ASGI_THREADS', default=16)),
+}
+
 DATABASES = {
     'default': {
         'ENGINE': os.getenv('DB_ENGINE', default="django.db.backends.postgresql"),
@@ -78,6 +110,51 @@ DATABASES = {
     }
 }
 
+# Пул соединений включается переменной DB_POOL_SIZE - максимумом соединений
+# на процесс. Соединения переживают запросы и проверяются перед выдачей.
+if int(os.getenv('DB_POOL_SIZE', default=0)):
+    DATABASES['default'].update({
+        'ENGINE': 'api_yamdb.pool',
+        'POOL': {
+            'MAX_SIZE': int(os.getenv('DB_POOL_SIZE')),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=5)),
+            'HEALTH_CHECK': os.getenv('DB_POOL_HEALTH_CHECK') != '0',
+        },
+    })
+
+# Для нескольких воркеров gunicorn нужен общий бэкенд (memcached, redis),
+# иначе у каждого процесса свой кэш и свои счетчики поколений.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='yamdb'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', default=10000)),
+        },
+    },
+}
+
+# Счетчики троттлинга (api.throttling) общие для процессов: SQLiteStore
+# хранит их в файле на хосте, CacheStore - в кэше с псевдонимом LOCATION
+# (memcached, redis), если воркеры работают на нескольких хостах.
+THROTTLE_STORE = {
+    'BACKEND': os.getenv(
+        'THROTTLE_BACKEND', default='api.throttling.SQLiteStore'
+    ),
+    'LOCATION': os.getenv(
+        'THROTTLE_LOCATION',
+        default=os.path.join(tempfile.gettempdir(), 'yamdb-throttle.sqlite3'),
+    ),
+}
+
+RESPONSE_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': int(os.getenv('RESPONSE_CACHE_TIMEOUT', default=300)),
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -118,22 +195,56 @@ EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
 EMAIL_HOST = "site-owner@email.world"
 # EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Очередь писем, которую разбирает команда send_emails.
+EMAIL_OUTBOX = {
+    'BATCH_SIZE': int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', default=100)),
+    'MAX_ATTEMPTS': int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', default=8)),
+    # Задержка перед повтором: BACKOFF * 2 ** (попытка - 1), не больше
+    # MAX_BACKOFF секунд.
+    'BACKOFF': int(os.getenv('EMAIL_OUTBOX_BACKOFF', default=10)),
+    'MAX_BACKOFF': int(os.getenv('EMAIL_OUTBOX_MAX_BACKOFF', default=3600)),
+    'POLL_INTERVAL': float(os.getenv('EMAIL_OUTBOX_POLL_INTERVAL', default=1)),
+}
+
+# Кэш пользователей для JWT-аутентификации. Запись сбрасывается при любом
+# сохранении пользователя, TIMEOUT ограничивает срок жизни в секундах.
+# Работает только с общим для процессов бэкендом (memcached, redis): с
+# LocMemCache пользователь читается из БД на каждый запрос.
+PRINCIPAL_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': int(os.getenv('PRINCIPAL_CACHE_TIMEOUT', default=60)),
+}
+
+# Рейтинги произведений (reviews.rankings). PRIOR_VOTES - вес средней
+# оценки в байесовском среднем, 0 - среднее число оценок произведения.
+# Тренды учитывают отзывы за TRENDING_DAYS дней, вес отзыва падает вдвое
+# каждые TRENDING_HALF_LIFE часов. Пересчет - команда refresh_rankings.
+RANKINGS = {
+    'PRIOR_VOTES': int(os.getenv('RANKING_PRIOR_VOTES', default=0)),
+    'MIN_VOTES': int(os.getenv('RANKING_MIN_VOTES', default=1)),
+    'TRENDING_DAYS': int(os.getenv('TRENDING_DAYS', default=7)),
+    'TRENDING_HALF_LIFE': float(
+        os.getenv('TRENDING_HALF_LIFE', default=48)
+    ),
+}
 
 REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "DEFAULT_THROTTLE_CLASSES": (
-        "rest_framework.throttling.UserRateThrottle",
-        "rest_framework.throttling.ScopedRateThrottle",
+        "api.throttling.UserRateThrottle",
+        "api.throttling.ScopedRateThrottle",
     ),
     "DEFAULT_THROTTLE_RATES": {
         "user": "10000/day",
         "anon": "1000/day",
+        "signup": os.getenv("THROTTLE_SIGNUP", default="20/hour"),
+        "token": os.getenv("THROTTLE_TOKEN", default="60/hour"),
     },
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ),
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.CachedJWTAuthentication",
     ),
 }
 
@@ -0,0 +1,242 @@
+"""Генератор синтетических данных для нагрузочных проверок.
+
+Размеры таблиц задаются множителем `scale` от BASE_SIZES. Популярность
+произведений, жанров и активность пользователей распределены по закону
+Ципфа, поэтому на отзывы и комментарии приходятся "горячие" произведения,
+как в реальной базе. Строки выдаются генераторами по таблицам и имеют
+те же колонки, что и CSV-файлы команды fill_db.
+"""
+import random
+from bisect import bisect
+from datetime import timedelta
+from itertools import accumulate
+
+from django.utils import timezone
+from users.models import User
+
+from .models import (SCORE_MAX, SCORE_MIN, Category, Comment, Genre, Review,
+                     Title)
+
+BASE_SIZES = {
+    "users": 10000,
+    "category": 10,
+    "genre": 50,
+    "titles": 10000,
+    "review": 100000,
+    "comments": 50000,
+}
+MIN_SIZES = {
+    "users": 2, "category": 1, "genre": 2, "titles": 1, "review": 1,
+    "comments": 1,
+}
+ZIPF_EXPONENT = 1.1
+MAX_GENRES = 3
+RETRIES = 5
+PERIOD = timedelta(days=3 * 365)
+WORDS = (
+    "история", "герой", "мир", "любовь", "война", "тайна", "путь", "город",
+    "время", "жизнь", "ночь", "море", "дорога", "сердце", "память", "друг",
+    "сюжет", "финал", "актер", "автор", "роль", "музыка", "сцена", "идея",
+    "отличный", "скучный", "сильный", "глубокий", "неожиданный", "долгий",
+)
+
+
+def zipf_weights(size, exponent, rng):
+    """Накопленные веса Ципфа, ранги случайно распределены по объектам."""
+    weights = [1 / rank ** exponent for rank in range(1, size + 1)]
+    rng.shuffle(weights)
+    return list(accumulate(weights))
+
+
+class DatasetGenerator:
+    """Потоковая генерация связанных таблиц.
+
+    Таблицы нужно читать в порядке TABLES: отзывы ссылаются на сохраненные
+    генератором популярность произведений и даты, комментарии - на отзывы.
+    `start_ids` задает первый id каждой таблицы, чтобы не пересечься с уже
+    существующими строками.
+    """
+
+    TABLES = (
+        ("users", User),
+        ("category", Category),
+        ("genre", Genre),
+        ("titles", Title),
+        ("genre_title", Title.genre.through),
+        ("review", Review),
+        ("comments", Comment),
+    )
+
+    def __init__(self, scale=1.0, seed=0, exponent=ZIPF_EXPONENT,
+                 start_ids=None):
+        self.rng = random.Random(seed)
+        self.exponent = exponent
+        self.start_ids = start_ids or {}
+        self.sizes = {
+            name: max(MIN_SIZES[name], round(size * scale))
+            for name, size in BASE_SIZES.items()
+        }
+        # На малых масштабах пар (автор, произведение) меньше, чем отзывов.
+        self.sizes["review"] = min(
+            self.sizes["review"],
+            self.sizes["users"] * self.sizes["titles"] // 2,
+        )
+        self.now = timezone.now()
+
+    def get_ids(self, table):
+        start = self.start_ids.get(table, 1)
+        return range(start, start + self.sizes[table])
+
+    def text(self, words):
+        return " ".join(self.rng.choices(WORDS, k=words)).capitalize() + "."
+
+    def date(self, after=None):
+        start = after or self.now - PERIOD
+        return start + (self.now - start) * self.rng.random()
+
+    def rows(self, table):
+        return getattr(self, f"generate_{table}")()
+
+    def generate_users(self):
+        self.user_ids = self.get_ids("users")
+        self.activity = zipf_weights(
+            len(self.user_ids), self.exponent, self.rng
+        )
+        for pk in self.user_ids:
+            yield {
+                "id": pk,
+                "username": f"user{pk}",
+                "email": f"user{pk}@yamdb.fake",
+                "role": User.USER,
+                "bio": "",
+                "first_name": "",
+                "last_name": "",
+            }
+
+    def generate_category(self):
+        self.category_ids = self.get_ids("category")
+        self.category_weights = zipf_weights(
+            len(self.category_ids), self.exponent, self.rng
+        )
+        for pk in self.category_ids:
+            yield {
+                "id": pk, "name": f"Категория {pk}", "slug": f"category-{pk}"
+            }
+
+    def generate_genre(self):
+        self.genre_ids = self.get_ids("genre")
+        self.genre_weights = zipf_weights(
+            len(self.genre_ids), self.exponent, self.rng
+        )
+        for pk in self.genre_ids:
+            yield {"id": pk, "name": f"Жанр {pk}", "slug": f"genre-{pk}"}
+
+    def generate_titles(self):
+        self.title_ids = self.get_ids("titles")
+        self.popularity = zipf_weights(
+            len(self.title_ids), self.exponent, self.rng
+        )
+        # Средняя оценка произведения, вокруг которой разбросаны отзывы.
+        self.quality = [
+            self.rng.gauss(6.5, 1.5) for _ in range(len(self.title_ids))
+        ]
+        categories = self.rng.choices(
+            self.category_ids, cum_weights=self.category_weights,
+            k=len(self.title_ids),
+        )
+        for pk, category in zip(self.title_ids, categories):
+            yield {
+                "id": pk,
+                "name": self.text(self.rng.randint(1, 4)).rstrip("."),
+                "year": min(int(2022 - self.rng.expovariate(1 / 15)), 2022),
+                "description": self.text(self.rng.randint(5, 30)),
+                "category_id": category,
+            }
+
+    def generate_genre_title(self):
+        pk = self.start_ids.get("genre_title", 1)
+        for title in self.title_ids:
+            genres = set(self.rng.choices(
+                self.genre_ids, cum_weights=self.genre_weights,
+                k=self.rng.randint(1, MAX_GENRES),
+            ))
+            for genre in sorted(genres):
+                yield {"id": pk, "title_id": title, "genre_id": genre}
+                pk += 1
+
+    def generate_review(self):
+        """Отзывы с уникальной парой (автор, произведение).
+
+        Пары выбираются пачками по весам активности и популярности, при
+        повторе произведение перевыбирается равномерно; число попыток
+        ограничено, чтобы генерация завершалась и при плотном покрытии пар.
+        """
+        target = self.sizes["review"]
+        seen = set()
+        self.review_titles, self.review_dates = [], []
+        pk = self.start_ids.get("review", 1)
+        attempts = 0
+        while len(seen) < target and attempts < target * 20:
+            batch = min(target - len(seen), 10000)
+            attempts += batch
+            authors = self.rng.choices(
+                self.user_ids, cum_weights=self.activity, k=batch
+            )
+            titles = self.rng.choices(
+                range(len(self.title_ids)), cum_weights=self.popularity,
+                k=batch,
+            )
+            for author, index in zip(authors, titles):
+                for _ in range(RETRIES):
+                    if (author, index) not in seen:
+                        break
+                    # Автор уже писал о популярном произведении: берем
+                    # любое другое.
+                    index = self.rng.randrange(len(self.title_ids))
+                else:
+                    continue
+                seen.add((author, index))
+                score = round(self.rng.gauss(self.quality[index], 2))
+                pub_date = self.date()
+                self.review_titles.append(index)
+                self.review_dates.append(pub_date)
+                yield {
+                    "id": pk,
+                    "title_id": self.title_ids[index],
+                    "text": self.text(self.rng.randint(3, 60)),
+                    "author_id": author,
+                    "score": min(max(score, SCORE_MIN), SCORE_MAX),
+                    "pub_date": pub_date,
+                }
+                pk += 1
+                if len(seen) == target:
+                    return
+
+    def generate_comments(self):
+        """Комментарии чаще достаются отзывам на популярные произведения."""
+        first_review = self.start_ids.get("review", 1)
+        weights = list(accumulate(
+            self.popularity[index] - (
+                self.popularity[index - 1] if index else 0
+            )
+            for index in self.review_titles
+        ))
+        if not weights:
+            return
+        authors = self.rng.choices(
+            self.user_ids, cum_weights=self.activity, k=self.sizes["comments"]
+        )
+        for pk, author in enumerate(
+            authors, self.start_ids.get("comments", 1)
+        ):
+            review = min(
+                bisect(weights, self.rng.random() * weights[-1]),
+                len(weights) - 1,
+            )
+            yield {
+                "id": pk,
+                "review_id": first_review + review,
+                "text": self.text(self.rng.randint(2, 25)),
+                "author_id": author,
+                "pub_date": self.date(after=self.review_dates[review]),
+            }
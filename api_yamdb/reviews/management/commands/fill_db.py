@@ -1,13 +1,61 @@
 import csv
+import io
 import os
+import time
+from contextlib import contextmanager
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from api.cache import AUTHORS, bump
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
 
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews import rankings
+from reviews.models import (Category, Comment, Genre, Review, Title,
+                            TitleRanking, User)
+
+INSERT = "insert"
+SKIP = "skip"
+UPSERT = "upsert"
+
+
+@contextmanager
+def keep_auto_dates(model):
+    """Даты из CSV не перезаписываются auto_now_add при bulk_create."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, "auto_now_add", False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def reset_sequences(models):
+    """Счетчики id после вставки строк с явными первичными ключами."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
 
 
 class Command(BaseCommand):
-    """Команда для наполнения БД из CSV-файлов."""
+    """Команда для наполнения БД из CSV-файлов.
+
+    Файлы читаются потоково и пишутся пачками по --chunk-size строк, каждая
+    пачка приводится к типам полей и валидируется; невалидные строки
+    пропускаются с сообщением. Режимы --mode: insert (конфликт ключей -
+    ошибка), skip (существующие строки пропускаются), upsert (существующие
+    строки обновляются). На PostgreSQL по умолчанию проверенные строки
+    пачки загружаются COPY во временную таблицу и INSERT ... ON CONFLICT.
+    """
 
     help = "Filling DB with prepared CSV-files."
     data_folder = "static/data"
@@ -21,11 +69,220 @@ class Command(BaseCommand):
         (Comment, "comments.csv"),
     )
 
+    def add_arguments(self, parser):
+        tables = [os.path.splitext(file)[0] for _, file in self.schema]
+        parser.add_argument(
+            "--tables", nargs="+", choices=tables, default=tables,
+            help="Load only the given tables.",
+        )
+        parser.add_argument(
+            "--mode", choices=(INSERT, SKIP, UPSERT), default=INSERT,
+            help="What to do with rows whose primary key already exists.",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=5000,
+            help="Rows per bulk write.",
+        )
+        parser.add_argument(
+            "--data-folder", default=self.data_folder,
+            help="Folder with CSV files.",
+        )
+        parser.add_argument(
+            "--no-copy", action="store_false", dest="copy",
+            help="Do not use PostgreSQL COPY even when available.",
+        )
+
     def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+        use_copy = options["copy"] and connection.vendor == "postgresql"
+        loaded = []
         for model, file in self.schema:
-            with open(
-                os.path.join(self.data_folder, file), encoding="UTF-8"
-            ) as file:
-                rows = csv.DictReader(file)
-                result = [model(**row) for row in rows]
-            model.objects.bulk_create(result)
+            if os.path.splitext(file)[0] not in options["tables"]:
+                continue
+            path = os.path.join(options["data_folder"], file)
+            started = time.monotonic()
+            with open(path, encoding="UTF-8", newline="") as rows:
+                if use_copy:
+                    count = self.copy_file(
+                        model, rows, options["mode"], options["chunk_size"]
+                    )
+                else:
+                    count = self.load_file(
+                        model, rows, options["mode"], options["chunk_size"]
+                    )
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f"{file}: {count} rows in {elapsed:.2f}s "
+                f"({count / elapsed:.0f} rows/s)"
+            )
+            loaded.append(model)
+
+        reset_sequences(loaded)
+        if Title.genre.through in loaded and Title not in loaded:
+            # Жанры входят в ответы произведений и в разрезы рейтингов.
+            loaded.append(Title)
+        if Title in loaded or Review in loaded:
+            # Ни bulk_create, ни COPY не вызывают сигналы модели Review.
+            Title.objects.recalculate_rating()
+            rankings.refresh()
+            loaded.append(TitleRanking)
+        if User in loaded:
+            # Режим upsert может переименовать авторов отзывов.
+            loaded.append(AUTHORS)
+        bump(*loaded)
+
+    def get_fields(self, model, columns):
+        fields = {}
+        for field in model._meta.concrete_fields:
+            fields[field.name] = fields[field.attname] = field
+        unknown = [column for column in columns if column not in fields]
+        if unknown:
+            raise CommandError(
+                f"Unknown columns for {model._meta.label}: {unknown}"
+            )
+        return [fields[column] for column in columns]
+
+    def coerce(self, fields, row):
+        """Значения строки CSV, приведенные к типам полей модели."""
+        values = {}
+        for field, raw in zip(fields, row):
+            if raw == "" and field.null:
+                values[field.attname] = None
+            elif field.is_relation:
+                values[field.attname] = field.target_field.to_python(raw)
+            else:
+                values[field.attname] = field.clean(raw, None)
+        return values
+
+    def read_chunks(self, model, reader, fields, chunk_size):
+        """Пачки строк, приведенных к типам полей; невалидные пропускаются."""
+        number = 0
+        while True:
+            chunk = list(islice(reader, chunk_size))
+            if not chunk:
+                return
+            values = []
+            for row in chunk:
+                number += 1
+                try:
+                    values.append(self.coerce(fields, row))
+                except ValidationError as error:
+                    self.stderr.write(
+                        f"{model._meta.label}, row {number}: "
+                        f"{'; '.join(error.messages)}"
+                    )
+            yield values
+
+    def load_file(self, model, rows, mode, chunk_size):
+        reader = csv.reader(rows)
+        fields = self.get_fields(model, next(reader))
+        count = 0
+        with keep_auto_dates(model):
+            for values in self.read_chunks(model, reader, fields, chunk_size):
+                objs = [model(**item) for item in values]
+                with transaction.atomic():
+                    self.write_chunk(model, objs, fields, mode)
+                count += len(objs)
+        return count
+
+    def write_chunk(self, model, objs, fields, mode):
+        if mode == INSERT:
+            model.objects.bulk_create(objs)
+        elif mode == SKIP:
+            model.objects.bulk_create(objs, ignore_conflicts=True)
+        else:
+            existing = set(
+                model.objects.filter(pk__in=[obj.pk for obj in objs])
+                .values_list("pk", flat=True)
+            )
+            updated = [obj for obj in objs if obj.pk in existing]
+            columns = [field.name for field in fields if not field.primary_key]
+            if updated and columns:
+                model.objects.bulk_update(updated, columns)
+            model.objects.bulk_create(
+                [obj for obj in objs if obj.pk not in existing]
+            )
+
+    def copy_file(self, model, rows, mode, chunk_size):
+        """Загрузка пачками: COPY во временную таблицу и INSERT ... SELECT.
+
+        В COPY попадают только строки, прошедшие coerce, как и при
+        загрузке через bulk_create.
+        """
+        reader = csv.reader(rows)
+        fields = self.get_fields(model, next(reader))
+        quote = connection.ops.quote_name
+        table = quote(model._meta.db_table)
+        staging = quote(f"fill_db_{model._meta.db_table}")
+        columns = [quote(field.column) for field in fields]
+
+        # Поля, которых нет в CSV, получают значения по умолчанию модели.
+        missing, params = [], []
+        for field in model._meta.concrete_fields:
+            if field in fields or field.null or field.primary_key:
+                continue
+            missing.append(quote(field.column))
+            if getattr(field, "auto_now", False) or getattr(
+                field, "auto_now_add", False
+            ):
+                params.append(timezone.now())
+            else:
+                params.append(field.get_db_prep_save(
+                    field.get_default(), connection
+                ))
+
+        pk = quote(model._meta.pk.column)
+        conflict = ""
+        updates = ", ".join(
+            f"{column} = EXCLUDED.{column}"
+            for field, column in zip(fields, columns)
+            if not field.primary_key
+        )
+        if mode == SKIP or mode == UPSERT and not updates:
+            conflict = f"ON CONFLICT ({pk}) DO NOTHING"
+        elif mode == UPSERT:
+            conflict = f"ON CONFLICT ({pk}) DO UPDATE SET {updates}"
+
+        select = ", ".join(columns + ["%s"] * len(missing))
+        count = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {staging} AS "
+                f"SELECT {', '.join(columns)} FROM {table} WITH NO DATA"
+            )
+            try:
+                for values in self.read_chunks(
+                    model, reader, fields, chunk_size
+                ):
+                    with transaction.atomic():
+                        cursor.execute(f"TRUNCATE {staging}")
+                        cursor.copy_expert(
+                            f"COPY {staging} ({', '.join(columns)}) "
+                            "FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                            self.to_copy(fields, values),
+                        )
+                        cursor.execute(
+                            f"INSERT INTO {table} "
+                            f"({', '.join(columns + missing)}) "
+                            f"SELECT {select} FROM {staging} {conflict}",
+                            params,
+                        )
+                        count += cursor.rowcount
+            finally:
+                cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        return count
+
+    def to_copy(self, fields, values):
+        """Строки для COPY: NULL - \\N без кавычек, значения - в кавычках."""
+        buffer = io.StringIO()
+        for item in values:
+            row = (item[field.attname] for field in fields)
+            buffer.write(",".join(
+                "\\N" if value is None
+                else '"{}"'.format(str(value).replace('"', '""'))
+                for value in row
+            ) + "\n")
+        buffer.seek(0)
+        return buffer
@@ -0,0 +1,15 @@
+from api.cache import bump
+from django.core.management.base import BaseCommand
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    """Команда для пересчета сохраненного рейтинга произведений."""
+
+    help = "Rebuilding stored title ratings from reviews."
+
+    def handle(self, *args, **options):
+        updated = Title.objects.recalculate_rating()
+        bump(Title)
+        self.stdout.write(f"Ratings recalculated for {updated} titles.")
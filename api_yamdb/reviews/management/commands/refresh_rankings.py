@@ -0,0 +1,21 @@
+from api.cache import bump
+from django.core.management.base import BaseCommand
+
+from reviews import rankings
+from reviews.models import TitleRanking
+
+
+class Command(BaseCommand):
+    """Полный пересчет рейтингов произведений.
+
+    Между запусками рейтинги поправляются при каждом отзыве, но средняя
+    оценка и окно трендов обновляются только здесь, поэтому команду нужно
+    запускать по расписанию (например, раз в час).
+    """
+
+    help = "Rebuilding top and trending title rankings."
+
+    def handle(self, *args, **options):
+        rows = rankings.refresh()
+        bump(TitleRanking)
+        self.stdout.write(f"Rankings rebuilt: {rows} rows.")
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:10
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+CREATE_SQL = """
+CREATE FUNCTION reviews_title_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER reviews_title_search_vector_update
+    BEFORE INSERT OR UPDATE OF name, description ON reviews_title
+    FOR EACH ROW EXECUTE PROCEDURE reviews_title_search_vector();
+
+UPDATE reviews_title SET name = name;
+
+CREATE INDEX reviews_title_search_vector_idx
+    ON reviews_title USING gin (search_vector);
+"""
+
+DROP_SQL = """
+DROP INDEX IF EXISTS reviews_title_search_vector_idx;
+DROP TRIGGER IF EXISTS reviews_title_search_vector_update ON reviews_title;
+DROP FUNCTION IF EXISTS reviews_title_search_vector();
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    # На других СУБД работает резервный индекс из reviews.search.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SQL)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_title_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
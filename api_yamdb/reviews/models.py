@@ -1,6 +1,9 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Now
 from django.utils.translation import gettext_lazy as _
 
 from .utils import year_validator
@@ -10,6 +13,22 @@ User = get_user_model()
 LIMIT = 30
 SCORE_MIN = 1
 SCORE_MAX = 10
+SCORES = range(SCORE_MIN, SCORE_MAX + 1)
+
+
+def score_field(score):
+    """Имя поля произведения с количеством оценок `score`."""
+    return f"score_{score}"
+
+
+SCORE_FIELDS = tuple(score_field(score) for score in SCORES)
+
+
+def score_count_field(score):
+    """Поле произведения с количеством оценок `score`."""
+    return models.PositiveIntegerField(
+        _("Оценок %(score)s") % {"score": score}, default=0, editable=False
+    )
 
 
 class Category(models.Model):
@@ -25,6 +44,9 @@ class Category(models.Model):
         verbose_name = _("Категория")
         verbose_name_plural = _("Категории")
         ordering = ("name",)
+        indexes = (
+            models.Index(fields=("name", "id"), name="category_name_id_idx"),
+        )
 
 
 class Genre(models.Model):
@@ -40,6 +62,64 @@ class Genre(models.Model):
         verbose_name = _("Жанр")
         verbose_name_plural = _("Жанры")
         ordering = ("name",)
+        indexes = (
+            models.Index(fields=("name", "id"), name="genre_name_id_idx"),
+        )
+
+
+class TitleQuerySet(models.QuerySet):
+    """Операции над сохраненным рейтингом произведений."""
+
+    def update_rating(self, title_id, score, count=1):
+        """Учет `count` оценок `score` (отрицательный - исключение).
+
+        Сумма, количество и гистограмма оценок меняются атомарно на стороне
+        БД одним UPDATE.
+        """
+        field = score_field(score)
+        return self.filter(pk=title_id).update(
+            score_sum=F("score_sum") + score * count,
+            score_count=F("score_count") + count,
+            **{field: F(field) + count},
+            updated=Now(),
+        )
+
+    def recalculate_rating(self):
+        """Пересчет рейтинга выбранных произведений по их отзывам."""
+        reviews = (
+            Review.objects.filter(title=OuterRef("pk"))
+            .order_by()
+            .values("title")
+        )
+        return self.update(
+            score_sum=Coalesce(
+                Subquery(reviews.annotate(total=Sum("score")).values("total")),
+                0,
+            ),
+            score_count=Coalesce(
+                Subquery(
+                    reviews.annotate(total=Count("id")).values("total")
+                ),
+                0,
+            ),
+            **{
+                score_field(score): Coalesce(
+                    Subquery(
+                        reviews.filter(score=score)
+                        .annotate(total=Count("id"))
+                        .values("total")
+                    ),
+                    0,
+                )
+                for score in SCORES
+            },
+        )
+
+
+class TitleManager(models.Manager.from_queryset(TitleQuerySet)):
+    def get_queryset(self):
+        # Поисковый вектор нужен только внутри БД, не читаем его в Python.
+        return super().get_queryset().defer("search_vector")
 
 
 class Title(models.Model):
@@ -66,14 +146,77 @@ class Title(models.Model):
         null=True,
         related_name="title",
     )
+    score_sum = models.PositiveIntegerField(
+        _("Сумма оценок"), default=0, editable=False
+    )
+    score_count = models.PositiveIntegerField(
+        _("Количество оценок"), default=0, editable=False
+    )
+    # Гистограмма оценок: по полю на каждое значение из SCORES.
+    score_1 = score_count_field(1)
+    score_2 = score_count_field(2)
+    score_3 = score_count_field(3)
+    score_4 = score_count_field(4)
+    score_5 = score_count_field(5)
+    score_6 = score_count_field(6)
+    score_7 = score_count_field(7)
+    score_8 = score_count_field(8)
+    score_9 = score_count_field(9)
+    score_10 = score_count_field(10)
+    updated = models.DateTimeField(
+        _("Дата изменения"), auto_now=True, db_index=True
+    )
+    # Заполняется триггером PostgreSQL, см. миграцию 0004_title_search.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = TitleManager()
 
     def __str__(self):
         return self.name[:LIMIT]
 
+    @property
+    def rating(self):
+        """Средняя оценка произведения или None, если отзывов нет."""
+        if not self.score_count:
+            return None
+        return self.score_sum / self.score_count
+
+    @property
+    def distribution(self):
+        """Количество оценок по значениям от SCORE_MIN до SCORE_MAX."""
+        return {score: getattr(self, score_field(score)) for score in SCORES}
+
+    @property
+    def median_score(self):
+        """Медиана оценок по гистограмме или None, если отзывов нет."""
+        if not self.score_count:
+            return None
+        # Позиции средних элементов, для нечетного количества совпадают.
+        positions = ((self.score_count + 1) // 2, self.score_count // 2 + 1)
+        middle = []
+        seen = 0
+        for score, count in self.distribution.items():
+            seen += count
+            while len(middle) < 2 and seen >= positions[len(middle)]:
+                middle.append(score)
+        return sum(middle) / 2
+
     class Meta:
         verbose_name = _("Произведение")
         verbose_name_plural = _("Произведения")
         ordering = ("name",)
+        # Списки сортируются по (name, id), в том числе после фильтров по
+        # категории и году.
+        indexes = (
+            models.Index(fields=("name", "id"), name="title_name_id_idx"),
+            models.Index(
+                fields=("category", "name", "id"),
+                name="title_category_name_idx",
+            ),
+            models.Index(
+                fields=("year", "name", "id"), name="title_year_name_idx"
+            ),
+        )
 
 
 class Review(models.Model):
@@ -101,10 +244,39 @@ class Review(models.Model):
     def __str__(self):
         return f"{self.author[:LIMIT]} - {self.text[:LIMIT]}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_rating_state()
+        return instance
+
+    def remember_rating_state(self):
+        """Запоминает оценку, уже учтенную в рейтинге произведения."""
+        self._rating_state = (
+            self.__dict__.get("title_id"),
+            self.__dict__.get("score"),
+        )
+
+    def save(self, *args, **kwargs):
+        # Отзыв и рейтинг произведения должны меняться в одной транзакции.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = _("Отзыв")
         verbose_name_plural = _("Отзывы")
         ordering = ("-pub_date",)
+        # Отзывы произведения в порядке страниц и покрывающий индекс для
+        # суммы и количества оценок.
+        indexes = (
+            models.Index(
+                fields=("title", "-pub_date", "-id"),
+                name="review_title_pub_date_idx",
+            ),
+            models.Index(
+                fields=("title", "score"), name="review_title_score_idx"
+            ),
+        )
         constraints = (
             models.UniqueConstraint(
                 fields=("author", "title"), name="unique_review"
@@ -134,3 +306,71 @@ class Comment(models.Model):
         verbose_name = _("Комментарий")
         verbose_name_plural = _("Комментарии")
         ordering = ("-pub_date",)
+        indexes = (
+            models.Index(
+                fields=("review", "-pub_date", "-id"),
+                name="comment_review_pub_date_idx",
+            ),
+        )
+
+
+class TitleRanking(models.Model):
+    """Место произведения в рейтинге, см. reviews.rankings.
+
+    `scope` - разрез рейтинга: "all", "category:<id>" или "genre:<id>".
+    """
+
+    TOP = "top"
+    TRENDING = "trending"
+    BOARDS = (
+        (TOP, _("Лучшие")),
+        (TRENDING, _("Набирающие популярность")),
+    )
+
+    board = models.CharField(_("Рейтинг"), max_length=16, choices=BOARDS)
+    scope = models.CharField(_("Разрез"), max_length=32)
+    title = models.ForeignKey(
+        Title,
+        verbose_name=_("Произведение"),
+        on_delete=models.CASCADE,
+        related_name="rankings",
+    )
+    score = models.FloatField(_("Оценка в рейтинге"))
+
+    def __str__(self):
+        return f"{self.board} {self.scope}: {self.title_id}"
+
+    class Meta:
+        verbose_name = _("Место в рейтинге")
+        verbose_name_plural = _("Рейтинги")
+        ordering = ("board", "scope", "-score", "id")
+        indexes = (
+            models.Index(
+                fields=("board", "scope", "-score", "id"),
+                name="ranking_board_scope_score_idx",
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=("board", "scope", "title"),
+                name="unique_title_ranking",
+            ),
+        )
+
+
+class RankingState(models.Model):
+    """Параметры последнего пересчета рейтингов (единственная строка).
+
+    Байесовское среднее тянет оценку произведения к `mean` с весом
+    `prior_votes` голосов. Вклады отзывов в тренды хранятся относительно
+    `epoch`, поэтому не требуют пересчета по мере старения.
+    """
+
+    mean = models.FloatField(_("Средняя оценка"))
+    prior_votes = models.FloatField(_("Вес средней оценки"))
+    epoch = models.DateTimeField(_("Начало окна трендов"))
+    refreshed = models.DateTimeField(_("Дата пересчета"))
+
+    class Meta:
+        verbose_name = _("Состояние рейтингов")
+        verbose_name_plural = _("Состояние рейтингов")
@@ -0,0 +1,217 @@
+"""Рейтинги произведений: лучшие и набирающие популярность.
+
+Лучшие упорядочены по байесовскому среднему
+(prior_votes * mean + сумма оценок) / (prior_votes + число оценок), так что
+произведение с парой высоких оценок не обгоняет устойчиво хорошее.
+Набирающие популярность упорядочены по сумме оценок отзывов за последние
+TRENDING_DAYS, где вес отзыва уменьшается вдвое каждые TRENDING_HALF_LIFE
+часов. Вклад отзыва хранится как score * 2 ** ((pub_date - epoch) / T):
+при общем множителе старение не меняет порядок, поэтому новые отзывы
+просто прибавляются.
+
+Значения хранятся в TitleRanking по разрезам (все, категория, жанр).
+refresh() пересчитывает все целиком (команда refresh_rankings по
+расписанию), а сигналы отзывов поправляют строки одного произведения между
+пересчетами.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import (SCORE_MAX, SCORE_MIN, RankingState, Review, Title,
+                     TitleRanking)
+
+ALL = "all"
+# Остаток вклада удаленных отзывов из-за погрешности float.
+EPSILON = 1e-9
+
+
+def category_scope(pk):
+    return f"category:{pk}"
+
+
+def genre_scope(pk):
+    return f"genre:{pk}"
+
+
+def get_scopes(category_id, genre_ids):
+    scopes = [ALL]
+    if category_id is not None:
+        scopes.append(category_scope(category_id))
+    scopes += [genre_scope(pk) for pk in genre_ids]
+    return scopes
+
+
+def get_title_scopes(title_id, category_id):
+    return get_scopes(
+        category_id,
+        Title.genre.through.objects.filter(title_id=title_id)
+        .values_list("genre_id", flat=True),
+    )
+
+
+def bayesian(state, score_sum, score_count):
+    return (state.prior_votes * state.mean + score_sum) / (
+        state.prior_votes + score_count
+    )
+
+
+def get_exponent(state, moment):
+    half_life = timedelta(hours=settings.RANKINGS["TRENDING_HALF_LIFE"])
+    return (moment - state.epoch) / half_life
+
+
+def get_weight(state, score, pub_date):
+    """Вклад оценки в тренды относительно начала окна."""
+    return score * 2 ** get_exponent(state, pub_date)
+
+
+def get_scale(state, now=None):
+    """Множитель, приводящий хранимые тренды к затуханию на `now`."""
+    return 2 ** -get_exponent(state, now or timezone.now())
+
+
+def get_state():
+    return RankingState.objects.filter(pk=1).first()
+
+
+def refresh(now=None):
+    """Полный пересчет рейтингов и параметров, возвращает число строк."""
+    config = settings.RANKINGS
+    now = now or timezone.now()
+    totals = Title.objects.filter(score_count__gt=0).aggregate(
+        votes=Sum("score_count"), total=Sum("score_sum"), titles=Count("id")
+    )
+    if totals["votes"]:
+        mean = totals["total"] / totals["votes"]
+        prior_votes = (
+            config["PRIOR_VOTES"] or totals["votes"] / totals["titles"]
+        )
+    else:
+        mean, prior_votes = (SCORE_MIN + SCORE_MAX) / 2, 1
+    state = RankingState(
+        pk=1,
+        mean=mean,
+        prior_votes=prior_votes,
+        epoch=now - timedelta(days=config["TRENDING_DAYS"]),
+        refreshed=now,
+    )
+
+    trending = defaultdict(float)
+    for title_id, score, pub_date in (
+        Review.objects.filter(pub_date__gte=state.epoch)
+        .values_list("title_id", "score", "pub_date")
+        .iterator()
+    ):
+        trending[title_id] += get_weight(state, score, pub_date)
+    genres = defaultdict(list)
+    for title_id, genre_id in (
+        Title.genre.through.objects.values_list("title_id", "genre_id")
+        .iterator()
+    ):
+        genres[title_id].append(genre_id)
+
+    rows = []
+    for pk, category_id, score_sum, score_count in (
+        Title.objects.values_list(
+            "pk", "category_id", "score_sum", "score_count"
+        ).iterator()
+    ):
+        boards = []
+        if score_count >= config["MIN_VOTES"]:
+            boards.append(
+                (TitleRanking.TOP, bayesian(state, score_sum, score_count))
+            )
+        if pk in trending:
+            boards.append((TitleRanking.TRENDING, trending[pk]))
+        for board, score in boards:
+            rows += [
+                TitleRanking(board=board, scope=scope, title_id=pk,
+                             score=score)
+                for scope in get_scopes(category_id, genres[pk])
+            ]
+
+    with transaction.atomic():
+        TitleRanking.objects.all().delete()
+        TitleRanking.objects.bulk_create(rows, batch_size=5000)
+        state.save()
+    return len(rows)
+
+
+def insert(title_id, scopes, board, score):
+    # Конфликт возможен, если параллельный запрос уже добавил строки.
+    TitleRanking.objects.bulk_create(
+        [
+            TitleRanking(board=board, scope=scope, title_id=title_id,
+                         score=score)
+            for scope in scopes
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def update_title(title_id, score=0, count=0, pub_date=None):
+    """Учет изменения оценок произведения между пересчетами.
+
+    `score` и `count` - как в TitleQuerySet.update_rating: добавлено
+    (или при отрицательном `count` исключено) `count` оценок `score`.
+    Пока рейтинги не считались (refresh_rankings после развертывания),
+    изменения не учитываются: полный пересчет в сигнале отзыва занял бы
+    запрос на время перестроения всей таблицы.
+    """
+    state = get_state()
+    if state is None:
+        return
+    title = Title.objects.values(
+        "category_id", "score_sum", "score_count"
+    ).filter(pk=title_id).first()
+    if title is None:
+        return
+    rankings = TitleRanking.objects.filter(title_id=title_id)
+
+    if title["score_count"] >= settings.RANKINGS["MIN_VOTES"]:
+        value = bayesian(state, title["score_sum"], title["score_count"])
+        if not rankings.filter(board=TitleRanking.TOP).update(score=value):
+            insert(
+                title_id,
+                get_title_scopes(title_id, title["category_id"]),
+                TitleRanking.TOP,
+                value,
+            )
+    else:
+        rankings.filter(board=TitleRanking.TOP).delete()
+
+    if count and pub_date is not None and pub_date >= state.epoch:
+        delta = get_weight(state, score, pub_date) * count
+        trending = rankings.filter(board=TitleRanking.TRENDING)
+        if not trending.update(score=F("score") + delta) and delta > 0:
+            insert(
+                title_id,
+                get_title_scopes(title_id, title["category_id"]),
+                TitleRanking.TRENDING,
+                delta,
+            )
+        if delta < 0:
+            trending.filter(score__lte=EPSILON).delete()
+
+
+def sync_title(title_id):
+    """Перенос строк произведения в разрезы его текущих категории и жанров."""
+    values = dict(
+        TitleRanking.objects.filter(title_id=title_id, scope=ALL)
+        .values_list("board", "score")
+    )
+    if not values:
+        return
+    scopes = get_title_scopes(
+        title_id,
+        Title.objects.values_list("category_id", flat=True).get(pk=title_id),
+    )
+    with transaction.atomic():
+        TitleRanking.objects.filter(title_id=title_id).delete()
+        for board, score in values.items():
+            insert(title_id, scopes, board, score)
@@ -0,0 +1,174 @@
+import re
+import threading
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import Case, Count, F, IntegerField, Max, Value, When
+from django.db.models.functions import Lower
+
+SEARCH_CONFIG = "russian"
+NAME_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.4
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# Окончания русских слов, от длинных к коротким. Для резервного индекса этого
+# достаточно, чтобы "Шоушенка" и "Шоушенке" попадали в одну основу.
+ENDINGS = sorted({
+    "иями", "ями", "ами", "иях", "ях", "ах", "ией", "ием", "ем", "ом", "ой",
+    "ей", "ий", "ый", "ая", "яя", "ое", "ее", "ие", "ые", "ого", "его", "ому",
+    "ему", "ыми", "ими", "ых", "их", "ую", "юю", "ов", "ев", "ам", "ям", "ия",
+    "ья", "ье", "ию", "ью", "ии", "ть", "ешь", "ет", "ют", "ут", "ат", "ят",
+    "ит", "ишь", "ла", "ло", "ли", "а", "я", "о", "е", "ы", "и", "у", "ю",
+    "ь", "й",
+}, key=len, reverse=True)
+MIN_STEM = 3
+# Функция SQLite, регистрируемая для каждого соединения (reviews.signals).
+SQLITE_LOWER = "yamdb_lower"
+
+
+def stem(word):
+    """Упрощенный стеммер для резервного индекса."""
+    word = word.lower().replace("ё", "е")
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    return [stem(token) for token in TOKEN_RE.findall(text or "")]
+
+
+class PostgresSearchBackend:
+    """Полнотекстовый поиск PostgreSQL по `Title.search_vector`.
+
+    Вектор с весами (название - A, описание - B) поддерживает триггер БД,
+    так что он актуален при любой записи, включая bulk_create и COPY.
+    """
+
+    def search(self, queryset, query):
+        query = SearchQuery(query, config=SEARCH_CONFIG)
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank", "name", "id")
+        )
+
+
+class InvertedIndexBackend:
+    """Резервный поиск по инвертированному индексу в памяти процесса.
+
+    Перед поиском индекс сверяется с БД по числу произведений и максимуму
+    `updated`: измененные произведения переиндексируются, при расхождении
+    числа документов индекс строится заново.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.postings = defaultdict(dict)
+        self.documents = {}
+        self.latest = None
+
+    def search(self, queryset, query):
+        terms = set(tokenize(query))
+        with self.lock:
+            self.sync(queryset.model)
+            ranks = None
+            for term in terms:
+                postings = self.postings.get(term, {})
+                if ranks is None:
+                    ranks = dict(postings)
+                else:
+                    ranks = {
+                        pk: rank + postings[pk]
+                        for pk, rank in ranks.items() if pk in postings
+                    }
+        ranks = ranks or {}
+        return (
+            queryset.filter(pk__in=ranks)
+            .annotate(rank=Case(
+                *(When(pk=pk, then=Value(int(rank * 1000)))
+                  for pk, rank in ranks.items()),
+                default=Value(0),
+                output_field=IntegerField(),
+            ))
+            .order_by("-rank", "name", "id")
+        )
+
+    def sync(self, model):
+        state = model.objects.aggregate(
+            count=Count("id"), latest=Max("updated")
+        )
+        if (
+            state["latest"] == self.latest
+            and state["count"] == len(self.documents)
+        ):
+            return
+        changed = model.objects.all()
+        if self.latest is not None:
+            changed = changed.filter(updated__gte=self.latest)
+        for pk, name, description in changed.values_list(
+            "pk", "name", "description"
+        ):
+            self.index(pk, name, description)
+        if len(self.documents) != state["count"]:
+            self.reset()
+            for pk, name, description in model.objects.values_list(
+                "pk", "name", "description"
+            ):
+                self.index(pk, name, description)
+        self.latest = state["latest"]
+
+    def index(self, pk, name, description):
+        for term in self.documents.pop(pk, ()):
+            self.postings[term].pop(pk, None)
+        weights = defaultdict(float)
+        for term in tokenize(name):
+            weights[term] += NAME_WEIGHT
+        for term in tokenize(description):
+            weights[term] += DESCRIPTION_WEIGHT
+        for term, weight in weights.items():
+            self.postings[term][pk] = weight
+        self.documents[pk] = tuple(weights)
+
+
+postgres_backend = PostgresSearchBackend()
+fallback_backend = InvertedIndexBackend()
+
+
+def search_titles(queryset, query):
+    """Произведения по поисковому запросу, от наиболее релевантных."""
+    if connections[queryset.db].vendor == "postgresql":
+        return postgres_backend.search(queryset, query)
+    return fallback_backend.search(queryset, query)
+
+
+def unicode_lower(value):
+    return None if value is None else value.lower()
+
+
+class UnicodeLower(Lower):
+    """LOWER, который и на SQLite меняет регистр не только у ASCII."""
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection, function=SQLITE_LOWER, **extra_context
+        )
+
+
+def filter_contains(queryset, field, value):
+    """Подстрока `value` в поле без учета регистра.
+
+    LIKE в SQLite не учитывает регистр только у ASCII, поэтому там с
+    подстрокой сравнивается значение, приведенное к нижнему регистру.
+    """
+    if connections[queryset.db].vendor != "sqlite":
+        return queryset.filter(**{f"{field}__icontains": value})
+    alias = f"{field.replace('__', '_')}_lower"
+    return queryset.annotate(**{alias: UnicodeLower(field)}).filter(
+        **{f"{alias}__contains": value.lower()}
+    )
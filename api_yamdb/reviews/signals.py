@@ -0,0 +1,78 @@
+from django.db.backends.signals import connection_created
+from django.db.models.functions import Now
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import rankings
+from .models import Review, Title
+from .search import SQLITE_LOWER, unicode_lower
+
+
+@receiver(connection_created)
+def register_sqlite_functions(sender, connection, **kwargs):
+    """Функции Python, которых нет в SQLite (см. search.UnicodeLower)."""
+    if connection.vendor == "sqlite":
+        connection.connection.create_function(
+            SQLITE_LOWER, 1, unicode_lower, deterministic=True
+        )
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, raw, **kwargs):
+    """Учет новой или измененной оценки в рейтинге произведения."""
+    if raw:
+        return
+    previous = getattr(instance, "_rating_state", None)
+    if created:
+        Title.objects.update_rating(instance.title_id, instance.score)
+        rankings.update_title(
+            instance.title_id, instance.score, 1, instance.pub_date
+        )
+    elif previous is None or None in previous:
+        Title.objects.filter(pk=instance.title_id).recalculate_rating()
+        rankings.update_title(instance.title_id)
+    elif previous != (instance.title_id, instance.score):
+        title_id, score = previous
+        Title.objects.update_rating(title_id, score, -1)
+        Title.objects.update_rating(instance.title_id, instance.score)
+        rankings.update_title(title_id, score, -1, instance.pub_date)
+        rankings.update_title(
+            instance.title_id, instance.score, 1, instance.pub_date
+        )
+    instance.remember_rating_state()
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    """Исключение оценки удаленного отзыва, в том числе при каскаде."""
+    Title.objects.update_rating(instance.title_id, instance.score, -1)
+    rankings.update_title(
+        instance.title_id, instance.score, -1, instance.pub_date
+    )
+
+
+@receiver(post_save, sender=Title)
+def sync_rankings_on_title_save(sender, instance, created, raw, **kwargs):
+    """Смена категории переносит произведение в другой разрез рейтингов."""
+    if not created and not raw:
+        rankings.sync_title(instance.pk)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_title_on_genre_change(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    """Смена жанров не меняет строку произведения, отмечаем ее явно."""
+    if not reverse:
+        if action.startswith("post_"):
+            Title.objects.filter(pk=instance.pk).update(updated=Now())
+            rankings.sync_title(instance.pk)
+        return
+    if action == "pre_clear":
+        # В post_clear с обратной стороны pk_set не передается.
+        instance._cleared_titles = list(
+            instance.title.values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        pk_set = instance.__dict__.pop("_cleared_titles", None)
+    if action.startswith("post_") and pk_set:
+        Title.objects.filter(pk__in=pk_set).update(updated=Now())
@@ -1,9 +1,16 @@
 from django.contrib import admin
 
-from .models import User
+from .models import OutgoingEmail, User
 
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
     list_display = ("pk", "username", "email", "role")
     list_editable = ("role", )
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ("pk", "to", "created", "attempts", "next_attempt", "sent")
+    list_filter = ("sent",)
+    search_fields = ("to",)
@@ -0,0 +1,84 @@
+import time
+
+from django.conf import settings
+from django.core import mail
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from users.models import OutgoingEmail
+from users.outbox import deliver, get_stats
+
+
+class Command(BaseCommand):
+    """Обработчик очереди писем.
+
+    Разбирает очередь пачками, пока она не опустеет, используя одно
+    SMTP-соединение; когда писем нет, соединение закрывается и команда
+    ждет --interval секунд. Соединение открывается, только если есть
+    письма к отправке. После каждой непустой пачки выводит глубину
+    очереди и задержку доставки.
+    """
+
+    help = "Delivering queued emails from the outbox."
+
+    def add_arguments(self, parser):
+        config = settings.EMAIL_OUTBOX
+        parser.add_argument(
+            "--batch-size", type=int, default=config["BATCH_SIZE"],
+            help="Emails per batch.",
+        )
+        parser.add_argument(
+            "--interval", type=float, default=config["POLL_INTERVAL"],
+            help="Seconds to wait when the outbox is empty.",
+        )
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Drain the due emails once and exit.",
+        )
+        parser.add_argument(
+            "--stats", action="store_true",
+            help="Print outbox depth and lag and exit.",
+        )
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            self.write_stats()
+            return
+        connection = mail.get_connection()
+        try:
+            while True:
+                self.drain(connection, options["batch_size"])
+                if options["once"]:
+                    return
+                time.sleep(options["interval"])
+                close_old_connections()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+
+    def drain(self, connection, batch_size):
+        if not OutgoingEmail.objects.due().exists():
+            return
+        try:
+            connection.open()
+            while True:
+                sent, failed = deliver(connection, batch_size)
+                if not sent and not failed:
+                    break
+                self.write_stats(sent=sent, failed=failed)
+                if not sent:
+                    # Сервер не принимает письма: ждем следующего цикла.
+                    break
+        except Exception as error:
+            self.stderr.write(f"Delivery failed: {error}")
+        finally:
+            connection.close()
+
+    def write_stats(self, **counters):
+        stats = {**counters, **get_stats()}
+        self.stdout.write(" ".join(
+            f"{name}={value:.1f}" if isinstance(value, float)
+            else f"{name}={value}"
+            for name, value in stats.items()
+        ))
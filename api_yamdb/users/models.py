@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.contrib.auth.base_user import AbstractBaseUser, BaseUserManager
 from django.contrib.auth.models import PermissionsMixin
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from .validators import additional_username_validator
@@ -105,6 +107,16 @@ class User(AbstractBaseUser, PermissionsMixin):
     REQUIRED_FIELDS = ("username",)
     objects = UserManager()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_username()
+        return instance
+
+    def remember_username(self):
+        """Запоминает username, сохраненный в БД (подпись отзывов)."""
+        self._saved_username = self.__dict__.get("username")
+
     class Meta:
         verbose_name = _("Пользователь")
         verbose_name_plural = _("Пользователи")
@@ -130,3 +142,53 @@ class Auth(models.Model):
         verbose_name=_("Код подтверждения"),
         help_text=_("Код подтверждения с почты."),
     )
+
+
+class OutboxQuerySet(models.QuerySet):
+    def pending(self):
+        """Неотправленные письма, для которых не исчерпаны попытки."""
+        return self.filter(
+            sent__isnull=True,
+            attempts__lt=settings.EMAIL_OUTBOX["MAX_ATTEMPTS"],
+        )
+
+    def due(self):
+        return self.pending().filter(next_attempt__lte=timezone.now())
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку.
+
+    Запись создается в транзакции запроса, отправляет ее отдельный процесс
+    (команда send_emails), поэтому время ответа не зависит от почтового
+    сервера.
+    """
+
+    to = models.EmailField(_("Получатель"), max_length=254)
+    subject = models.CharField(_("Тема"), max_length=255)
+    body = models.TextField(_("Текст"))
+    from_email = models.CharField(_("Отправитель"), max_length=254)
+    created = models.DateTimeField(_("Дата создания"), auto_now_add=True)
+    next_attempt = models.DateTimeField(
+        _("Следующая попытка"), default=timezone.now
+    )
+    attempts = models.PositiveSmallIntegerField(_("Попытки"), default=0)
+    last_error = models.TextField(_("Последняя ошибка"), blank=True)
+    sent = models.DateTimeField(_("Дата отправки"), null=True, blank=True)
+
+    objects = OutboxQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("Письмо")
+        verbose_name_plural = _("Исходящие письма")
+        ordering = ("next_attempt", "id")
+        indexes = (
+            models.Index(
+                fields=("next_attempt", "id"),
+                name="users_outbox_pending_idx",
+                condition=models.Q(sent__isnull=True),
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.to}: {self.subject}"[:MAX_LENGTH]
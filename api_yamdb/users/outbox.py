@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import mail
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+
+def enqueue(to, subject, body, from_email=None):
+    """Постановка письма в очередь в текущей транзакции."""
+    return OutgoingEmail.objects.create(
+        to=to,
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def get_backoff(attempts):
+    """Задержка перед следующей попыткой, экспоненциально растущая."""
+    config = settings.EMAIL_OUTBOX
+    return timedelta(seconds=min(
+        config["BACKOFF"] * 2 ** (attempts - 1), config["MAX_BACKOFF"]
+    ))
+
+
+def deliver(connection, batch_size=None):
+    """Отправка одной пачки писем, подошедших к отправке.
+
+    Строки блокируются с SKIP LOCKED, так что несколько обработчиков не
+    отправят одно письмо дважды. Все письма пачки идут через одно открытое
+    соединение; неудачные откладываются по get_backoff. Возвращает число
+    отправленных и неудачных писем.
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX["BATCH_SIZE"]
+    sent = failed = 0
+    with transaction.atomic():
+        batch = list(
+            OutgoingEmail.objects.due()
+            .select_for_update(skip_locked=True)[:batch_size]
+        )
+        for email in batch:
+            message = mail.EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=[email.to],
+                connection=connection,
+            )
+            email.attempts += 1
+            try:
+                message.send()
+            except Exception as error:
+                failed += 1
+                email.last_error = f"{type(error).__name__}: {error}"
+                email.next_attempt = timezone.now() + get_backoff(
+                    email.attempts
+                )
+            else:
+                sent += 1
+                email.sent = timezone.now()
+        OutgoingEmail.objects.bulk_update(
+            batch, ("attempts", "last_error", "next_attempt", "sent")
+        )
+    return sent, failed
+
+
+def get_stats():
+    """Глубина очереди и задержка доставки.
+
+    lag - возраст самого старого неотправленного письма в секундах,
+    dead - письма, для которых исчерпаны попытки.
+    """
+    pending = OutgoingEmail.objects.pending().aggregate(oldest=Min("created"))
+    oldest = pending["oldest"]
+    return {
+        "depth": OutgoingEmail.objects.pending().count(),
+        "lag": (
+            (timezone.now() - oldest).total_seconds() if oldest else 0.0
+        ),
+        "dead": OutgoingEmail.objects.filter(
+            sent__isnull=True,
+            attempts__gte=settings.EMAIL_OUTBOX["MAX_ATTEMPTS"],
+        ).count(),
+    }
@@ -0,0 +1,169 @@
+import asyncio
+import json
+
+import pytest
+
+
+class CountingWSGI:
+    """WSGI-приложение Django, считающее вызовы."""
+
+    def __init__(self):
+        from django.core.wsgi import get_wsgi_application
+
+        self.application = get_wsgi_application()
+        self.calls = 0
+
+    def __call__(self, environ, start_response):
+        self.calls += 1
+        return self.application(environ, start_response)
+
+
+@pytest.fixture
+def asgi():
+    from api.fastpath import FastPathApplication
+
+    application = FastPathApplication(CountingWSGI())
+    yield application
+    application.executor.shutdown(wait=True)
+
+
+def call(application, method, path, query='', headers=(), body=b''):
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [
+            (name.lower().encode(), value.encode()) for name, value in headers
+        ],
+        'scheme': 'http',
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 5000),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    start = sent[0]
+    return (
+        start['status'],
+        [(name.decode(), value.decode()) for name, value in start['headers']],
+        b''.join(message.get('body', b'') for message in sent[1:]),
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestASGIFastPath:
+
+    @pytest.mark.parametrize('path', (
+        '/api/v1/categories/', '/api/v1/genres/', '/api/v1/titles/',
+        '/api/v1/titles/{title}/',
+    ))
+    def test_hits_served_without_django(self, asgi, client, title, path):
+        path = path.format(title=title.id)
+        client.get(path)
+        expected = client.get(path)
+        assert expected['X-Cache'] == 'HIT'
+        status, headers, body = call(asgi, 'GET', path)
+        assert asgi.wsgi_application.calls == 0, (
+            'Проверьте, что попадание в кэш отдается без WSGI-приложения'
+        )
+        assert status == 200
+        assert body == expected.content, (
+            'Проверьте, что тело ответа совпадает с ответом представления'
+        )
+        assert headers == list(expected.items()), (
+            'Проверьте, что заголовки совпадают с ответом представления'
+        )
+
+    def test_miss_goes_through_view_and_fills_cache(self, asgi, category):
+        from api.metrics import registry
+
+        key = (
+            'yamdb_http_requests_total',
+            (('route', 'category-list'), ('method', 'GET'), ('status', '200')),
+        )
+        requests = registry.counters[key]
+        status, headers, body = call(asgi, 'GET', '/api/v1/categories/')
+        assert status == 200 and ('X-Cache', 'MISS') in headers
+        assert asgi.wsgi_application.calls == 1
+        status, headers, cached = call(asgi, 'GET', '/api/v1/categories/')
+        assert ('X-Cache', 'HIT') in headers
+        assert asgi.wsgi_application.calls == 1
+        assert cached == body
+        assert registry.counters[key] == requests + 2, (
+            'Проверьте, что ответы быстрого пути попадают в метрики'
+        )
+
+    def test_conditional_and_head(self, asgi, client, category):
+        client.get('/api/v1/categories/')
+        expected = client.get(
+            '/api/v1/categories/',
+            HTTP_IF_NONE_MATCH=client.get('/api/v1/categories/')['ETag'],
+        )
+        status, headers, body = call(
+            asgi, 'GET', '/api/v1/categories/',
+            headers=[('If-None-Match', expected['ETag'])],
+        )
+        assert status == 304 and body == b''
+        assert headers == list(expected.items()), (
+            'Проверьте, что 304 из быстрого пути совпадает с ответом '
+            'представления'
+        )
+        status, headers, body = call(asgi, 'HEAD', '/api/v1/categories/')
+        assert status == 200 and body == b''
+        assert asgi.wsgi_application.calls == 0
+
+    def test_writes_and_authenticated_reads_use_views(self, asgi, client,
+                                                      admin, category):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        client.get('/api/v1/categories/')
+        client.get('/api/v1/categories/')
+        token = str(RefreshToken.for_user(admin).access_token)
+        authorization = [('Authorization', f'Bearer {token}')]
+        status, headers, _ = call(
+            asgi, 'GET', '/api/v1/categories/', headers=authorization
+        )
+        assert status == 200 and ('X-Cache', 'HIT') not in headers
+        assert asgi.wsgi_application.calls == 1, (
+            'Проверьте, что запросы с авторизацией выполняет представление'
+        )
+        status, _, body = call(
+            asgi, 'POST', '/api/v1/categories/',
+            headers=[*authorization, ('Content-Type', 'application/json')],
+            body=json.dumps({'name': 'Книга', 'slug': 'book'}).encode(),
+        )
+        assert status == 201, body
+        status, _, body = call(asgi, 'GET', '/api/v1/categories/')
+        assert 'book' in body.decode(), (
+            'Проверьте, что запись через ASGI сбрасывает кэш быстрого пути'
+        )
+        call(
+            asgi, 'GET', '/api/v1/categories/',
+            headers=[('Accept', 'text/html')],
+        )
+        assert asgi.wsgi_application.calls == 4
+
+    def test_lifespan(self, asgi):
+        messages = [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(asgi({'type': 'lifespan'}, receive, send))
+        assert sent == [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete'
+        ]
@@ -0,0 +1,97 @@
+import pytest
+
+
+@pytest.fixture
+def token_client(user):
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}'
+    )
+    return client
+
+
+@pytest.fixture
+def shared_cache(settings, tmp_path):
+    # Файловый кэш, как memcached или redis, виден всем процессам.
+    settings.CACHES = {
+        **settings.CACHES,
+        'principals': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path / 'principals'),
+        },
+    }
+    settings.PRINCIPAL_CACHE = {
+        **settings.PRINCIPAL_CACHE, 'ALIAS': 'principals'
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures('shared_cache')
+class TestPrincipalCache:
+
+    def test_hot_path_without_queries(self, token_client,
+                                      django_assert_num_queries, user):
+        assert token_client.get('/api/v1/users/me/').status_code == 200
+        with django_assert_num_queries(0):
+            response = token_client.get('/api/v1/users/me/')
+        assert response.status_code == 200, (
+            'Проверьте, что повторный запрос с тем же токеном не обращается '
+            'к БД'
+        )
+        assert response.json()['username'] == user.username
+        with django_assert_num_queries(0):
+            response = token_client.get('/api/v1/users/')
+        assert response.status_code == 403, (
+            'Проверьте, что права проверяются по закэшированному пользователю'
+        )
+
+    def test_role_change_invalidates(self, token_client, user):
+        from users.models import User
+
+        assert token_client.get('/api/v1/users/').status_code == 403
+        user.role = User.ADMIN
+        user.save()
+        assert token_client.get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что смена роли сбрасывает кэш пользователя'
+        )
+
+    def test_deactivated_user_is_rejected(self, token_client, user):
+        assert token_client.get('/api/v1/users/me/').status_code == 200
+        user.is_active = False
+        user.save()
+        assert token_client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что деактивированный пользователь не проходит '
+            'аутентификацию'
+        )
+
+    def test_patch_me_keeps_password(self, token_client, user):
+        user.set_password('secret-password')
+        user.save()
+        token_client.get('/api/v1/users/me/')
+        response = token_client.patch(
+            '/api/v1/users/me/', data={'bio': 'Новая биография'}
+        )
+        assert response.status_code == 200
+        user.refresh_from_db()
+        assert user.bio == 'Новая биография'
+        assert user.check_password('secret-password'), (
+            'Проверьте, что изменение профиля не затирает пароль'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_process_local_cache_is_bypassed(token_client, user,
+                                         django_assert_num_queries):
+    from users.models import User
+
+    assert token_client.get('/api/v1/users/me/').status_code == 200
+    with django_assert_num_queries(1):
+        token_client.get('/api/v1/users/me/')
+    # Как сохранение в другом процессе: сброс версии сюда не доходит.
+    User.objects.filter(pk=user.pk).update(is_active=False)
+    assert token_client.get('/api/v1/users/me/').status_code == 401, (
+        'Проверьте, что с кэшем в памяти процесса пользователь читается из БД'
+    )
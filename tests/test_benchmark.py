@@ -0,0 +1,85 @@
+import io
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBenchmark:
+
+    def run(self, tmp_path, *args):
+        output = tmp_path / 'result.json'
+        call_command(
+            'benchmark', '--in-place', '--scale', '0.001', '--iterations', '2',
+            '--warmup', '1', '--output', str(output), *args,
+            stdout=io.StringIO(),
+        )
+        return json.loads(output.read_text(encoding='utf-8'))
+
+    def test_all_routes_measured(self, tmp_path):
+        from api.benchmark import SCENARIOS
+
+        report = self.run(tmp_path)
+        assert set(report['results']) == {'client', 'wsgi'}, (
+            'Проверьте, что замеры идут и через тестовый клиент, и через '
+            'WSGI-сервер'
+        )
+        for mode, results in report['results'].items():
+            assert set(results) == {scenario.name for scenario in SCENARIOS}
+            for name, result in results.items():
+                assert result['errors'] == 0, (
+                    f'Сценарий {mode} {name} вернул неожиданный статус: '
+                    f'{result["statuses"]}'
+                )
+                for key in ('p50', 'p99', 'throughput', 'queries'):
+                    assert key in result
+        assert report['results']['client']['titles-create']['queries'] > 0
+        assert report['results']['wsgi']['titles-create']['queries'] is None
+
+    def test_baseline_regression(self, tmp_path):
+        report = self.run(tmp_path, '--transports', 'client',
+                          '--scenarios', 'genres-list', 'comments-list')
+        baseline = tmp_path / 'baseline.json'
+        for result in report['results']['client'].values():
+            result['p50'] /= 100
+            result['queries'] -= 1
+        baseline.write_text(json.dumps(report), encoding='utf-8')
+        call_command('flush', interactive=False)
+        with pytest.raises(CommandError) as error:
+            self.run(tmp_path, '--transports', 'client',
+                     '--scenarios', 'genres-list', 'comments-list',
+                     '--baseline', str(baseline))
+        assert 'comments-list: p50' in str(error.value), (
+            'Проверьте, что замедление относительно базового прогона '
+            'приводит к ошибке'
+        )
+        assert 'comments-list: queries' in str(error.value)
+
+    def test_throttling_disabled(self, tmp_path, settings):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {
+                **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'],
+                'signup': '2/hour',
+                'token': '2/hour',
+            },
+        }
+        report = self.run(tmp_path, '--iterations', '5',
+                          '--scenarios', 'auth-signup', 'auth-token')
+        for mode, results in report['results'].items():
+            for name, result in results.items():
+                assert result['errors'] == 0, (
+                    f'Проверьте, что лимиты запросов не мешают сценарию '
+                    f'{mode} {name}: {result["statuses"]}'
+                )
+
+
+def test_compare():
+    from api.benchmark import compare
+
+    baseline = {'client': {'titles': {'p50': 10.0, 'queries': 3}}}
+    faster = {'client': {'titles': {'p50': 11.0, 'queries': 3}}}
+    slower = {'client': {'titles': {'p50': 13.0, 'queries': 3}}}
+    assert compare(faster, baseline, 0.2) == []
+    assert len(compare(slower, baseline, 0.2)) == 1
@@ -0,0 +1,167 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestBulkWrite:
+
+    titles_url = '/api/v1/titles/bulk/'
+
+    def payload(self, size):
+        return [
+            {
+                'name': f'Произведение {i}',
+                'year': 2000 + i,
+                'genre': ['drama', 'comedy'],
+                'category': 'movie',
+            }
+            for i in range(size)
+        ]
+
+    def test_bulk_create_titles(self, admin_client, django_assert_num_queries,
+                                category, genres):
+        from django.db import connection
+        from reviews.models import Title
+
+        # Слаги категорий и жанров, вставка произведений, вставка связей,
+        # повторная выборка для ответа и загрузка жанров, savepoint. Без
+        # RETURNING (SQLite) произведения вставляются по одному.
+        queries = 8
+        if not connection.features.can_return_ids_from_bulk_insert:
+            queries += 20 - 1
+        with django_assert_num_queries(queries):
+            response = admin_client.post(
+                self.titles_url, data=self.payload(20), format='json'
+            )
+        assert response.status_code == 201, (
+            'Проверьте, что пакетное создание произведений возвращает 201'
+        )
+        data = response.json()
+        assert [item['name'] for item in data] == [
+            f'Произведение {i}' for i in range(20)
+        ], 'Проверьте, что ответ сохраняет порядок входных данных'
+        assert data[0]['genre'] == [
+            {'name': 'Драма', 'slug': 'drama'},
+            {'name': 'Комедия', 'slug': 'comedy'},
+        ]
+        assert Title.objects.count() == 20
+
+    def test_bulk_errors_in_order(self, admin_client, category, genres):
+        from reviews.models import Title
+
+        payload = self.payload(3)
+        payload[1]['genre'] = ['unknown']
+        payload[2]['year'] = 'год'
+        response = admin_client.post(
+            self.titles_url, data=payload, format='json'
+        )
+        assert response.status_code == 400
+        errors = response.json()
+        assert errors[0] == {}
+        assert 'genre' in errors[1] and 'year' in errors[2], (
+            'Проверьте, что ошибки возвращаются в порядке входных данных'
+        )
+        assert not Title.objects.exists(), (
+            'Проверьте, что при ошибке в пакете ничего не записывается'
+        )
+
+    def test_bulk_partial_update_titles(self, admin_client, title, genres):
+        response = admin_client.patch(
+            self.titles_url,
+            data=[{'id': title.id, 'name': 'Новое', 'genre': ['comedy']},
+                  {'id': 0, 'name': 'Нет'}],
+            format='json',
+        )
+        assert response.status_code == 400
+        assert response.json()[1] == {'id': ['Объект не найден.']}
+
+        response = admin_client.patch(
+            self.titles_url,
+            data=[{'id': title.id, 'name': 'Новое', 'genre': ['comedy']}],
+            format='json',
+        )
+        assert response.status_code == 200
+        title.refresh_from_db()
+        assert title.name == 'Новое'
+        assert list(title.genre.values_list('slug', flat=True)) == ['comedy']
+
+        response = admin_client.patch(
+            self.titles_url,
+            data=[{'id': title.id, 'genre': ['drama']},
+                  {'id': title.id, 'genre': ['drama']}],
+            format='json',
+        )
+        assert response.status_code == 400, (
+            'Проверьте, что один объект нельзя изменить в пакете дважды'
+        )
+        assert response.json() == [
+            {'id': ['Объект указан в пакете несколько раз.']}
+        ] * 2
+
+    def test_bulk_invalid_lookups(self, admin_client, title, category):
+        response = admin_client.patch(
+            self.titles_url,
+            data=[{'id': title.id, 'name': 'Новое'},
+                  {'id': 'abc', 'name': 'Нет'},
+                  {'id': [title.id], 'name': 'Нет'}],
+            format='json',
+        )
+        assert response.status_code == 400, (
+            'Проверьте, что некорректный id не приводит к ошибке сервера'
+        )
+        assert response.json() == [
+            {}, {'id': ['Объект не найден.']}, {'id': ['Объект не найден.']}
+        ], 'Проверьте, что не найденными считаются только неверные id'
+
+        response = admin_client.patch(
+            '/api/v1/categories/bulk/',
+            data=[{'slug': {}}, {'slug': 'movie', 'name': 'Кино'}],
+            format='json',
+        )
+        assert response.status_code == 400
+        assert response.json() == [{'slug': ['Объект не найден.']}, {}]
+
+    def test_bulk_genres_unique(self, admin_client, user_client, genres):
+        url = '/api/v1/genres/bulk/'
+        payload = [
+            {'name': 'Ужасы', 'slug': 'horror'},
+            {'name': 'Драма 2', 'slug': 'drama'},
+            {'name': 'Ужасы 2', 'slug': 'horror'},
+        ]
+        assert user_client.post(
+            url, data=payload, format='json'
+        ).status_code == 403
+        errors = admin_client.post(url, data=payload, format='json').json()
+        assert all('slug' in error for error in errors), (
+            'Проверьте, что пакет проверяется на повторы слагов внутри пакета '
+            'и в БД'
+        )
+        response = admin_client.patch(
+            url, data=[{'slug': 'drama', 'name': 'Драма!'}], format='json'
+        )
+        assert response.json() == [{'name': 'Драма!', 'slug': 'drama'}]
+
+    def test_bulk_create_without_returned_ids(self, admin_client, monkeypatch,
+                                              category, genres):
+        from django.db import connection
+        from reviews.models import Title
+
+        # Как на SQLite: bulk_create не проставляет первичные ключи.
+        monkeypatch.setattr(
+            connection.features, 'can_return_ids_from_bulk_insert', False
+        )
+        response = admin_client.post(
+            self.titles_url, data=self.payload(2), format='json'
+        )
+        assert response.status_code == 201, response.content
+        assert [item['genre'] for item in response.json()] == [[
+            {'name': 'Драма', 'slug': 'drama'},
+            {'name': 'Комедия', 'slug': 'comedy'},
+        ]] * 2
+        assert Title.objects.filter(genre__slug='drama').count() == 2
+        response = admin_client.post(
+            '/api/v1/genres/bulk/',
+            data=[{'name': 'Ужасы', 'slug': 'horror'}], format='json',
+        )
+        assert response.json() == [{'name': 'Ужасы', 'slug': 'horror'}], (
+            'Проверьте пакетное создание без RETURNING'
+        )
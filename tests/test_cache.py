@@ -0,0 +1,104 @@
+import pytest
+
+
+@pytest.mark.django_db(transaction=True)
+class TestResponseCache:
+
+    def test_anonymous_reads_are_cached(self, client,
+                                        django_assert_num_queries, title):
+        url = f'/api/v1/titles/{title.id}/'
+        first = client.get(url)
+        assert first['X-Cache'] == 'MISS'
+        with django_assert_num_queries(0):
+            second = client.get(url)
+        assert second['X-Cache'] == 'HIT', (
+            'Проверьте, что повторный анонимный запрос отдается из кэша'
+        )
+        assert second.content == first.content
+
+    def test_query_params_are_normalized(self, client, title):
+        client.get('/api/v1/titles/?year=1994&name=Побег')
+        response = client.get('/api/v1/titles/?name=Побег&year=1994')
+        assert response['X-Cache'] == 'HIT', (
+            'Проверьте, что порядок параметров запроса не влияет на ключ'
+        )
+
+    def test_api_write_invalidates(self, client, user_client, title):
+        url = f'/api/v1/titles/{title.id}/'
+        client.get(url)
+        user_client.post(
+            f'{url}reviews/', data={'text': 'Отзыв', 'score': 9}
+        )
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что новый отзыв сбрасывает кэш произведения'
+        )
+        assert response.json()['rating'] == 9
+
+    def test_orm_write_invalidates(self, client, genres, title):
+        client.get('/api/v1/titles/')
+        genres[0].name = 'Новое название'
+        genres[0].save()
+        response = client.get('/api/v1/titles/')
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что изменение жанра (админка, ORM) сбрасывает кэш'
+        )
+        assert 'Новое название' in response.content.decode()
+
+    def test_bulk_write_invalidates(self, client, admin_client, category):
+        client.get('/api/v1/categories/')
+        admin_client.post(
+            '/api/v1/categories/bulk/',
+            data=[{'name': 'Книга', 'slug': 'book'}],
+            format='json',
+        )
+        assert client.get('/api/v1/categories/')['X-Cache'] == 'MISS'
+
+    def test_only_author_renames_invalidate_reviews(self, client, user,
+                                                    user_client,
+                                                    django_user_model, title):
+        from reviews.models import Review
+
+        Review.objects.create(author=user, title=title, text='Отзыв', score=7)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        client.get(url)
+        django_user_model.objects.create_user(
+            username='newbie', email='newbie@yamdb.fake'
+        )
+        user_client.patch(
+            '/api/v1/users/me/', data={'bio': 'Новая биография'}
+        )
+        assert client.get(url)['X-Cache'] == 'HIT', (
+            'Проверьте, что регистрация и правка профиля не сбрасывают кэш '
+            'отзывов'
+        )
+
+        user.refresh_from_db()
+        user.username = 'renamed'
+        user.save()
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что смена имени автора сбрасывает кэш отзывов'
+        )
+        assert response.json()['results'][0]['author'] == 'renamed'
+
+        django_user_model.objects.get(username='newbie').delete()
+        assert client.get(url)['X-Cache'] == 'MISS', (
+            'Проверьте, что удаление пользователя сбрасывает кэш отзывов'
+        )
+
+    def test_authenticated_reads_are_not_cached(self, user_client, title):
+        user_client.get('/api/v1/titles/')
+        response = user_client.get('/api/v1/titles/')
+        assert 'X-Cache' not in response, (
+            'Проверьте, что ответы авторизованным пользователям не кэшируются'
+        )
+
+    def test_stats(self, client, title):
+        from api import cache
+
+        hits, misses = cache.stats['hits'], cache.stats['misses']
+        client.get('/api/v1/genres/')
+        client.get('/api/v1/genres/')
+        assert cache.stats['hits'] == hits + 1
+        assert cache.stats['misses'] == misses + 1
@@ -0,0 +1,68 @@
+import pytest
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConditionalRequests:
+
+    def test_if_none_match_on_list(self, client, django_assert_num_queries,
+                                   title):
+        url = '/api/v1/titles/'
+        response = client.get(url)
+        etag = response['ETag']
+        assert etag and response['Last-Modified'], (
+            'Проверьте, что список отдает заголовки ETag и Last-Modified'
+        )
+        with django_assert_num_queries(0):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Проверьте, что совпадающий If-None-Match возвращает 304'
+        )
+        assert client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        ).status_code == 304
+
+    def test_review_list_etag_changes_on_write(self, client, user_client,
+                                               title):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        etag = client.get(url)['ETag']
+        user_client.post(url, data={'text': 'Отзыв', 'score': 4})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что новый отзыв меняет ETag списка отзывов'
+        )
+        assert response['ETag'] != etag
+
+    def test_authenticated_detail(self, user_client,
+                                  django_assert_num_queries, title):
+        url = f'/api/v1/titles/{title.id}/'
+        etag = user_client.get(url)['ETag']
+        # Объект загружается для расчета ETag, но не сериализуется.
+        with django_assert_num_queries(2):
+            response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+    def test_if_match(self, user_client, another_user_client, title):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        review_id = user_client.post(
+            url, data={'text': 'Отзыв', 'score': 4}
+        ).json()['id']
+        url = f'{url}{review_id}/'
+        etag = user_client.get(url)['ETag']
+
+        response = user_client.patch(
+            url, data={'score': 5}, HTTP_IF_MATCH=etag
+        )
+        assert response.status_code == 200
+        new_etag = response['ETag']
+        assert new_etag == user_client.get(url)['ETag'], (
+            'Проверьте, что ответ на запись содержит новый ETag объекта'
+        )
+
+        response = user_client.patch(
+            url, data={'score': 6}, HTTP_IF_MATCH=etag
+        )
+        assert response.status_code == 412, (
+            'Проверьте, что устаревший If-Match возвращает 412'
+        )
+        response = user_client.delete(url, HTTP_IF_MATCH=new_etag)
+        assert response.status_code == 204
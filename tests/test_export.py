@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+
+def read_lines(response):
+    content = b''.join(response.streaming_content).decode()
+    return [json.loads(line) for line in content.splitlines()]
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    @pytest.fixture
+    def review(self, user, title):
+        from reviews.models import Comment, Review
+
+        review = Review.objects.create(
+            author=user, title=title, text='Отзыв', score=8
+        )
+        Comment.objects.create(author=user, review=review, text='Коммент')
+        return review
+
+    def test_export_requires_admin(self, client, user_client):
+        for url in ('/api/v1/export/titles/', '/api/v1/export/reviews/',
+                    '/api/v1/export/comments/'):
+            assert client.get(url).status_code == 401, (
+                f'Проверьте, что `{url}` недоступен без авторизации'
+            )
+            assert user_client.get(url).status_code == 403, (
+                f'Проверьте, что `{url}` доступен только администратору'
+            )
+
+    def test_export_titles(self, admin_client, title, review, category):
+        from reviews.models import Title
+
+        Title.objects.create(name='Другое', year=2001)
+        response = admin_client.get('/api/v1/export/titles/')
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/x-ndjson'
+        rows = read_lines(response)
+        assert len(rows) == 2, 'Проверьте, что выгружаются все произведения'
+        detail = admin_client.get(f'/api/v1/titles/{title.id}/').json()
+        assert rows[0] == detail, (
+            'Проверьте, что выгрузка совпадает с ответом `/titles/{id}/`'
+        )
+
+        rows = read_lines(
+            admin_client.get(f'/api/v1/export/titles/?category={category.slug}')
+        )
+        assert [row['id'] for row in rows] == [title.id], (
+            'Проверьте, что выгрузка фильтруется по полям CustomSearchFilter'
+        )
+
+    def test_export_json_array(self, admin_client, title, review):
+        from reviews.models import Title
+
+        Title.objects.create(name='Другое', year=2001)
+        response = admin_client.get(
+            '/api/v1/export/titles/', HTTP_ACCEPT='application/json'
+        )
+        assert response.status_code == 200, (
+            'Проверьте, что выгрузка доступна клиентам с Accept: '
+            'application/json'
+        )
+        assert response['Content-Type'] == 'application/json'
+        rows = json.loads(b''.join(response.streaming_content))
+        assert [row['name'] for row in rows] == [title.name, 'Другое'], (
+            'Проверьте, что для application/json выгрузка - JSON-массив'
+        )
+        response = admin_client.get(
+            '/api/v1/export/comments/?since=2100-01-01T00:00:00Z',
+            HTTP_ACCEPT='application/json',
+        )
+        assert json.loads(b''.join(response.streaming_content)) == []
+
+    def test_export_since(self, admin_client, review):
+        rows = read_lines(admin_client.get('/api/v1/export/reviews/'))
+        assert rows[0]['id'] == review.id
+        assert rows[0]['title'] == review.title_id
+        rows = read_lines(admin_client.get(
+            '/api/v1/export/comments/?since=2100-01-01T00:00:00Z'
+        ))
+        assert rows == [], (
+            'Проверьте, что параметр `since` ограничивает выгрузку по дате'
+        )
+        response = admin_client.get('/api/v1/export/reviews/?since=bad')
+        assert response.status_code == 400
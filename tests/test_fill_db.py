@@ -0,0 +1,110 @@
+import io
+import os
+
+import pytest
+from django.core.management import call_command
+
+DATA_FOLDER = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), 'api_yamdb', 'static', 'data'
+)
+
+
+def fill_db(*args, **options):
+    out = io.StringIO()
+    call_command(
+        'fill_db', *args, data_folder=DATA_FOLDER, stdout=out,
+        stderr=io.StringIO(), **options
+    )
+    return out.getvalue()
+
+
+@pytest.mark.django_db
+class TestFillDb:
+
+    @pytest.mark.parametrize('copy', (True, False))
+    def test_load_all(self, copy):
+        from reviews.models import Comment, Review, Title, User
+
+        output = fill_db(chunk_size=7, copy=copy)
+        assert 'rows/s' in output, (
+            'Проверьте, что команда сообщает скорость загрузки'
+        )
+        assert User.objects.count() > 0
+        assert Comment.objects.count() > 0
+        title = Title.objects.get(pk=1)
+        scores = Review.objects.filter(title=title).values_list(
+            'score', flat=True
+        )
+        assert title.score_count == len(scores), (
+            'Проверьте, что после загрузки пересчитан рейтинг'
+        )
+        assert title.score_sum == sum(scores)
+        assert title.genre.exists()
+        review = Review.objects.get(pk=1)
+        assert review.pub_date.year == 2019, (
+            'Проверьте, что дата публикации берется из CSV'
+        )
+        created = Title.objects.create(name='Новое', year=2000)
+        assert created.pk > Title.objects.exclude(pk=created.pk).latest(
+            'pk'
+        ).pk, 'Проверьте, что последовательности ключей сброшены'
+
+    @pytest.mark.parametrize('copy', (True, False))
+    def test_modes(self, copy):
+        from django.db import IntegrityError, transaction
+        from reviews.models import Category
+
+        tables = ['category']
+        fill_db(tables=tables, copy=copy)
+        Category.objects.filter(pk=1).update(name='Изменено')
+        with pytest.raises(IntegrityError), transaction.atomic():
+            fill_db(tables=tables, copy=copy)
+
+        fill_db(tables=tables, copy=copy, mode='skip')
+        assert Category.objects.get(pk=1).name == 'Изменено', (
+            'Проверьте, что режим skip не трогает существующие строки'
+        )
+        fill_db(tables=tables, copy=copy, mode='upsert')
+        assert Category.objects.get(pk=1).name == 'Фильм', (
+            'Проверьте, что режим upsert обновляет существующие строки'
+        )
+
+    def test_genre_links_invalidate_titles(self, monkeypatch):
+        from reviews.management.commands import fill_db as command
+        from reviews.models import Title
+
+        fill_db(tables=['genre', 'category', 'titles'])
+        bumped = []
+        monkeypatch.setattr(command, 'bump', lambda *models: bumped.extend(
+            models
+        ))
+        fill_db(tables=['genre_title'])
+        assert Title in bumped, (
+            'Проверьте, что загрузка жанров произведений сбрасывает кэш '
+            'произведений'
+        )
+
+    @pytest.mark.parametrize('copy', (True, False))
+    def test_invalid_rows_are_skipped(self, tmp_path, copy):
+        from reviews.models import Title
+
+        (tmp_path / 'titles.csv').write_text(
+            'id,name,year,category_id,description\n'
+            '1,Хорошее,1994,,"С ""кавычками"", запятой"\n'
+            '2,Плохое,год,,\n'
+            '3,Тоже хорошее,1995,,\n',
+            encoding='UTF-8',
+        )
+        err = io.StringIO()
+        call_command(
+            'fill_db', tables=['titles'], data_folder=str(tmp_path),
+            copy=copy, chunk_size=2, stdout=io.StringIO(), stderr=err,
+        )
+        assert list(
+            Title.objects.order_by('pk').values_list('name', 'description')
+        ) == [
+            ('Хорошее', 'С "кавычками", запятой'), ('Тоже хорошее', None),
+        ], 'Проверьте, что невалидные строки пропускаются'
+        assert 'row 2' in err.getvalue(), (
+            'Проверьте, что о невалидных строках сообщается с их номером'
+        )
@@ -0,0 +1,73 @@
+import io
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+class TestGenerateData:
+
+    def test_generate_to_db(self, title):
+        from django.db.models import Count
+        from reviews.generator import DatasetGenerator
+        from reviews.models import Comment, Review, Title
+
+        call_command(
+            'generate_data', scale=0.01, chunk_size=300, stdout=io.StringIO()
+        )
+        assert Title.objects.count() == 101, (
+            'Проверьте, что генератор добавляет данные к существующим'
+        )
+        sizes = DatasetGenerator(scale=0.01).sizes
+        assert Review.objects.count() == sizes['review'], (
+            'Проверьте, что генерируется заданное число отзывов'
+        )
+        assert Comment.objects.count() == sizes['comments']
+        counts = sorted(
+            Title.objects.annotate(reviews=Count('review')).order_by()
+            .values_list('reviews', flat=True),
+            reverse=True,
+        )
+        assert sum(counts[:10]) > 0.2 * sum(counts), (
+            'Проверьте, что популярность произведений распределена '
+            'неравномерно'
+        )
+        hot = Title.objects.order_by('-score_count').first()
+        assert hot.score_count == counts[0], (
+            'Проверьте, что после генерации пересчитан рейтинг'
+        )
+        assert Title.objects.create(name='Новое', year=2000).pk > hot.pk
+
+    def test_csv_is_loadable_by_fill_db(self, tmp_path):
+        from reviews.generator import DatasetGenerator
+        from reviews.models import Review, Title
+
+        folder = str(tmp_path)
+        call_command(
+            'generate_data', scale=0.005, output='csv', data_folder=folder,
+            stdout=io.StringIO(),
+        )
+        call_command(
+            'fill_db', data_folder=folder, stdout=io.StringIO(),
+            stderr=io.StringIO(),
+        )
+        assert Title.objects.count() == 50
+        assert Review.objects.count() == DatasetGenerator(
+            scale=0.005
+        ).sizes['review'], (
+            'Проверьте, что CSV генератора загружаются командой fill_db'
+        )
+
+    def test_reproducible(self):
+        from reviews.generator import DatasetGenerator
+
+        def generate():
+            generator = DatasetGenerator(scale=0.002, seed=7)
+            return [
+                list(generator.rows(table)) for table, _ in generator.TABLES
+            ]
+
+        first, second = generate(), generate()
+        assert first[3] == second[3] and first[5][0]['score'] == (
+            second[5][0]['score']
+        ), 'Проверьте, что при одном seed генерируются одинаковые данные'
@@ -0,0 +1,135 @@
+import os
+import re
+
+import pytest
+
+SAMPLE = re.compile(r'^(\w+)(\{.*\})? (\S+)$')
+
+
+def scrape(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    samples = {}
+    for line in response.content.decode().splitlines():
+        if line.startswith('#'):
+            continue
+        name, labels, value = SAMPLE.match(line).groups()
+        samples[name + (labels or '')] = float(value)
+    return samples
+
+
+def delta(before, after, sample):
+    return after.get(sample, 0) - before.get(sample, 0)
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def test_request_histograms(self, client, title):
+        before = scrape(client)
+        client.get('/api/v1/titles/')
+        client.get('/api/v1/titles/')
+        after = scrape(client)
+
+        labels = 'route="title-list",method="GET"'
+        assert delta(
+            before, after,
+            f'yamdb_http_requests_total{{{labels},status="200"}}'
+        ) == 2, 'Проверьте счетчик запросов по маршруту, методу и статусу'
+        for name in ('yamdb_http_request_duration_seconds',
+                     'yamdb_http_response_size_bytes',
+                     'yamdb_http_db_queries'):
+            assert delta(
+                before, after, f'{name}_count{{{labels}}}'
+            ) == 2, f'Проверьте гистограмму {name}'
+            assert after[f'{name}_bucket{{{labels},le="+Inf"}}'] == (
+                after[f'{name}_count{{{labels}}}']
+            )
+        # Второй запрос отдан из кэша без SQL.
+        assert delta(
+            before, after, f'yamdb_http_db_queries_bucket{{{labels},le="0"}}'
+        ) == 1
+        assert delta(
+            before, after, 'yamdb_response_cache_total{result="hit"}'
+        ) == 1
+        assert 'yamdb_email_outbox_depth' in after
+
+    def test_throttle_and_auth_failures(self, client, user_client,
+                                        monkeypatch):
+        from rest_framework.throttling import UserRateThrottle
+
+        before = scrape(client)
+        monkeypatch.setattr(
+            UserRateThrottle, 'allow_request', lambda *args: False
+        )
+        monkeypatch.setattr(UserRateThrottle, 'wait', lambda self: 1)
+        assert user_client.get('/api/v1/genres/').status_code == 429
+        assert client.get(
+            '/api/v1/users/me/', HTTP_AUTHORIZATION='Bearer invalid'
+        ).status_code == 401
+        client.post(
+            '/api/v1/auth/token/',
+            data={'username': 'nobody', 'confirmation_code': 'wrong'},
+        )
+        after = scrape(client)
+
+        assert delta(
+            before, after,
+            'yamdb_throttled_requests_total'
+            '{route="genre-list",method="GET"}'
+        ) == 1, 'Проверьте учет отказов троттлинга'
+        assert delta(
+            before, after,
+            'yamdb_auth_failures_total{route="me",method="GET"}'
+        ) == 1, 'Проверьте учет ошибок аутентификации'
+        assert delta(
+            before, after,
+            'yamdb_auth_failures_total{route="token",method="POST"}'
+        ) == 1, 'Проверьте учет неудачных запросов токена'
+
+    def test_unresolved_paths_share_label(self, client):
+        before = scrape(client)
+        client.get('/api/v1/unknown/1/')
+        client.get('/api/v1/unknown/2/')
+        after = scrape(client)
+        assert delta(
+            before, after,
+            'yamdb_http_requests_total'
+            '{route="unmatched",method="GET",status="404"}'
+        ) == 2, 'Проверьте, что пути без маршрута не плодят метки'
+
+
+@pytest.mark.django_db
+def test_processes_are_aggregated(client, settings, tmp_path):
+    from api.metrics import ARCHIVE, registry
+
+    settings.METRICS = {'DIR': str(tmp_path), 'FLUSH_INTERVAL': 0}
+    labels = '{route="worker",method="GET"}'
+    before = scrape(client)
+    for _ in range(2):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                registry.record('worker', 'GET', 200, 0.02, 10, 1)
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+
+    after = scrape(client)
+    assert after[f'yamdb_http_request_duration_seconds_count{labels}'] == 2, (
+        'Проверьте, что метрики всех процессов складываются'
+    )
+    assert after[
+        f'yamdb_http_request_duration_seconds_bucket{labels[:-1]},le="0.025"}}'
+    ] == 2
+    assert delta(
+        before, after,
+        'yamdb_http_requests_total{route="metrics",method="GET",status="200"}'
+    ) == 1, 'Проверьте, что учитываются и запросы этого процесса'
+    assert {path.name for path in tmp_path.glob('*.json')} == {
+        ARCHIVE, registry.name
+    }, 'Проверьте, что снимки завершенных процессов переносятся в архив'
+    assert scrape(client)[
+        f'yamdb_http_request_duration_seconds_count{labels}'
+    ] == 2
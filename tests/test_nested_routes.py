@@ -0,0 +1,80 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestNestedRoutes:
+
+    @pytest.fixture
+    def review(self, user, title):
+        from reviews.models import Review
+
+        return Review.objects.create(
+            author=user, title=title, text='Отзыв', score=8
+        )
+
+    @pytest.fixture
+    def comment(self, user, review):
+        from reviews.models import Comment
+
+        return Comment.objects.create(
+            author=user, review=review, text='Комментарий'
+        )
+
+    @pytest.fixture
+    def other_title(self, category):
+        from reviews.models import Title
+
+        return Title.objects.create(name='Другое', year=2001, category=category)
+
+    def test_comment_route_checks_title(self, user_client, other_title,
+                                        review, comment):
+        base = f'/api/v1/titles/{other_title.id}/reviews/{review.id}/comments/'
+        for url in (base, f'{base}{comment.id}/'):
+            assert user_client.get(url).status_code == 404, (
+                f'Проверьте, что `{url}` отдает 404, если отзыв относится к '
+                'другому произведению'
+            )
+        response = user_client.post(base, data={'text': 'Чужой'})
+        assert response.status_code == 404
+        assert user_client.delete(f'{base}{comment.id}/').status_code == 404
+        assert review.comment.count() == 1
+
+    def test_review_route_checks_title(self, user_client, other_title,
+                                       review):
+        url = f'/api/v1/titles/{other_title.id}/reviews/{review.id}/'
+        assert user_client.get(url).status_code == 404
+        assert user_client.get(
+            '/api/v1/titles/999999/reviews/'
+        ).status_code == 404
+
+    def test_detail_in_one_query(self, client, django_assert_num_queries,
+                                 title, review, comment):
+        url = (
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+            f'{comment.id}/'
+        )
+        with django_assert_num_queries(1):
+            response = client.get(url)
+        assert response.status_code == 200, (
+            'Проверьте, что комментарий и вся цепочка родителей загружаются '
+            'одним запросом'
+        )
+
+    def test_duplicate_review(self, user_client, title, review):
+        from reviews.models import Review
+
+        response = user_client.post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            data={'text': 'Еще отзыв', 'score': 3},
+        )
+        assert response.status_code == 400, (
+            'Проверьте, что повторный отзыв на произведение запрещен'
+        )
+        assert response.json() == {
+            'non_field_errors': ['Вы уже оставили свой отзыв.']
+        }
+        assert Review.objects.count() == 1
+        title.refresh_from_db()
+        assert (title.score_sum, title.score_count) == (8, 1), (
+            'Проверьте, что отклоненный отзыв не меняет рейтинг'
+        )
@@ -0,0 +1,126 @@
+import io
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+
+
+class FailingBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+class CountingBackend(BaseEmailBackend):
+
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+    def send_messages(self, email_messages):
+        return len(email_messages)
+
+
+def send_emails(*args):
+    out = io.StringIO()
+    call_command('send_emails', *args, stdout=out, stderr=io.StringIO())
+    return out.getvalue()
+
+
+@pytest.mark.django_db
+class TestOutbox:
+
+    def signup(self, client):
+        response = client.post(
+            '/api/v1/auth/signup/',
+            data={'username': 'newbie', 'email': 'newbie@yamdb.fake'},
+        )
+        assert response.status_code == 200
+
+    def test_signup_queues_email(self, client):
+        from users.models import OutgoingEmail
+
+        self.signup(client)
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что при регистрации письмо не отправляется в запросе'
+        )
+        email = OutgoingEmail.objects.get()
+        assert email.to == 'newbie@yamdb.fake'
+        assert email.body, (
+            'Проверьте, что в письме есть код подтверждения'
+        )
+
+    def test_worker_delivers(self, client):
+        from users.models import Auth, OutgoingEmail
+
+        self.signup(client)
+        output = send_emails('--once')
+        assert len(mail.outbox) == 1, (
+            'Проверьте, что команда send_emails отправляет письма из очереди'
+        )
+        assert mail.outbox[0].to == ['newbie@yamdb.fake']
+        assert mail.outbox[0].body == Auth.objects.get().confirmation_code
+        assert OutgoingEmail.objects.get().sent is not None
+        assert 'depth=0' in output
+
+        send_emails('--once')
+        assert len(mail.outbox) == 1, (
+            'Проверьте, что отправленное письмо не отправляется повторно'
+        )
+
+    def test_retry_with_backoff(self, client, settings):
+        from users.models import OutgoingEmail
+
+        self.signup(client)
+        settings.EMAIL_BACKEND = 'tests.test_outbox.FailingBackend'
+        send_emails('--once')
+        email = OutgoingEmail.objects.get()
+        assert email.sent is None
+        assert email.attempts == 1
+        assert 'SMTP недоступен' in email.last_error
+        first_retry = email.next_attempt
+        assert first_retry > email.created, (
+            'Проверьте, что неудачная отправка откладывается'
+        )
+
+        send_emails('--once')
+        assert OutgoingEmail.objects.get().attempts == 1, (
+            'Проверьте, что письмо не отправляется раньше срока повтора'
+        )
+
+        OutgoingEmail.objects.update(next_attempt=email.created)
+        send_emails('--once')
+        email.refresh_from_db()
+        assert email.attempts == 2
+        assert (
+            email.next_attempt - email.created
+            > first_retry - email.created
+        ), 'Проверьте, что задержка между попытками растет'
+
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+        OutgoingEmail.objects.update(next_attempt=email.created)
+        send_emails('--once')
+        assert len(mail.outbox) == 1
+
+    def test_idle_worker_stays_disconnected(self, client, settings,
+                                            monkeypatch):
+        monkeypatch.setattr(CountingBackend, 'opened', 0)
+        settings.EMAIL_BACKEND = 'tests.test_outbox.CountingBackend'
+        send_emails('--once')
+        assert CountingBackend.opened == 0, (
+            'Проверьте, что без писем SMTP-соединение не открывается'
+        )
+        self.signup(client)
+        send_emails('--once')
+        assert CountingBackend.opened == 1
+
+    def test_stats(self, client):
+        self.signup(client)
+        output = send_emails('--stats')
+        assert 'depth=1' in output, (
+            'Проверьте, что команда показывает глубину очереди'
+        )
+        assert 'lag=' in output
@@ -0,0 +1,94 @@
+import pytest
+
+
+def walk(client, url, link='next'):
+    pages = []
+    while url:
+        data = client.get(url).json()
+        pages.append(data)
+        url = data[link]
+    return pages
+
+
+@pytest.mark.django_db
+class TestCursorPagination:
+
+    @pytest.fixture
+    def titles(self, category):
+        from reviews.models import Title
+
+        return Title.objects.bulk_create(
+            Title(name=name, year=2000, category=category)
+            for name in ('Б', 'А', 'Б', 'В', 'А', 'Б', 'Г')
+        )
+
+    @pytest.fixture
+    def reviews(self, django_user_model, title):
+        from django.utils import timezone
+        from reviews.models import Review
+
+        authors = [
+            django_user_model.objects.create_user(
+                username=f'author{i}', email=f'author{i}@yamdb.fake'
+            )
+            for i in range(5)
+        ]
+        Review.objects.bulk_create(
+            Review(author=author, title=title, text='Отзыв', score=5)
+            for author in authors
+        )
+        Review.objects.update(pub_date=timezone.now())
+        return Review.objects.all()
+
+    def test_titles_forward_and_backward(self, client, titles):
+        expected = [
+            title['id'] for title in client.get(
+                '/api/v1/titles/?page_size=100'
+            ).json()['results']
+        ]
+        pages = walk(client, '/api/v1/titles/?pagination=cursor&page_size=2')
+        assert 'count' not in pages[0], (
+            'Проверьте, что в курсорном режиме не считается общее количество'
+        )
+        assert pages[0]['previous'] is None
+        received = [title['id'] for page in pages for title in page['results']]
+        assert received == expected, (
+            'Проверьте, что курсорная пагинация обходит произведения в '
+            'порядке `name`, `id` без пропусков и повторов'
+        )
+
+        backward = walk(client, pages[-1]['previous'], link='previous')
+        received = [
+            title['id']
+            for page in reversed(backward) for title in page['results']
+        ]
+        assert received == expected[:-len(pages[-1]['results'])], (
+            'Проверьте, что ссылка `previous` возвращает предыдущие страницы'
+        )
+
+    def test_reviews_with_equal_pub_date(self, client, title, reviews):
+        url = (
+            f'/api/v1/titles/{title.id}/reviews/'
+            '?pagination=cursor&page_size=2'
+        )
+        received = [
+            review['id']
+            for page in walk(client, url) for review in page['results']
+        ]
+        expected = sorted(reviews.values_list('id', flat=True), reverse=True)
+        assert received == expected, (
+            'Проверьте, что при равных `pub_date` отзывы упорядочены по `id`'
+        )
+
+    def test_page_query_count(self, client, django_assert_num_queries,
+                              titles):
+        first = client.get('/api/v1/titles/?pagination=cursor&page_size=2')
+        with django_assert_num_queries(2):
+            response = client.get(first.json()['next'])
+        assert response.status_code == 200
+
+    def test_invalid_cursor(self, client, titles):
+        response = client.get('/api/v1/titles/?cursor=invalid')
+        assert response.status_code == 404, (
+            'Проверьте, что некорректный курсор возвращает 404'
+        )
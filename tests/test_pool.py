@@ -0,0 +1,155 @@
+import threading
+
+import pytest
+from django.db import connection
+
+
+class FakeConnection:
+    """Соединение DB-API без сервера."""
+
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+
+    def cursor(self):
+        from psycopg2 import OperationalError
+
+        if self.broken:
+            raise OperationalError('server closed the connection')
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, sql):
+        pass
+
+    def get_transaction_status(self):
+        from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+        return TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class TestConnectionPool:
+
+    def get_pool(self, **kwargs):
+        from api_yamdb.pool import ConnectionPool
+
+        return ConnectionPool(**kwargs)
+
+    def test_connections_are_reused(self):
+        pool = self.get_pool(max_size=2)
+        first = pool.checkout(FakeConnection)
+        pool.checkin(first)
+        assert pool.checkout(FakeConnection) is first, (
+            'Проверьте, что возвращенное соединение выдается повторно'
+        )
+        stats = pool.get_stats()
+        assert stats['created'] == 1 and stats['reused'] == 1
+        assert stats['in_use'] == 1 and stats['idle'] == 0
+
+    def test_pool_is_bounded(self):
+        from psycopg2 import OperationalError
+
+        pool = self.get_pool(max_size=1, timeout=0.05)
+        first = pool.checkout(FakeConnection)
+        with pytest.raises(OperationalError):
+            pool.checkout(FakeConnection)
+        assert pool.get_stats()['timeouts'] == 1
+
+        threading.Timer(0.05, pool.checkin, (first,)).start()
+        pool.timeout = 5
+        assert pool.checkout(FakeConnection) is first, (
+            'Проверьте, что ожидающий поток получает возвращенное соединение'
+        )
+        assert pool.get_stats()['waits'] == 2
+        assert pool.get_stats()['size'] == 1
+
+    def test_broken_connections_are_replaced(self):
+        pool = self.get_pool(max_size=1)
+        first = pool.checkout(FakeConnection)
+        pool.checkin(first)
+        first.broken = True
+        second = pool.checkout(FakeConnection)
+        assert second is not first and first.closed, (
+            'Проверьте, что перед выдачей соединение проверяется'
+        )
+        stats = pool.get_stats()
+        assert stats['errors'] == 1 and stats['discarded'] == 1
+        assert stats['size'] == 1
+
+    def test_failed_connect_frees_slot(self):
+        from psycopg2 import OperationalError
+
+        def refuse():
+            raise OperationalError('could not connect')
+
+        pool = self.get_pool(max_size=1, timeout=0)
+        with pytest.raises(OperationalError):
+            pool.checkout(refuse)
+        assert pool.checkout(FakeConnection) is not None
+        assert pool.get_stats()['errors'] == 1
+
+    def test_inherited_connections_are_not_closed(self):
+        from api_yamdb.pool import inherited
+
+        pool = self.get_pool(max_size=1)
+        idle = pool.checkout(FakeConnection)
+        pool.checkin(idle)
+        busy = pool.checkout(FakeConnection)
+        pool.after_fork()
+        assert pool.get_stats()['size'] == 0
+        assert pool.checkin(busy) is False
+        assert not busy.closed and not idle.closed, (
+            'Проверьте, что после fork соединения родителя не закрываются'
+        )
+        assert busy in inherited and idle in inherited
+        assert pool.checkout(FakeConnection) not in (idle, busy)
+
+
+@pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Пул работает только с PostgreSQL',
+)
+@pytest.mark.django_db(transaction=True)
+def test_pooled_backend():
+    from django.db.utils import load_backend
+
+    from api_yamdb.pool import get_stats, pools
+
+    wrapper = load_backend('api_yamdb.pool').DatabaseWrapper(
+        {**connection.settings_dict, 'POOL': {'MAX_SIZE': 2}}, 'pooled'
+    )
+    try:
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            pid = cursor.fetchone()[0]
+        raw = wrapper.connection
+        wrapper.close()
+        assert not raw.closed, (
+            'Проверьте, что закрытие возвращает соединение в пул'
+        )
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        assert wrapper.connection is raw
+        wrapper.close()
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            assert cursor.fetchone()[0] != pid, (
+                'Проверьте, что оборванное соединение заменяется новым'
+            )
+        wrapper.close()
+        stats = get_stats()['pooled']
+        assert stats['created'] == 2 and stats['reused'] == 1
+        assert stats['errors'] == 1 and stats['idle'] == 1
+    finally:
+        pools.pop('pooled').close()
@@ -0,0 +1,87 @@
+import json
+import logging
+import re
+
+import pytest
+
+
+@pytest.fixture
+def profiling(settings):
+    settings.PROFILING = {
+        **settings.PROFILING,
+        'SERVER_TIMING': True,
+        'SLOW_REQUEST_MS': None,
+        'SAMPLE_RATE': 0,
+    }
+    return settings.PROFILING
+
+
+def get_records(caplog):
+    return [
+        json.loads(record.getMessage())
+        for record in caplog.records
+        if record.name == 'api.profiling'
+    ]
+
+
+@pytest.mark.django_db
+class TestProfiling:
+
+    def test_server_timing(self, user_client, profiling, title):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = user_client.get('/api/v1/titles/')
+        header = response['Server-Timing']
+        metrics = dict(
+            re.match(r'(\w+);dur=([\d.]+)', metric).groups()
+            for metric in header.split(', ')
+        )
+        assert set(metrics) == {
+            'db', 'permissions', 'throttle', 'serialize', 'render', 'total'
+        }, 'Проверьте разделы заголовка Server-Timing'
+        assert f'desc="{len(queries)} queries"' in header, (
+            'Проверьте, что в заголовке указано число SQL-запросов'
+        )
+        assert float(metrics['total']) >= float(metrics['serialize']) > 0, (
+            'Проверьте, что учитывается сериализация списка из строк'
+        )
+
+    def test_server_timing_disabled(self, user_client, title):
+        response = user_client.get('/api/v1/titles/')
+        assert 'Server-Timing' not in response, (
+            'Проверьте, что по умолчанию заголовок Server-Timing не выдается'
+        )
+
+    def test_slow_request_log(self, user_client, profiling, title, caplog):
+        profiling['SLOW_REQUEST_MS'] = 0
+        with caplog.at_level(logging.INFO, logger='api.profiling'):
+            user_client.get(f'/api/v1/titles/{title.id}/?fields=name')
+        [record] = get_records(caplog)
+        assert record['event'] == 'slow_request'
+        assert record['view'] == 'title-detail', (
+            'Проверьте, что в лог медленных запросов пишется представление'
+        )
+        assert record['query'] == 'fields=name'
+        assert record['status'] == 200 and record['queries'] > 0
+        assert 'profile' not in record
+
+    def test_sampled_profile(self, user_client, profiling, title, caplog,
+                             tmp_path):
+        profiling['SAMPLE_RATE'] = 1
+        with caplog.at_level(logging.INFO, logger='api.profiling'):
+            user_client.get('/api/v1/genres/')
+        [record] = get_records(caplog)
+        assert record['event'] == 'sampled_request'
+        assert 'cumulative' in record['profile'], (
+            'Проверьте, что для выбранных запросов снимается профиль'
+        )
+
+        profiling['PROFILE_DIR'] = str(tmp_path)
+        caplog.clear()
+        with caplog.at_level(logging.INFO, logger='api.profiling'):
+            user_client.get('/api/v1/genres/')
+        [record] = get_records(caplog)
+        assert record['profile_file'].startswith(str(tmp_path))
+        assert list(tmp_path.glob('*-GET-api_v1_genres.prof'))
@@ -0,0 +1,71 @@
+import pytest
+
+
+def fill_catalog(size, category, genres, authors):
+    from reviews.models import Comment, Review, Title
+
+    # create, а не bulk_create: первичные ключи после bulk_create
+    # проставляются только на PostgreSQL.
+    titles = [
+        Title.objects.create(
+            name=f'Произведение {i}', year=2000, category=category
+        )
+        for i in range(size)
+    ]
+    for title in titles:
+        title.genre.set(genres)
+    reviews = [
+        Review.objects.create(
+            author=author, title=titles[0], text='Отзыв', score=5
+        )
+        for author in authors
+    ]
+    Comment.objects.bulk_create(
+        Comment(author=author, review=reviews[0], text='Комментарий')
+        for author in authors
+    )
+    return titles[0], reviews[0]
+
+
+@pytest.fixture(params=(2, 12), ids=('small', 'large'))
+def catalog(request, django_user_model, category, genres):
+    authors = [
+        django_user_model.objects.create_user(
+            username=f'author{i}', email=f'author{i}@yamdb.fake'
+        )
+        for i in range(request.param)
+    ]
+    return fill_catalog(request.param, category, genres, authors)
+
+
+@pytest.mark.django_db
+class TestQueryCount:
+
+    @pytest.mark.parametrize('url, queries', (
+        ('/api/v1/titles/?page_size=100', 3),
+        ('/api/v1/titles/{title_id}/', 2),
+        ('/api/v1/categories/?page_size=100', 2),
+        ('/api/v1/genres/?page_size=100', 2),
+        ('/api/v1/titles/{title_id}/reviews/?page_size=100', 3),
+        ('/api/v1/titles/{title_id}/reviews/{review_id}/', 1),
+        (
+            '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+            '?page_size=100',
+            3
+        ),
+    ))
+    def test_read_endpoints(self, client, django_assert_num_queries, catalog,
+                            url, queries):
+        title, review = catalog
+        url = url.format(title_id=title.id, review_id=review.id)
+        with django_assert_num_queries(queries):
+            response = client.get(url)
+        assert response.status_code == 200, (
+            f'Проверьте, что эндпоинт `{url}` доступен без авторизации'
+        )
+
+    def test_users_endpoint(self, admin_client, django_assert_num_queries,
+                            catalog):
+        with django_assert_num_queries(2):
+            response = admin_client.get('/api/v1/users/?page_size=100')
+        assert response.status_code == 200
@@ -0,0 +1,91 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Планы запросов проверяются только на PostgreSQL',
+)
+
+# Узлы плана, которые означают отсутствие подходящего индекса.
+FORBIDDEN = re.compile(r'\b(Seq Scan|Sort)\b')
+
+
+@pytest.fixture
+def dataset(db):
+    from reviews.management.commands.generate_data import generate
+    from reviews.models import Category, Genre, Review, Title
+
+    generate(scale=0.01, seed=1)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+        # Без этих настроек на маленьких таблицах планировщик выбирает
+        # полный просмотр даже при наличии подходящего индекса.
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute('SET LOCAL enable_sort = off')
+    title = Title.objects.order_by('-score_count', 'pk').first()
+    review = Review.objects.filter(title=title).order_by('pk').first()
+    return {
+        'title': title.pk,
+        'review': review.pk,
+        'category': Category.objects.order_by('pk').first().slug,
+        'genre': Genre.objects.order_by('pk').first().slug,
+        'year': title.year,
+    }
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN {sql}')
+        return '\n'.join(row[0] for row in cursor.fetchall())
+
+
+@pytest.mark.django_db
+class TestQueryPlans:
+
+    @pytest.mark.parametrize('url, table', (
+        ('/api/v1/titles/', 'reviews_title'),
+        ('/api/v1/titles/?pagination=cursor', 'reviews_title'),
+        ('/api/v1/titles/?category={category}', 'reviews_title'),
+        ('/api/v1/titles/?genre={genre}', 'reviews_title'),
+        ('/api/v1/titles/?year={year}', 'reviews_title'),
+        ('/api/v1/categories/', 'reviews_category'),
+        ('/api/v1/genres/', 'reviews_genre'),
+        ('/api/v1/titles/{title}/reviews/', 'reviews_review'),
+        ('/api/v1/titles/{title}/reviews/?pagination=cursor',
+         'reviews_review'),
+        ('/api/v1/titles/{title}/reviews/{review}/comments/',
+         'reviews_comment'),
+        ('/api/v1/titles/{title}/reviews/{review}/comments/'
+         '?pagination=cursor', 'reviews_comment'),
+    ))
+    def test_list_queries_use_indexes(self, user_client, dataset, url,
+                                      table):
+        url = url.format(**dataset)
+        with CaptureQueriesContext(connection) as queries:
+            assert user_client.get(url).status_code == 200
+        main = [
+            query['sql'] for query in queries
+            if f'FROM "{table}"' in query['sql'] and 'LIMIT' in query['sql']
+        ]
+        assert main, f'Не найден основной запрос эндпоинта `{url}`'
+        plan = explain(main[0])
+        assert not FORBIDDEN.search(plan), (
+            f'Проверьте индексы для `{url}`: в плане основного запроса есть '
+            f'полный просмотр или сортировка:\n{plan}'
+        )
+
+    def test_rating_aggregate_uses_covering_index(self, dataset):
+        from django.db.models import Count, Sum
+        from reviews.models import Review
+
+        queryset = Review.objects.filter(title_id=dataset['title']).values(
+            'title_id'
+        ).annotate(total=Sum('score'), count=Count('id')).order_by()
+        plan = explain(str(queryset.query))
+        assert not FORBIDDEN.search(plan), plan
+        assert 'review_title_score_idx' in plan, (
+            'Проверьте, что сумма оценок считается по покрывающему индексу'
+        )
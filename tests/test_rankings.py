@@ -0,0 +1,166 @@
+import io
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.fixture
+def voters(django_user_model):
+    return [
+        django_user_model.objects.create_user(
+            username=f'voter{index}', email=f'voter{index}@yamdb.fake'
+        )
+        for index in range(5)
+    ]
+
+
+def review(author, title, score, days_ago=0):
+    from django.utils import timezone
+    from reviews.models import Review
+
+    instance = Review.objects.create(
+        author=author, title=title, text='Отзыв', score=score
+    )
+    if days_ago:
+        Review.objects.filter(pk=instance.pk).update(
+            pub_date=timezone.now() - timedelta(days=days_ago)
+        )
+    return instance
+
+
+def ranked(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, url
+    return [
+        (item['title']['id'], item['score'])
+        for item in response.json()['results']
+    ]
+
+
+@pytest.mark.django_db
+class TestRankings:
+
+    def test_bayesian_top(self, client, voters, title, category, genres):
+        from reviews.models import Title
+
+        popular = Title.objects.create(
+            name='Популярное', year=2000, category=category
+        )
+        popular.genre.set(genres[:1])
+        bad = Title.objects.create(name='Плохое', year=2000)
+        for voter in voters:
+            review(voter, popular, 9)
+            review(voter, bad, 2)
+        review(voters[0], title, 10)
+        call_command('refresh_rankings', stdout=io.StringIO())
+
+        top = ranked(client, '/api/v1/rankings/top/')
+        assert [pk for pk, _ in top] == [popular.id, title.id, bad.id], (
+            'Проверьте, что одна высокая оценка не обгоняет много хороших'
+        )
+        # Средняя оценка 65 / 11, вес - 11 / 3 голоса на произведение.
+        prior = 11 / 3 * 65 / 11
+        assert top[1][1] == pytest.approx(
+            (prior + 10) / (11 / 3 + 1), abs=1e-3
+        )
+        assert ranked(
+            client, f'/api/v1/rankings/top/?genre={genres[1].slug}'
+        ) == [top[1]], 'Проверьте разрез рейтинга по жанру'
+        assert len(ranked(
+            client, f'/api/v1/rankings/top/?category={category.slug}'
+        )) == 2
+        response = client.get('/api/v1/rankings/top/?genre=unknown')
+        assert response.status_code == 404
+
+    def test_trending_decay(self, client, voters, title, category):
+        from reviews.models import Title
+
+        fresh = Title.objects.create(name='Свежее', year=2000)
+        old = Title.objects.create(name='Старое', year=2000)
+        review(voters[0], title, 5, days_ago=3)
+        review(voters[1], fresh, 5)
+        review(voters[2], old, 10, days_ago=30)
+        call_command('refresh_rankings', stdout=io.StringIO())
+
+        trending = ranked(client, '/api/v1/rankings/trending/')
+        assert [pk for pk, _ in trending] == [fresh.id, title.id], (
+            'Проверьте, что тренды учитывают только отзывы за окно'
+        )
+        assert trending[0][1] == pytest.approx(5, rel=1e-3)
+        assert trending[1][1] == pytest.approx(5 / 2 ** 1.5, rel=1e-3), (
+            'Проверьте, что вес отзыва падает вдвое за период полураспада'
+        )
+
+    def test_incremental_matches_refresh(self, client, user_client,
+                                         another_user_client, voters, title,
+                                         genres):
+        from reviews.models import TitleRanking
+
+        reviews = f'/api/v1/titles/{title.id}/reviews/'
+        response = user_client.post(reviews, data={'text': 'a', 'score': 6})
+        review_id = response.json()['id']
+        assert not TitleRanking.objects.exists(), (
+            'Проверьте, что до первого пересчета отзыв не запускает '
+            'перестроение рейтингов'
+        )
+        call_command('refresh_rankings', stdout=io.StringIO())
+        another_user_client.post(reviews, data={'text': 'b', 'score': 8})
+        user_client.patch(f'{reviews}{review_id}/', data={'score': 10})
+        # Анонимные ответы кэшируются, а bump без коммита не срабатывает.
+        trending = ranked(user_client, '/api/v1/rankings/trending/')
+        assert trending[0][1] == pytest.approx(18, rel=1e-3), (
+            'Проверьте, что тренды обновляются при записи отзывов'
+        )
+        # Параметры взяты при пересчете: средняя 6, вес 1 голос.
+        assert ranked(user_client, '/api/v1/rankings/top/') == [
+            (title.id, pytest.approx((6 + 18) / 3, abs=1e-3))
+        ], 'Проверьте, что лучшие обновляются при записи отзывов'
+        call_command('refresh_rankings', stdout=io.StringIO())
+        assert ranked(user_client, '/api/v1/rankings/top/') == [
+            (title.id, pytest.approx((2 * 9 + 18) / 4, abs=1e-3))
+        ]
+        assert ranked(user_client, '/api/v1/rankings/trending/') == [
+            (title.id, pytest.approx(18, rel=1e-3))
+        ], 'Проверьте, что пересчет дает те же тренды, что и обновления'
+
+        title.genre.set(genres[1:])
+        assert not ranked(
+            user_client, f'/api/v1/rankings/top/?genre={genres[0].slug}'
+        ), 'Проверьте, что смена жанров переносит произведение в рейтингах'
+        assert ranked(
+            user_client, f'/api/v1/rankings/top/?genre={genres[1].slug}'
+        )
+
+        user_client.delete(f'{reviews}{review_id}/')
+        another_user_client.delete(
+            f'{reviews}{title.review.get().id}/'
+        )
+        assert not TitleRanking.objects.filter(title=title).exists(), (
+            'Проверьте, что произведение без отзывов уходит из рейтингов'
+        )
+
+
+@pytest.mark.django_db
+def test_bulk_update_moves_title(admin_client, user_client, voters, title,
+                                 genres):
+    from reviews.models import Category
+
+    review(voters[0], title, 7)
+    call_command('refresh_rankings', stdout=io.StringIO())
+    book = Category.objects.create(name='Книга', slug='book')
+    response = admin_client.patch(
+        '/api/v1/titles/bulk/',
+        data=[{'id': title.id, 'genre': [genres[1].slug], 'category': 'book'}],
+        format='json',
+    )
+    assert response.status_code == 200, response.content
+    assert not ranked(
+        user_client, f'/api/v1/rankings/top/?genre={genres[0].slug}'
+    ), 'Проверьте, что пакетное изменение жанров переносит произведение'
+    assert ranked(
+        user_client, f'/api/v1/rankings/top/?genre={genres[1].slug}'
+    )
+    assert ranked(
+        user_client, f'/api/v1/rankings/top/?category={book.slug}'
+    ), 'Проверьте, что пакетная смена категории переносит произведение'
@@ -0,0 +1,67 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestTitleRating:
+
+    url = '/api/v1/titles/{title_id}/reviews/'
+
+    def refresh(self, title):
+        title.refresh_from_db()
+        return title
+
+    def test_rating_follows_api_writes(self, user_client, another_user_client,
+                                       title):
+        url = self.url.format(title_id=title.id)
+        response = user_client.post(url, data={'text': 'Отзыв', 'score': 10})
+        assert response.status_code == 201, (
+            'Проверьте, что авторизованный пользователь может оставить отзыв'
+        )
+        review_id = response.json()['id']
+        another_user_client.post(url, data={'text': 'Отзыв', 'score': 5})
+        title = self.refresh(title)
+        assert (title.score_sum, title.score_count) == (15, 2), (
+            'Проверьте, что создание отзыва обновляет рейтинг произведения'
+        )
+
+        user_client.patch(f'{url}{review_id}/', data={'score': 1})
+        title = self.refresh(title)
+        assert (title.score_sum, title.score_count) == (6, 2), (
+            'Проверьте, что изменение оценки обновляет рейтинг произведения'
+        )
+
+        user_client.delete(f'{url}{review_id}/')
+        title = self.refresh(title)
+        assert (title.score_sum, title.score_count) == (5, 1), (
+            'Проверьте, что удаление отзыва обновляет рейтинг произведения'
+        )
+
+        response = user_client.get(f'/api/v1/titles/{title.id}/')
+        assert response.json()['rating'] == 5, (
+            'Проверьте, что рейтинг в ответе берется из сохраненных значений'
+        )
+
+    def test_rating_follows_cascade(self, user, another_user, title):
+        from reviews.models import Review
+
+        Review.objects.create(author=user, title=title, text='a', score=8)
+        Review.objects.create(author=another_user, title=title, text='b',
+                              score=3)
+        user.delete()
+        title = self.refresh(title)
+        assert (title.score_sum, title.score_count) == (3, 1), (
+            'Проверьте, что каскадное удаление отзывов обновляет рейтинг'
+        )
+
+    def test_recalculate_rating(self, user, title):
+        from reviews.models import Review, Title
+
+        Review.objects.bulk_create(
+            [Review(author=user, title=title, text='a', score=7)]
+        )
+        Title.objects.recalculate_rating()
+        title = self.refresh(title)
+        assert (title.score_sum, title.score_count) == (7, 1), (
+            'Проверьте, что пересчет восстанавливает рейтинг по отзывам'
+        )
+        assert title.rating == 7
@@ -0,0 +1,91 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestRatingDistribution:
+
+    url = '/api/v1/titles/{title_id}/rating-distribution/'
+
+    def test_distribution_follows_writes(self, client, user_client,
+                                         another_user_client,
+                                         django_assert_num_queries, title):
+        reviews = f'/api/v1/titles/{title.id}/reviews/'
+        response = user_client.post(reviews, data={'text': 'a', 'score': 9})
+        review_id = response.json()['id']
+        another_user_client.post(reviews, data={'text': 'b', 'score': 4})
+        url = self.url.format(title_id=title.id)
+
+        with django_assert_num_queries(1):
+            response = client.get(url)
+        assert response.status_code == 200, (
+            'Проверьте, что распределение оценок доступно без авторизации'
+        )
+        data = response.json()
+        assert data['distribution'] == {
+            str(score): int(score in (4, 9)) for score in range(1, 11)
+        }, 'Проверьте, что ключи распределения - все оценки от 1 до 10'
+        assert (data['count'], data['mean'], data['median']) == (2, 6.5, 6.5)
+
+        user_client.patch(f'{reviews}{review_id}/', data={'score': 2})
+        data = client.get(url).json()
+        assert data['distribution']['9'] == 0, (
+            'Проверьте, что изменение оценки переносит ее в гистограмме'
+        )
+        assert data['distribution']['2'] == 1
+        user_client.delete(f'{reviews}{review_id}/')
+        data = client.get(url).json()
+        assert data['count'] == 1 and data['distribution']['2'] == 0, (
+            'Проверьте, что удаление отзыва исключает оценку из гистограммы'
+        )
+        assert data['median'] == 4
+
+    def test_empty_and_missing(self, client, title):
+        data = client.get(self.url.format(title_id=title.id)).json()
+        assert data['count'] == 0 and data['mean'] is None
+        assert data['median'] is None
+        response = client.get(self.url.format(title_id=title.id + 100))
+        assert response.status_code == 404
+
+    def test_median(self, title):
+        for counts, median in (
+            ({1: 1}, 1), ({3: 2, 7: 2}, 5), ({2: 1, 5: 1, 10: 1}, 5),
+            ({1: 5, 10: 4}, 1), ({4: 3, 8: 3}, 6),
+        ):
+            for score in range(1, 11):
+                setattr(title, f'score_{score}', counts.get(score, 0))
+            title.score_count = sum(counts.values())
+            assert title.median_score == median, counts
+
+    def test_batch(self, client, user, title):
+        from reviews.models import Review, Title
+
+        other = Title.objects.create(name='Другое', year=2000)
+        Review.objects.create(author=user, title=other, text='a', score=10)
+        response = client.get(
+            '/api/v1/titles/rating-distribution/'
+            f'?ids={other.id},{title.id + 100},{title.id}'
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert [item['title'] for item in data] == [other.id, title.id], (
+            'Проверьте, что пакетный ответ идет в порядке запроса без '
+            'несуществующих произведений'
+        )
+        assert data[0]['distribution']['10'] == 1
+        for ids in ('', 'a,b', ','.join(map(str, range(1, 102)))):
+            response = client.get(
+                f'/api/v1/titles/rating-distribution/?ids={ids}'
+            )
+            assert response.status_code == 400, ids
+
+    def test_recalculate_rebuilds_histogram(self, user, title):
+        from reviews.models import Review, Title
+
+        Review.objects.bulk_create(
+            [Review(author=user, title=title, text='a', score=7)]
+        )
+        Title.objects.recalculate_rating()
+        title.refresh_from_db()
+        assert title.distribution[7] == 1 and title.score_count == 1, (
+            'Проверьте, что пересчет рейтинга восстанавливает гистограмму'
+        )
@@ -0,0 +1,119 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.fixture
+def catalogue(user, another_user, category, genres, title):
+    from reviews.models import Comment, Review, Title
+
+    bare = Title.objects.create(name='Без категории', year=2001)
+    single = Title.objects.create(
+        name='Один жанр', year=2002, category=category,
+        description='Описание',
+    )
+    single.genre.set(genres[1:])
+    for author, score in ((user, 7), (another_user, 10)):
+        review = Review.objects.create(
+            author=author, title=title, text=f'Отзыв {score}', score=score
+        )
+        Comment.objects.create(author=user, review=review, text='Да')
+        Comment.objects.create(author=another_user, review=review, text='Нет')
+    Review.objects.create(author=user, title=single, text='Отзыв', score=3)
+    return [title, bare, single]
+
+
+def compare(serializer_class, queryset, **kwargs):
+    from api.rows import get_row_serializer
+
+    serializer = serializer_class(**kwargs)
+    rows = get_row_serializer(serializer)
+    assert rows is not None
+    expected = serializer_class(
+        list(queryset), many=True, **kwargs
+    ).data
+    actual = rows.serialize(rows.get_queryset(queryset))
+    assert json.dumps(actual) == json.dumps(expected), (
+        f'Проверьте, что RowSerializer повторяет {serializer_class.__name__}'
+    )
+    return actual
+
+
+@pytest.mark.django_db
+class TestRowSerializer:
+
+    def test_titles_identical(self, catalogue):
+        from api.serializers import TitleSerializer
+        from reviews.models import Title
+
+        data = compare(
+            TitleSerializer,
+            Title.objects.select_related('category')
+            .prefetch_related('genre').order_by('name'),
+        )
+        assert [item['rating'] for item in data] == [None, 3, 8]
+        assert {item['category'] is None for item in data} == {True, False}
+
+    def test_reviews_and_comments_identical(self, catalogue):
+        from api.serializers import CommentSerializer, ReviewSerializer
+        from reviews.models import Comment, Review
+
+        compare(
+            ReviewSerializer,
+            Review.objects.select_related('author').order_by('-pub_date'),
+        )
+        compare(
+            CommentSerializer,
+            Comment.objects.select_related('author').order_by('-pub_date'),
+        )
+
+    def test_unsupported_fields(self):
+        from api.rows import get_row_serializer
+        from api.serializers import TitleRankingSerializer
+
+        assert get_row_serializer(TitleRankingSerializer()) is None, (
+            'Проверьте, что вложенные сериализаторы не читаются из строк'
+        )
+
+    def test_list_views_match_model_serializer(self, user_client, user,
+                                               another_user, catalogue):
+        from api.serializers import TitleSerializer
+        from reviews.models import Title
+
+        response = user_client.get('/api/v1/titles/?page_size=10')
+        assert response.json()['results'] == TitleSerializer(
+            Title.objects.order_by('name'), many=True
+        ).data, 'Проверьте, что список совпадает с ответом TitleSerializer'
+
+        url = (
+            f'/api/v1/titles/{catalogue[0].id}/reviews/'
+            '?pagination=cursor&page_size=1&fields=score,author'
+        )
+        data = user_client.get(url).json()
+        assert data['results'] == [
+            {'score': 10, 'author': another_user.username}
+        ]
+        data = user_client.get(data['next']).json()
+        assert data['results'] == [{'score': 7, 'author': user.username}], (
+            'Проверьте курсор по строкам values()'
+        )
+        assert data['next'] is None
+
+
+@pytest.mark.django_db
+def test_benchmark_serialization(tmp_path, catalogue):
+    output = tmp_path / 'serialization.json'
+    call_command(
+        'benchmark_serialization', '--in-place', '--scale', '0',
+        '--items', '10', '--repeat', '1', '--output', str(output),
+        stdout=io.StringIO(),
+    )
+    results = json.loads(output.read_text(encoding='utf-8'))
+    assert set(results) == {'titles', 'reviews', 'comments'}
+    for name, result in results.items():
+        assert result['identical'], name
+        for path in ('model', 'rows'):
+            assert result[path]['serialize'] > 0
+            assert result[path]['total'] > 0
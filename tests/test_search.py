@@ -0,0 +1,96 @@
+import pytest
+
+
+@pytest.fixture
+def catalog(category):
+    from reviews.models import Title
+
+    return [
+        Title.objects.create(
+            name='Побег из Шоушенка', year=1994, category=category,
+            description='Фильм о тюрьме и надежде',
+        ),
+        Title.objects.create(
+            name='Зеленая миля', year=1999, category=category,
+            description='Тюремный надзиратель и побег от прошлого',
+        ),
+        Title.objects.create(
+            name='Война и мир', year=1869,
+            description='Роман о войне 1812 года',
+        ),
+    ]
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    def names(self, response):
+        return [title['name'] for title in response.json()['results']]
+
+    def test_morphology_and_ranking(self, client, catalog):
+        response = client.get('/api/v1/titles/?search=побеги')
+        assert self.names(response) == ['Побег из Шоушенка', 'Зеленая миля'], (
+            'Проверьте, что поиск учитывает морфологию и совпадение в '
+            'названии ранжируется выше совпадения в описании'
+        )
+        response = client.get('/api/v1/titles/?search=войны')
+        assert self.names(response) == ['Война и мир']
+
+    def test_cursor_mode_keeps_ranking(self, client, catalog):
+        response = client.get('/api/v1/titles/', {
+            'search': 'побеги', 'pagination': 'cursor', 'page_size': 1,
+        })
+        assert response.status_code == 200
+        pages = [response.json()]
+        while pages[-1]['next']:
+            pages.append(client.get(pages[-1]['next']).json())
+        assert [
+            title['name'] for page in pages for title in page['results']
+        ] == ['Побег из Шоушенка', 'Зеленая миля'], (
+            'Проверьте, что постраничный обход поиска сохраняет порядок '
+            'релевантности'
+        )
+        response = client.get(
+            '/api/v1/titles/', {'search': 'побеги', 'cursor': 'abc'}
+        )
+        assert response.status_code == 400, (
+            'Проверьте, что курсор вместе с поиском отклоняется'
+        )
+
+    def test_index_follows_updates(self, user_client, catalog):
+        title = catalog[2]
+        title.description = 'Эпопея о Шоушенке'
+        title.save()
+        response = user_client.get('/api/v1/titles/?search=Шоушенк')
+        assert 'Война и мир' in self.names(response), (
+            'Проверьте, что поисковый индекс обновляется при сохранении'
+        )
+        title.delete()
+        response = user_client.get('/api/v1/titles/?search=Шоушенк')
+        assert self.names(response) == ['Побег из Шоушенка']
+
+    def test_name_filter_is_case_insensitive(self, client, catalog):
+        response = client.get('/api/v1/titles/?name=ЗЕЛЕНАЯ')
+        assert self.names(response) == ['Зеленая миля'], (
+            'Проверьте, что фильтр `name` не зависит от регистра'
+        )
+
+    def test_fallback_backend(self, catalog):
+        from reviews.models import Title
+        from reviews.search import InvertedIndexBackend
+
+        backend = InvertedIndexBackend()
+        names = [
+            title.name
+            for title in backend.search(Title.objects.all(), 'побеги')
+        ]
+        assert names == ['Побег из Шоушенка', 'Зеленая миля'], (
+            'Проверьте резервный поиск по инвертированному индексу'
+        )
+        Title.objects.filter(pk=catalog[0].pk).delete()
+        Title.objects.create(name='Побег', year=2000)
+        names = [
+            title.name
+            for title in backend.search(Title.objects.all(), 'побег')
+        ]
+        assert names == ['Побег', 'Зеленая миля']
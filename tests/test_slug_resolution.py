@@ -0,0 +1,118 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.fixture
+def many_genres(genres):
+    from reviews.models import Genre
+
+    Genre.objects.bulk_create(
+        Genre(name=f'Жанр {i}', slug=f'genre-{i}') for i in range(10)
+    )
+    return [f'genre-{i}' for i in range(10)]
+
+
+def write(client, method, url, data):
+    with CaptureQueriesContext(connection) as queries:
+        response = getattr(client, method)(
+            url, data=data, format='json'
+        )
+    return response, [query['sql'] for query in queries]
+
+
+def count(queries, prefix):
+    return sum(sql.startswith(prefix) for sql in queries)
+
+
+def lookups(queries, table):
+    return sum(f'"{table}"."slug" IN (' in sql for sql in queries)
+
+
+LINKS = 'SELECT "reviews_title_genre"."genre_id" FROM'
+INSERT = 'INSERT INTO "reviews_title_genre"'
+DELETE = 'DELETE FROM "reviews_title_genre"'
+
+
+@pytest.mark.django_db
+class TestTitleSlugs:
+
+    url = '/api/v1/titles/'
+
+    def test_create_resolves_slugs_in_one_query(self, admin_client,
+                                                category, many_genres):
+        response, queries = write(admin_client, 'post', self.url, {
+            'name': 'Новое', 'year': 2000, 'category': 'movie',
+            'genre': many_genres,
+        })
+        assert response.status_code == 201, response.content
+        assert len(response.json()['genre']) == 10
+        assert lookups(queries, 'reviews_genre') == 1, (
+            'Проверьте, что жанры загружаются одним запросом slug__in'
+        )
+        assert not any('"reviews_genre"."slug" =' in sql for sql in queries)
+        assert count(queries, LINKS) == 0, (
+            'Проверьте, что у нового произведения связи не читаются'
+        )
+        assert count(queries, INSERT) == 1
+
+    def test_unknown_slugs_reported_at_once(self, admin_client, genres):
+        response, _ = write(admin_client, 'post', self.url, {
+            'name': 'Новое', 'year': 2000,
+            'genre': ['drama', 'unknown', 'missing', 'unknown'],
+        })
+        assert response.status_code == 400
+        errors = response.json()['genre']
+        assert len(errors) == 2 and 'unknown' in errors[0], (
+            'Проверьте, что ошибка перечисляет все неизвестные слаги'
+        )
+        assert 'missing' in errors[1]
+
+    def test_update_applies_diff(self, admin_client, user_client, title,
+                                 many_genres):
+        from django.utils import timezone
+        from reviews.models import Title
+
+        url = f'{self.url}{title.id}/'
+        # На SQLite Now() с точностью до секунды.
+        Title.objects.filter(pk=title.pk).update(
+            updated=timezone.now() - timedelta(days=1)
+        )
+        updated = Title.objects.get(pk=title.pk).updated
+        response, queries = write(admin_client, 'patch', url, {
+            'genre': ['drama', *many_genres[:3]],
+        })
+        assert response.status_code == 200, response.content
+        assert [item['slug'] for item in response.json()['genre']] == [
+            'drama', 'genre-0', 'genre-1', 'genre-2'
+        ]
+        assert lookups(queries, 'reviews_genre') == 1, (
+            'Проверьте, что слаги разрешаются одним запросом'
+        )
+        assert count(queries, LINKS) == 1
+        assert count(queries, DELETE) == 1
+        assert count(queries, INSERT) == 1, (
+            'Проверьте, что связи меняются одним удалением и одной вставкой'
+        )
+        assert Title.objects.get(pk=title.pk).updated > updated, (
+            'Проверьте, что смена жанров отмечает произведение'
+        )
+        assert [
+            item['slug'] for item in user_client.get(url).json()['genre']
+        ] == ['drama', 'genre-0', 'genre-1', 'genre-2']
+
+        _, queries = write(admin_client, 'patch', url, {
+            'genre': ['genre-0', 'drama'],
+        })
+        assert count(queries, INSERT) == 0, (
+            'Проверьте, что существующие связи не вставляются повторно'
+        )
+
+    def test_form_data(self, admin_client, genres):
+        response = admin_client.post(self.url, data={
+            'name': 'Из формы', 'year': 2000, 'genre': ['drama', 'comedy'],
+        })
+        assert response.status_code == 201, response.content
+        assert len(response.json()['genre']) == 2
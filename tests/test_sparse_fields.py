@@ -0,0 +1,109 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def get(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200, response.content
+    return response.json(), [query['sql'] for query in queries]
+
+
+@pytest.mark.django_db
+class TestSparseFields:
+
+    def test_title_fields_narrow_sql(self, user_client, title):
+        data, queries = get(
+            user_client, '/api/v1/titles/?fields=id,name,rating'
+        )
+        assert data['results'] == [
+            {'id': title.id, 'name': title.name, 'rating': None}
+        ], 'Проверьте, что ?fields= оставляет только перечисленные поля'
+        [select] = [sql for sql in queries if 'COUNT' not in sql]
+        assert 'reviews_category' not in select, (
+            'Проверьте, что без категории запрос не соединяет таблицы'
+        )
+        assert 'description' not in select, (
+            'Проверьте, что незапрошенные столбцы не загружаются'
+        )
+        assert 'reviews_genre' not in ' '.join(queries), (
+            'Проверьте, что без жанров нет prefetch'
+        )
+
+    def test_title_omit(self, user_client, title, genres):
+        data, queries = get(
+            user_client, f'/api/v1/titles/{title.id}/?omit=genre,description'
+        )
+        assert data == {
+            'id': title.id,
+            'name': title.name,
+            'year': title.year,
+            'category': {'name': 'Фильм', 'slug': 'movie'},
+            'rating': None,
+        }
+        assert len(queries) == 1 and 'description' not in queries[0]
+
+    def test_cursor_pagination_keeps_ordering_fields(self, user_client,
+                                                     category):
+        from reviews.models import Title
+
+        Title.objects.bulk_create(
+            Title(name=f'Произведение {index}', year=2000)
+            for index in range(6)
+        )
+        url = '/api/v1/titles/?fields=year&pagination=cursor&page_size=4'
+        data, queries = get(user_client, url)
+        assert data['results'] == [{'year': 2000}] * 4
+        assert len(queries) == 1, (
+            'Проверьте, что поля курсора загружаются тем же запросом'
+        )
+        data, _ = get(user_client, data['next'])
+        assert len(data['results']) == 2
+
+    def test_review_and_comment_fields(self, user_client, user, title):
+        from reviews.models import Comment, Review
+
+        review = Review.objects.create(
+            author=user, title=title, text='Отзыв', score=7
+        )
+        Comment.objects.create(author=user, review=review, text='Коммент')
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        data, queries = get(user_client, f'{url}?fields=score')
+        assert data['results'] == [{'score': 7}]
+        assert 'users_user' not in queries[-1]
+        data, queries = get(
+            user_client, f'{url}{review.id}/comments/?fields=author,text'
+        )
+        assert data['results'] == [
+            {'author': user.username, 'text': 'Коммент'}
+        ]
+        assert '"users_user"."email"' not in queries[-1], (
+            'Проверьте, что у автора загружается только username'
+        )
+
+    def test_category_genre_and_user_fields(self, admin_client, admin,
+                                            category, genres):
+        data, _ = get(admin_client, '/api/v1/categories/?fields=slug')
+        assert data['results'] == [{'slug': category.slug}]
+        data, _ = get(admin_client, '/api/v1/genres/?omit=slug')
+        assert {'name'} == set(data['results'][0])
+        data, _ = get(
+            admin_client, f'/api/v1/users/{admin.username}/?fields=role'
+        )
+        assert data == {'role': admin.role}
+        data, _ = get(admin_client, '/api/v1/users/me/?fields=username')
+        assert data == {'username': admin.username}
+
+    def test_unknown_field_and_writes(self, admin_client, category):
+        response = admin_client.get('/api/v1/titles/?fields=name,secret')
+        assert response.status_code == 400
+        assert response.json() == {'fields': ['Неизвестные поля: secret.']}
+        response = admin_client.post(
+            '/api/v1/titles/?fields=name',
+            data={'name': 'Новое', 'year': 2000, 'category': 'movie'},
+        )
+        assert response.status_code == 201
+        assert 'year' in response.json(), (
+            'Проверьте, что ?fields= не влияет на запись'
+        )
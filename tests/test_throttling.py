@@ -0,0 +1,136 @@
+import os
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    from api import throttling
+
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(
+        throttling, 'time', SimpleNamespace(time=lambda: clock.now)
+    )
+    return clock
+
+
+class TestSQLiteStore:
+
+    def test_token_bucket(self, tmp_path, clock):
+        from api.throttling import SQLiteStore
+
+        path = tmp_path / 'throttle.sqlite3'
+        store = SQLiteStore(str(path))
+        assert [store.consume('user', 3, 60) for _ in range(3)] == [None] * 3
+        assert store.consume('user', 3, 60) == pytest.approx(20), (
+            'Проверьте, что после исчерпания корзины возвращается ожидание'
+        )
+        assert store.consume('other', 3, 60) is None
+        clock.now += 20
+        assert store.consume('user', 3, 60) is None, (
+            'Проверьте пополнение корзины со временем'
+        )
+        assert store.consume('user', 3, 60) == pytest.approx(20)
+        clock.now += 3600
+        assert [store.consume('user', 3, 60) for _ in range(4)][-1] == (
+            pytest.approx(20)
+        ), 'Проверьте, что емкость корзины не превышает лимит'
+        with sqlite3.connect(str(path)) as connection:
+            assert connection.execute(
+                'SELECT COUNT(*) FROM bucket'
+            ).fetchone() == (2,), 'Проверьте, что на ключ хранится одна строка'
+
+    def test_shared_between_processes(self, tmp_path):
+        from api.throttling import SQLiteStore
+
+        store = SQLiteStore(str(tmp_path / 'throttle.sqlite3'))
+        assert store.consume('user', 5, 3600) is None
+        children = []
+        for _ in range(2):
+            pid = os.fork()
+            if pid == 0:
+                allowed = 0
+                try:
+                    allowed = sum(
+                        store.consume('user', 5, 3600) is None
+                        for _ in range(3)
+                    )
+                finally:
+                    os._exit(allowed)
+            children.append(pid)
+        allowed = sum(
+            os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])
+            for pid in children
+        )
+        assert allowed == 4, (
+            'Проверьте, что процессы списывают токены из общей корзины'
+        )
+        assert store.consume('user', 5, 3600) is not None
+
+
+class TestCacheStore:
+
+    def test_sliding_window(self, clock):
+        from api.throttling import CacheStore
+
+        store = CacheStore('default')
+        clock.now = 6000.0
+        assert store.consume('user', 2, 60) is None
+        assert store.consume('user', 2, 60) is None
+        assert store.consume('user', 2, 60) == pytest.approx(90), (
+            'Проверьте ожидание, пока окно не сдвинется'
+        )
+        clock.now += 60
+        assert store.consume('user', 2, 60) == pytest.approx(30), (
+            'Проверьте, что учитывается предыдущее окно'
+        )
+        clock.now += 30
+        assert store.consume('user', 2, 60) is None
+        assert store.consume('user', 2, 60) is not None, (
+            'Проверьте, что отклоненные запросы не расходуют лимит'
+        )
+
+
+@pytest.mark.django_db
+class TestScopes:
+
+    @pytest.fixture
+    def rates(self, settings):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {
+                **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'],
+                'signup': '2/min',
+                'token': '1/min',
+            },
+        }
+
+    def test_signup_and_token_limits(self, client, rates):
+        for _ in range(2):
+            assert client.post('/api/v1/auth/signup/').status_code == 400
+        response = client.post('/api/v1/auth/signup/')
+        assert response.status_code == 429, (
+            'Проверьте лимит регистрации для scope signup'
+        )
+        assert int(response['Retry-After']) == 30
+
+        data = {'username': 'nobody', 'confirmation_code': 'wrong'}
+        assert client.post('/api/v1/auth/token/', data).status_code == 404
+        assert client.post('/api/v1/auth/token/', data).status_code == 429, (
+            'Проверьте, что у получения токена свой лимит'
+        )
+
+    def test_user_limit_is_per_user(self, user_client, another_user_client,
+                                    settings):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {
+                **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'],
+                'user': '1/hour',
+            },
+        }
+        assert user_client.get('/api/v1/genres/').status_code == 200
+        assert user_client.get('/api/v1/genres/').status_code == 429
+        assert another_user_client.get('/api/v1/genres/').status_code == 200